@@ -1,15 +1,21 @@
 from .query_parser import QueryParserAgent
 from .market_data import MarketDataAgent
+from .fundamentals import FundamentalsAgent
+from .context_compression import ContextCompressionAgent
 from .news_sentiment import NewsSentimentAgent
 from .risk_assessment import RiskAssessmentAgent
+from .combined_analysis import CombinedAnalysisAgent
 from .synthesis import SynthesisAgent
 from .validation import ValidationAgent
 
 __all__ = [
     "QueryParserAgent",
     "MarketDataAgent",
+    "FundamentalsAgent",
+    "ContextCompressionAgent",
     "NewsSentimentAgent",
     "RiskAssessmentAgent",
+    "CombinedAnalysisAgent",
     "SynthesisAgent",
     "ValidationAgent",
 ]
\ No newline at end of file
@@ -0,0 +1,114 @@
+from functools import cached_property
+from pydantic import BaseModel, Field
+from config import MAX_CONCURRENCY, CONTEXT_BUDGETS
+from compression import trim_context
+from artifacts import default_artifacts
+from concurrency import map_bounded
+from llm import get_chat_model
+from deadline import Budget
+from models import StockData
+from .news_sentiment import NewsAnalysis, NewsSentimentAgent, FAILED_NEWS_ANALYSIS
+from .risk_assessment import RiskData, RiskAssessmentAgent, FAILED_RISK_ASSESSMENT
+
+
+class StockAnalysis(BaseModel):
+    news: NewsAnalysis = Field(description="Sentiment analysis of the stock's recent news.")
+    risk: RiskData = Field(description="Risk assessment of the stock.")
+
+
+class CombinedAnalysisAgent:
+    """News sentiment and risk from one structured call per ticker instead of one each.
+
+    The market data context is sent, and paid for, once. Results are checked like the two
+    separate agents' and written to the same news_analysis and risk_assessment fields.
+    """
+
+    def __init__(self, max_concurrency: int = MAX_CONCURRENCY):
+        self.max_concurrency = max_concurrency
+        self.news_agent = NewsSentimentAgent(max_concurrency)
+        self.risk_agent = RiskAssessmentAgent(max_concurrency)
+
+    @cached_property
+    def llm(self):
+        return get_chat_model("combined_analysis").with_structured_output(StockAnalysis)
+
+    def __call__(self, state: dict) -> dict:
+        print("📰 Analyzing news sentiment and risk...")
+
+        # The larger of the two budgets; with the defaults both are the same, so the separate
+        # agents' artifacts are reused here and the other way round
+        budget_tokens = max(CONTEXT_BUDGETS["news_sentiment"], CONTEXT_BUDGETS["risk_assessment"])
+
+        artifacts = default_artifacts()
+        jobs, errors, saved, stocks_data = [], [], 0, {}
+        for ticker in state["query"]["tickers"]:
+            data = StockData.coerce(state["stocks_data"].get(ticker))
+            context = data.market_text
+            if not context:
+                errors.append(f"No market data context found for {ticker} to analyze.")
+                continue
+            context, trimmed = trim_context(context, budget_tokens)
+
+            # Already analyzed from this exact context by a recent run
+            news = artifacts.get(ticker, "news_analysis", source=context)
+            risk = artifacts.get(ticker, "risk_assessment", source=context)
+            if news and risk:
+                stocks_data[ticker] = {"news_analysis": dict(news["value"]), "risk_assessment": dict(risk["value"])}
+                continue
+            jobs.append((ticker, context))
+            # Only prompts actually sent save anything
+            saved += trimmed + (data.compressed_tokens or 0)
+
+        budget = Budget.of(state)
+        results = map_bounded(lambda job: self._analyze_ticker(job, budget), jobs, self.max_concurrency)
+
+        for (ticker, context), (analysis, error) in zip(jobs, results):
+            if error:
+                errors.append(error)
+            else:
+                artifacts.put(ticker, "news_analysis", dict(analysis["news_analysis"]), source=context)
+                artifacts.put(ticker, "risk_assessment", dict(analysis["risk_assessment"]), source=context)
+            stocks_data[ticker] = analysis
+
+        RiskAssessmentAgent.fill_beta(stocks_data, state)
+        return {"stocks_data": stocks_data, "error_messages": errors, "tokens_saved": {"combined_analysis": saved},
+                "skipped": budget.skipped}
+
+    def _analyze_ticker(self, job: tuple[str, str], budget: Budget | None = None) -> tuple[dict, str | None]:
+        ticker, context = job
+
+        prompt = f"""
+        You are a financial analyst. Using the context below, analyze both the news sentiment
+        and the risk profile of the stock with the ticker {ticker}.
+
+        For news: judge the sentiment of the recent news and list the notable events.
+        Provide its confidence_score (0-1) based on the amount of relevant news found, the clarity
+        of sentiment signals and the recency of information. Set data_quality to "high" for recent,
+        detailed financial news, "medium" for some relevant information, "low" for limited or unclear sources.
+
+        For risk: pay special attention to market volatility, beta, and any mentioned competitive,
+        regulatory, or operational risks. Provide its confidence_score (0-1) based on the availability
+        of key metrics, the quality of risk factor information and the completeness of financial data.
+        Set data_completeness to "complete" when all key risk metrics are available, "partial" when some
+        are missing but there is enough for an assessment, "limited" when critical information is missing.
+
+        Context:
+        ---
+        {context}
+        ---
+
+        Respond with JSON matching the StockAnalysis schema.
+        """
+
+        try:
+            analysis: StockAnalysis = self.llm.invoke(prompt)
+            # The separate agents' own low-confidence checks
+            self.news_agent.check(ticker, prompt, analysis.news, context, budget)
+            self.risk_agent.check(ticker, prompt, analysis.risk, context, budget)
+            return {"news_analysis": analysis.news.model_dump(), "risk_assessment": analysis.risk.model_dump()}, None
+
+        except Exception as e:
+            return {
+                "news_analysis": dict(FAILED_NEWS_ANALYSIS),
+                "risk_assessment": dict(FAILED_RISK_ASSESSMENT),
+            }, f"Error analyzing news and risk for {ticker}: {str(e)}"
@@ -0,0 +1,24 @@
+from blobs import default_blobs
+from compression import compress, count_tokens
+from models import StockData
+
+
+class ContextCompressionAgent:
+    def __call__(self, state: dict) -> dict:
+        print("🗜️ Compressing context...")
+
+        blobs = default_blobs()
+        stocks_data = {}
+        for ticker in state["query"]["tickers"]:
+            market_data = StockData.coerce(state["stocks_data"].get(ticker)).market_text
+            if not market_data:
+                continue
+
+            compressed = compress(market_data)
+            # Counted by the agents that send it, as only they know whether they do
+            stocks_data[ticker] = {
+                "market_data": blobs.put(compressed),
+                "compressed_tokens": count_tokens(market_data) - count_tokens(compressed),
+            }
+
+        return {"stocks_data": stocks_data}
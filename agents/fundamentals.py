@@ -0,0 +1,30 @@
+from config import FUNDAMENTALS_MAX_AGE
+from fundamentals import extract_fundamentals, default_store
+from models import StockData
+
+
+class FundamentalsAgent:
+    def __call__(self, state: dict) -> dict:
+        print("🔢 Extracting fundamentals...")
+
+        store = default_store()
+        stocks_data = {}
+        for ticker in state["query"]["tickers"]:
+            data = StockData.coerce(state["stocks_data"].get(ticker))
+            # MarketDataAgent already filled these from the store when they were still fresh
+            if data.fundamentals:
+                continue
+
+            extracted = extract_fundamentals(data.market_text)
+            # Stamped with when the text was fetched; reused market data was recorded when it was new
+            fetched_at = data.market_data_fetched_at
+            history = store.history(ticker)
+            recorded = fetched_at is not None and len(history) and history["timestamp"][-1] >= fetched_at
+            if not recorded and any(value is not None for value in extracted.model_dump().values()):
+                store.append(ticker, extracted, timestamp=fetched_at)
+
+            # Newest value per field, so a number this search missed can come from a recent one
+            fundamentals = store.latest(ticker, FUNDAMENTALS_MAX_AGE) or extracted
+            stocks_data[ticker] = {"fundamentals": fundamentals.model_dump()}
+
+        return {"stocks_data": stocks_data}
@@ -1,71 +1,292 @@
-from langgraph.prebuilt import create_react_agent
-from langchain_tavily import TavilySearch
-from langchain_openai import ChatOpenAI
-from config import TAVILY_API_KEY, OPENAI_API_KEY, OPENAI_API_BASE
-
-search_tool = TavilySearch(max_results=7, tavily_api_key=TAVILY_API_KEY)
-tools = [search_tool]
-
-llm = ChatOpenAI(
-    model="gpt-4o-mini",
-    api_key=OPENAI_API_KEY,
-    base_url=OPENAI_API_BASE,
-    temperature=0.3,
+import threading
+import time
+from functools import cached_property
+from typing import Any, Optional
+from langchain_core.callbacks import CallbackManagerForToolRun
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import BaseTool
+from langgraph.errors import GraphRecursionError
+from artifacts import default_artifacts
+from blobs import default_blobs
+from cache import TTLCache
+from compression import compress, fit_to_budget
+from config import (
+    MAX_CONCURRENCY,
+    ARTIFACT_CACHE_SIZE,
+    ARTIFACT_MAX_AGE,
+    FUNDAMENTALS_MAX_AGE,
+    MARKET_DATA_MODE,
+    REACT_MAX_ITERATIONS,
+    REACT_MAX_SEARCHES,
+    CONTEXT_BUDGETS,
 )
+from concurrency import map_bounded, SingleFlight
+from deadline import Budget
+from fundamentals import Fundamentals, default_store, describe_fundamentals
+from llm import get_chat_model
+from search import get_search_tool
 
-react_agent = create_react_agent(llm, tools)
+# Fast mode's searches; "quote" is skipped when fresh fundamentals are already on record
+FAST_SEARCHES = {
+    "quote": "{ticker} stock price market cap P/E ratio beta",
+    "news": "{ticker} stock latest news",
+    "profile": "{ticker} company business overview revenue streams",
+}
+
+# What create_react_agent answers with when it runs out of steps mid-search
+REACT_OUT_OF_STEPS = "Sorry, need more steps"
+
+
+class SearchBudget:
+    """Searches one ReAct run may still make."""
+
+    def __init__(self, calls: int):
+        self.remaining = calls
+        self._lock = threading.Lock()
+
+    def take(self) -> bool:
+        with self._lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+
+class BudgetedSearchTool(BaseTool):
+    """Passes searches through until the run's SearchBudget (from its config) is spent."""
+
+    inner: BaseTool
+
+    def _run(
+        self,
+        query: str,
+        config: RunnableConfig,
+        run_manager: Optional[CallbackManagerForToolRun] = None,
+        **kwargs: Any,
+    ) -> Any:
+        budget = config.get("configurable", {}).get("search_budget")
+        if budget is not None and not budget.take():
+            return "Search limit reached. Write your final answer from the results you already have."
+        return self.inner.invoke({"query": query, **kwargs})
 
 
 class MarketDataAgent:
+    def __init__(self, max_concurrency: int = MAX_CONCURRENCY, share_results: bool = False,
+                 mode: str = MARKET_DATA_MODE):
+        self.max_concurrency = max_concurrency
+        self.mode = mode
+        # When sharing, successful fetches are reused by later runs of this agent for as long
+        # as a market data artifact would be, and concurrent runs for a ticker wait on one fetch
+        self.share_results = share_results
+        self._results = TTLCache("shared_market_data", max_entries=ARTIFACT_CACHE_SIZE)
+        self._inflight = SingleFlight()
+
+    @cached_property
+    def react_agent(self):
+        """Built on first use so importing this module stays cheap."""
+        from langgraph.prebuilt import create_react_agent
+
+        llm = get_chat_model("market_data", temperature=0.3)
+        search = get_search_tool()
+        tool = BudgetedSearchTool(name=search.name, description=search.description, args_schema=search.args_schema,
+                                  inner=search)
+        return create_react_agent(llm, [tool])
+
+    @cached_property
+    def extraction_llm(self):
+        return get_chat_model("market_data", temperature=0)
+
     def __call__(self, state: dict) -> dict:
         print("📊 Fetching market data...")
 
         tickers = state["query"].get("tickers", [])
         if not tickers:
-            state["error_messages"].append("No tickers found to analyze")
-            return state
+            return {"error_messages": ["No tickers found to analyze"]}
 
+        # Market data fetched by a recent run (for any query) is reused as is
+        artifacts = default_artifacts()
+        reused = {}
         for ticker in tickers:
-            prompt = f"""
-            You are a financial analyst tasked with gathering comprehensive market data for a specific stock.
-            Gather comprehensive, up-to-date market data for the stock with ticker {ticker}.
-            You must find and include the following information in your final answer:
-            1.  Current stock price.
-            2.  Market capitalization.
-            3.  Price-to-Earnings (P/E) ratio.
-            4.  The stock's Beta value.
-            5.  A summary of at least 3-4 key recent news articles or events.
-            6.  A summary of the company's primary business and revenue streams.
-
-            Synthesize all of this information into a single, well-formatted text block.
-            Your final answer should be just this text block, not a JSON object, as it
-            will be passed to other agents for analysis.
-            """
+            entry = artifacts.get(ticker, "market_data")
+            if entry:
+                reused[ticker] = entry
+        to_fetch = [ticker for ticker in tickers if ticker not in reused]
 
-            try:
-                response = react_agent.invoke({"messages": [{"role": "user", "content": prompt}]})
-
-                if isinstance(response, dict):
-                    output_text = response.get("output", "") or response.get("content", "") or str(response)
-                    if "messages" in response and response["messages"]:
-                        last_message = response["messages"][-1]
-                        if isinstance(last_message, dict):
-                            output_text = last_message.get("content", str(last_message))
-                        else:
-                            output_text = str(last_message)
-                else:
-                    output_text = str(response)
-
-                if ticker not in state["stocks_data"]:
-                    state["stocks_data"][ticker] = {}
-                state["stocks_data"][ticker]["market_data"] = output_text
+        # Tickers with complete, fresh fundamentals on record skip searching for them again
+        store = default_store()
+        known = {}
+        for ticker in to_fetch:
+            fresh = store.latest(ticker, FUNDAMENTALS_MAX_AGE)
+            if fresh and fresh.is_complete():
+                known[ticker] = fresh
+
+        budget = Budget.of(state)
+        fetch = self._fetch_shared if self.share_results else self._fetch_ticker
+        results = dict(zip(
+            to_fetch,
+            map_bounded(lambda ticker: fetch(ticker, known.get(ticker), budget), to_fetch, self.max_concurrency),
+        ))
+        # Cut-short market data serves this run only; it isn't reused by later ones
+        cut_short = {entry["ticker"] for entry in budget.skipped}
+
+        # State carries handles; runs that fetched the same text share one copy of it
+        blobs = default_blobs()
+        stocks_data, errors = {}, []
+        for ticker in tickers:
+            if ticker in reused:
+                stocks_data[ticker] = {
+                    "market_data": blobs.put(reused[ticker]["value"]),
+                    "market_data_fetched_at": reused[ticker]["created_at"],
+                }
+                continue
+
+            output_text, error = results[ticker]
+            if error or ticker in cut_short:
+                if error:
+                    errors.append(error)
+                fetched_at = time.time()
+            else:
+                fetched_at = artifacts.put(ticker, "market_data", output_text)
+            stocks_data[ticker] = {"market_data": blobs.put(output_text), "market_data_fetched_at": fetched_at}
+            if ticker in known:
+                stocks_data[ticker]["fundamentals"] = known[ticker].model_dump()
 
+        return {"stocks_data": stocks_data, "error_messages": errors, "skipped": budget.skipped}
+
+    def _fetch_shared(self, ticker: str, known: Fundamentals | None = None,
+                      budget: Budget | None = None) -> tuple[str, str | None]:
+        shared = self._results.get(ticker)
+        if shared is not None:
+            return shared, None
+
+        budget = budget or Budget()
+        output_text, error = self._inflight.do(ticker, lambda: self._fetch_ticker(ticker, known, budget))
+        if not error and not any(entry["ticker"] == ticker for entry in budget.skipped):
+            self._results.set(ticker, output_text, ARTIFACT_MAX_AGE)
+        return output_text, error
+
+    def _fetch_ticker(self, ticker: str, known: Fundamentals | None = None,
+                      budget: Budget | None = None) -> tuple[str, str | None]:
+        budget = budget or Budget()
+        try:
+            if self.mode != "react":
+                output_text = self._fetch_fast(ticker, known)
+            elif not budget.allows("react"):
+                # No time for rounds of searching: one parallel round instead
+                budget.skip("react", ticker)
+                output_text = self._fetch_fast(ticker, known)
+            else:
+                output_text = self._fetch_react(ticker, known, budget)
+        except Exception as e:
+            error_message = f"Error fetching market data for {ticker}: {str(e)}"
+            return f"Failed to fetch data for {ticker}", error_message
+
+        if known:
+            output_text = f"{describe_fundamentals(known)}\n\n{output_text}"
+        return output_text, None
+
+    @staticmethod
+    def _checklist(known: Fundamentals | None) -> str:
+        if known:
+            return """
+        Its price, market capitalization, P/E ratio and beta are already known; do not search for them.
+        You must find and include the following information in your final answer:
+        1.  A summary of at least 3-4 key recent news articles or events.
+        2.  A summary of the company's primary business and revenue streams.
+        """
+        return """
+        You must find and include the following information in your final answer:
+        1.  Current stock price.
+        2.  Market capitalization.
+        3.  Price-to-Earnings (P/E) ratio.
+        4.  The stock's Beta value.
+        5.  A summary of at least 3-4 key recent news articles or events.
+        6.  A summary of the company's primary business and revenue streams.
+        """
+
+    def _fetch_fast(self, ticker: str, known: Fundamentals | None = None) -> str:
+        """The fixed searches side by side, then one LLM call to write them up."""
+        search = get_search_tool()
+        queries = [query.format(ticker=ticker) for kind, query in FAST_SEARCHES.items() if not (known and kind == "quote")]
+
+        def run_search(query: str) -> Any:
+            try:
+                return search.invoke({"query": query})
             except Exception as e:
-                error_message = f"Error running ReAct agent for {ticker}: {str(e)}"
-                state["error_messages"].append(error_message)
+                return {"error": str(e)}
+
+        results = map_bounded(run_search, queries, len(queries))
+        failed = [result["error"] for result in results if isinstance(result, dict) and "error" in result]
+        if len(failed) == len(results):
+            raise RuntimeError(f"every search failed ({failed[0]})")
+        return self._extract(ticker, known, [self._format_results(result) for result in results])
+
+    def _fetch_react(self, ticker: str, known: Fundamentals | None = None, budget: Budget | None = None) -> str:
+        """The model picks its own searches, within REACT_MAX_ITERATIONS rounds and REACT_MAX_SEARCHES calls.
+
+        Searching also stops once the run's deadline leaves no more than the "react" reserve.
+        """
+        budget = budget or Budget()
+        prompt = f"""
+        You are a financial analyst tasked with gathering comprehensive market data for a specific stock.
+        Gather comprehensive, up-to-date market data for the stock with ticker {ticker}.
+        {self._checklist(known)}
+
+        Synthesize all of this information into a single, well-formatted text block.
+        Your final answer should be just this text block, not a JSON object, as it
+        will be passed to other agents for analysis.
+        """
+
+        # Each round is a model step plus a tool step; the last model step must answer
+        config = {
+            "recursion_limit": 2 * REACT_MAX_ITERATIONS + 1,
+            "configurable": {"search_budget": SearchBudget(REACT_MAX_SEARCHES)},
+        }
+
+        # Streamed rather than invoked, so what was found survives running out of rounds
+        messages, out_of_steps = [], False
+        try:
+            for values in self.react_agent.stream(
+                {"messages": [{"role": "user", "content": prompt}]}, config=config, stream_mode="values"
+            ):
+                messages = values.get("messages", messages)
+                found_any = any(getattr(m, "type", None) == "tool" for m in messages)
+                if found_any and not budget.allows("react"):
+                    budget.skip("react", ticker)
+                    out_of_steps = True
+                    break
+        except GraphRecursionError:
+            out_of_steps = True
+
+        # str() of a message is its repr, with escaped newlines and metadata
+        output_text = str(getattr(messages[-1], "content", "")) if messages else ""
+        if out_of_steps or output_text.startswith(REACT_OUT_OF_STEPS):
+            found = [str(m.content) for m in messages if getattr(m, "type", None) == "tool"]
+            output_text = self._extract(ticker, known, found)
+        return output_text
+
+    def _extract(self, ticker: str, known: Fundamentals | None, sources: list) -> str:
+        # Search results overlap heavily; dedupe them and keep the prompt within budget
+        material = fit_to_budget(compress("\n\n".join(sources)), CONTEXT_BUDGETS["market_data"])
+        prompt = f"""
+        You are a financial analyst writing up market data for the stock with ticker {ticker}.
+        {self._checklist(known)}
+
+        Use only the search results below. Write the information as a single, well-formatted
+        text block, not a JSON object, as it will be passed to other agents for analysis.
 
-                if ticker not in state["stocks_data"]:
-                    state["stocks_data"][ticker] = {}
-                state["stocks_data"][ticker]["market_data"] = f"Failed to fetch data for {ticker}"
+        Search results:
+        {material}
+        """
+        response = self.extraction_llm.invoke(prompt)
+        return response.content
 
-        return state
\ No newline at end of file
+    @staticmethod
+    def _format_results(result: Any) -> str:
+        if isinstance(result, dict) and "error" in result:
+            return ""
+        if isinstance(result, dict) and isinstance(result.get("results"), list):
+            return "\n\n".join(
+                f"{item.get('title', '')}\n{item.get('content', '')}" for item in result["results"] if isinstance(item, dict)
+            )
+        return str(result)
@@ -1,15 +1,47 @@
-from langchain_openai import ChatOpenAI
-from config import OPENAI_API_KEY
+from functools import cached_property
+from llm import get_chat_model
+from symbols import default_index
+from config import MAX_TICKERS
 import json
 import re
 
 
 class QueryParserAgent:
     def __init__(self):
-        self.llm = ChatOpenAI(api_key=OPENAI_API_KEY, model="gpt-4o-mini", temperature=0)
+        self.index = default_index()
+
+    @cached_property
+    def llm(self):
+        return get_chat_model("query_parser", temperature=0)
+
+    @staticmethod
+    def _limit(tickers: list) -> list:
+        # Unique, in the order the query names them, and no more than a basket's worth
+        return list(dict.fromkeys(ticker.upper() for ticker in tickers))[:MAX_TICKERS]
 
     def __call__(self, state: dict) -> dict:
         print("🔍 Parsing query...")
+        # Already parsed by the caller (e.g. the report cache canonicalizing the request)
+        if state["query"].get("tickers"):
+            return {}
+
+        query_text = state["query"]["user_input"]
+
+        # Well-known names and tickers resolve locally; only ambiguous queries reach the LLM
+        parsed = self.index.resolve(query_text)
+        if parsed:
+            tickers = parsed["tickers"]
+            query = dict(state["query"])
+            query["tickers"] = self._limit(tickers)
+            query["analysis_type"] = "comparison" if parsed["is_comparison"] else "single"
+            return {
+                "query": query,
+                "messages": [f"Analyzing: {', '.join(tickers)} ({', '.join(parsed['company_names'])})"],
+            }
+
+        return self._parse_with_llm(state)
+
+    def _parse_with_llm(self, state: dict) -> dict:
         query_text = state["query"]["user_input"]
 
         prompt = f"""
@@ -19,17 +51,20 @@ class QueryParserAgent:
         Rules:
         - Convert company names to tickers (e.g., "Apple" → "AAPL", "Microsoft" → "MSFT")
         - Identify if user wants comparison (words like: compare, vs, versus, or, better)
-        - Maximum 2 stocks for comparison
+        - Include every stock the query names; a comparison may cover a whole basket of stocks
 
         Return ONLY a valid JSON object with this exact format:
         {{
-            "tickers": ["TICKER1", "TICKER2"],
-            "company_names": ["Name1", "Name2"],
+            "tickers": ["TICKER1", "TICKER2", "..."],
+            "company_names": ["Name1", "Name2", "..."],
             "is_comparison": true,
             "query_intent": "what user wants to know"
         }}
         """
 
+        query = dict(state["query"])
+        messages, errors = [], []
+
         try:
             response = self.llm.invoke(prompt)
             content = response.content if hasattr(response, 'content') else str(response)
@@ -47,35 +82,34 @@ class QueryParserAgent:
                 tickers = [t for t in tickers if t not in {'I', 'A', 'AND', 'OR', 'VS'}]
 
             if not tickers:
-                state["error_messages"].append("Could not identify any stocks in your query")
-                return state
+                errors.append("Could not identify any stocks in your query")
+                return {"error_messages": errors}
 
-            # Ensure tickers are unique and limit to 2
             is_comparison = parsed.get("is_comparison", False) or len(tickers) > 1
             analysis_type = "comparison" if is_comparison else "single"
 
-            state["query"]["tickers"] = tickers[:2]
-            state["query"]["analysis_type"] = analysis_type
+            query["tickers"] = self._limit(tickers)
+            query["analysis_type"] = analysis_type
 
-            state["messages"].append(
+            messages.append(
                 f"Analyzing: {', '.join(tickers)} "
                 f"({', '.join(parsed.get('company_names', tickers))})"
             )
 
         # Handle JSON parsing errors gracefully
         except json.JSONDecodeError as e:
-            state["error_messages"].append(f"Failed to parse LLM response as JSON: {str(e)}")
+            errors.append(f"Failed to parse LLM response as JSON: {str(e)}")
 
             tickers = re.findall(r'\b[A-Z]{1,5}\b', query_text)
             tickers = [t for t in tickers if t not in {'I', 'A', 'AND', 'OR', 'VS'}]
 
             if tickers:
-                state["query"]["tickers"] = list(set(tickers))[:2]
-                state["query"]["analysis_type"] = "comparison" if len(tickers) > 1 else "single"
-                state["messages"].append(f"Fallback parsing found: {', '.join(tickers)}")
-                state["error_messages"] = []
+                query["tickers"] = self._limit(tickers)
+                query["analysis_type"] = "comparison" if len(tickers) > 1 else "single"
+                messages.append(f"Fallback parsing found: {', '.join(tickers)}")
+                errors = []
 
         except Exception as e:
-            state["error_messages"].append(f"Query parsing error: {str(e)}")
+            errors.append(f"Query parsing error: {str(e)}")
 
-        return state
\ No newline at end of file
+        return {"query": query, "messages": messages, "error_messages": errors}
@@ -1,11 +1,18 @@
-from langchain_openai import ChatOpenAI
-from config import OPENAI_API_KEY
+from functools import cached_property
+from langgraph.constants import TAG_NOSTREAM
+from llm import get_chat_model
+from compression import count_tokens
+from concurrency import map_bounded
+from config import SYNTHESIS_CHUNK_SIZE
+from models import StockData
+from ranking import rank_stocks, format_ranking
 import json
 
 
 class SynthesisAgent:
-    def __init__(self):
-        self.llm = ChatOpenAI(api_key=OPENAI_API_KEY, model="gpt-4o-mini")
+    @cached_property
+    def llm(self):
+        return get_chat_model("synthesis")
 
     def __call__(self, state: dict) -> dict:
         print("📝 Creating executive summary...")
@@ -14,31 +21,64 @@ class SynthesisAgent:
         if state.get("needs_retry", False):
             guidance = "IMPORTANT: Only use information explicitly stated in the provided data."
 
+        tickers = state["query"]["tickers"]
         context = {}
-        for ticker in state["query"]["tickers"]:
+        for ticker in tickers:
+            data = StockData.coerce(state["stocks_data"].get(ticker))
             context[ticker] = {
-                "news": state["stocks_data"][ticker].get("news_analysis", {}),
-                "risk": state["stocks_data"][ticker].get("risk_assessment", {})
+                "news": data.news_analysis or {},
+                "risk": data.risk_assessment or {}
             }
 
+        # Compact separators: the indentation of pretty-printed JSON is pure prompt-token overhead
+        context_json = json.dumps(context, separators=(",", ":"))
+        saved = count_tokens(json.dumps(context, indent=2)) - count_tokens(context_json)
+
         analysis_type = state["query"].get("analysis_type", "single")
+        ranking = rank_stocks(state["stocks_data"], tickers) if analysis_type == "comparison" and len(tickers) > 1 else []
+        standings = ", ".join(f"{row['rank']}. {row['ticker']} ({row['score']:+.2f})" for row in ranking)
 
         if analysis_type == "single":
             prompt = f"""
             {guidance}
-            Write a 150-word executive summary for {state["query"]["tickers"][0]} using:
-            {json.dumps(context, indent=2)}
+            Write a 150-word executive summary for {tickers[0]} using:
+            {context_json}
 
             Structure:
             1. Current sentiment and recent events
             2. Risk assessment
             3. Investment recommendation
             """
+        elif len(tickers) > SYNTHESIS_CHUNK_SIZE:
+            # One prompt with every stock's analyses would grow with the basket; summarize
+            # groups of it first and write the comparison from those notes
+            groups = [
+                [row["ticker"] for row in ranking[i:i + SYNTHESIS_CHUNK_SIZE]]
+                for i in range(0, len(ranking), SYNTHESIS_CHUNK_SIZE)
+            ]
+            print(f"📝 Summarizing {len(tickers)} stocks in {len(groups)} groups...")
+            notes = map_bounded(lambda group: self._group_notes(group, context, guidance), groups)
+            group_notes = "\n\n".join(f"Group {i}: {note}" for i, note in enumerate(notes, start=1))
+
+            prompt = f"""
+            {guidance}
+            Compare this basket of {len(tickers)} stocks.
+            Weighted ranking (best first): {standings}
+
+            Notes on each group, in ranking order:
+            {group_notes}
+
+            Write 250 words covering:
+            1. Leaders and laggards
+            2. Risk comparison across the basket
+            3. Which are the better investments and why
+            """
         else:
             prompt = f"""
             {guidance}
-            Compare {' vs '.join(state["query"]["tickers"])} using:
-            {json.dumps(context, indent=2)}
+            Compare {' vs '.join(tickers)} using:
+            {context_json}
+            Weighted ranking (best first): {standings}
 
             Write 200 words covering:
             1. Key differences
@@ -47,29 +87,21 @@ class SynthesisAgent:
             """
 
         response = self.llm.invoke(prompt)
-        state["executive_summary"] = response.content
-
-        if analysis_type == "comparison" and len(state["query"]["tickers"]) == 2:
-            t1, t2 = state["query"]["tickers"]
-            d1, d2 = state["stocks_data"][t1], state["stocks_data"][t2]
-
-            sentiment_map = {"positive": 3, "neutral": 2, "negative": 1}
-            sentiment1 = sentiment_map.get(d1.get('news_analysis', {}).get('sentiment', 'neutral'), 2)
-            sentiment2 = sentiment_map.get(d2.get('news_analysis', {}).get('sentiment', 'neutral'), 2)
-
-            risk1 = d1.get('risk_assessment', {}).get('risk_score', 5)
-            risk2 = d2.get('risk_assessment', {}).get('risk_score', 5)
-
-            state["comparison_dashboard"] = f"""
-📊 {t1} vs {t2} Quick Comparison
-═══════════════════════════════════════════════════════════
-                    {t1:<10} {t2:<10} Better
-───────────────────────────────────────────────────────────
-Sentiment Score     {sentiment1:>6}     {sentiment2:>6}     {'→ ' + (t1 if sentiment1 > sentiment2 else t2)}
-Risk Score (/10)    {risk1:>6}     {risk2:>6}     {'→ ' + (t1 if risk1 < risk2 else t2)}
-Volatility          {d1.get('risk_assessment', {}).get('volatility', 'N/A'):>6}     {d2.get('risk_assessment', {}).get('volatility', 'N/A'):>6}
-═══════════════════════════════════════════════════════════
-Overall Winner: {t1 if (sentiment1 > sentiment2 and risk1 <= risk2) else t2}
-"""
-
-        return state
\ No newline at end of file
+        updates = {"executive_summary": response.content, "tokens_saved": {"synthesis": saved}}
+
+        if ranking:
+            updates["comparison_dashboard"] = format_ranking(ranking)
+
+        return updates
+
+    def _group_notes(self, group: list, context: dict, guidance: str) -> str:
+        group_json = json.dumps({ticker: context[ticker] for ticker in group}, separators=(",", ":"))
+        prompt = f"""
+        {guidance}
+        In at most {30 * len(group)} words, note for each of {', '.join(group)} its sentiment,
+        key recent events and main risks, using:
+        {group_json}
+        """
+        # Working notes, not part of the summary: kept out of the token stream
+        response = self.llm.invoke(prompt, config={"tags": [TAG_NOSTREAM]})
+        return response.content
@@ -1,66 +1,235 @@
-from deepeval.metrics import FaithfulnessMetric, AnswerRelevancyMetric
-from deepeval.test_case import LLMTestCase
+import asyncio
+import hashlib
+import inspect
+from functools import lru_cache
+from typing import List, Optional
+from cache import TTLCache
+from claims import precheck, unsettled
+from deadline import Budget
+from config import VALIDATION_CACHE_SIZE, VALIDATION_CACHE_TTL, CONTEXT_BUDGETS
+from compression import trim_context
+from llm import get_eval_model
+from concurrency import run_async
+from metrics import deepeval_call, record_retry
+from models import StockData
+
+
+def context_hash(context: List[str]) -> str:
+    return hashlib.sha256("\x00".join(context).encode()).hexdigest()
+
+
+def analysis_lines(ticker: str, data: StockData) -> List[str]:
+    """A stock's analyses one fact per line, shortest first, so a tight budget drops the longest facts."""
+    lines = []
+    for label, analysis in (("news analysis", data.news_analysis), ("risk assessment", data.risk_assessment)):
+        for field, value in (analysis or {}).items():
+            values = value if isinstance(value, list) else [value]
+            lines += [f"{ticker} {label} {field}: {item}" for item in values]
+    return sorted(lines, key=len)
+
+
+def cache_hooks_supported(metric_class) -> bool:
+    """Whether metric_class.a_measure still goes through the private steps the cache overrides.
+
+    The cache wraps _a_generate_truths(retrieval_context, ...) and _a_generate_verdicts(...), which
+    judges self.claims. They are DeepEval internals (checked against the range in requirements.txt).
+    """
+    truths = getattr(metric_class, "_a_generate_truths", None)
+    verdicts = getattr(metric_class, "_a_generate_verdicts", None)
+    measure = getattr(metric_class, "a_measure", None)
+    if not (callable(truths) and callable(verdicts) and callable(measure)):
+        return False
+    if list(inspect.signature(truths).parameters)[1:2] != ["retrieval_context"]:
+        return False
+    # a_measure is wrapped by DeepEval's tracing decorator
+    code = getattr(inspect.unwrap(measure), "__code__", None)
+    return code is not None and {"_a_generate_truths", "_a_generate_verdicts", "claims"} <= set(code.co_names)
+
+
+@lru_cache(maxsize=None)
+def _warn_uncached() -> None:
+    print("⚠️ This DeepEval version's FaithfulnessMetric has changed; faithfulness runs uncached")
+
+
+def make_cached_faithfulness(truth_cache: TTLCache, verdict_cache: TTLCache):
+    """FaithfulnessMetric that reuses truths per context and verdicts per (claim, context).
+
+    On a validation retry the context is unchanged, so only claims that are new in the
+    regenerated summary go back to the model. With a DeepEval whose internals no longer
+    match, it is a plain FaithfulnessMetric.
+    """
+    from deepeval.metrics import FaithfulnessMetric
+
+    if not cache_hooks_supported(FaithfulnessMetric):
+        _warn_uncached()
+        return FaithfulnessMetric(threshold=0.7, model=get_eval_model())
+
+    class CachedFaithfulnessMetric(FaithfulnessMetric):
+        async def _a_generate_truths(self, retrieval_context, *args, **kwargs):
+            self._context_key = context_hash(retrieval_context)
+            truths = truth_cache.get(self._context_key)
+            if truths is None:
+                truths = await super()._a_generate_truths(retrieval_context, *args, **kwargs)
+                truth_cache.set(self._context_key, truths, VALIDATION_CACHE_TTL)
+            return list(truths)
+
+        async def _a_generate_verdicts(self, *args, **kwargs):
+            claims = self.claims
+            verdicts = {claim: verdict_cache.get(f"{self._context_key}:{claim}") for claim in claims}
+            missing = [claim for claim in claims if verdicts[claim] is None]
+            if not missing:
+                return [verdicts[claim] for claim in claims]
+
+            self.claims = missing
+            try:
+                fresh = await super()._a_generate_verdicts(*args, **kwargs)
+            finally:
+                self.claims = claims
+
+            # Verdicts come back one per claim, in order; if not, use them uncached
+            if len(fresh) != len(missing):
+                return [verdicts[claim] for claim in claims if verdicts[claim] is not None] + list(fresh)
+            for claim, verdict in zip(missing, fresh):
+                verdicts[claim] = verdict
+                verdict_cache.set(f"{self._context_key}:{claim}", verdict, VALIDATION_CACHE_TTL)
+            return [verdicts[claim] for claim in claims]
+
+    return CachedFaithfulnessMetric(threshold=0.7, model=get_eval_model())
 
 
 class ValidationAgent:
     def __init__(self):
-        self.faithfulness = FaithfulnessMetric(threshold=0.7, model="gpt-4o-mini")
-        self.relevancy = AnswerRelevancyMetric(threshold=0.7, model="gpt-4o-mini")
+        # In-memory only: cached truths and verdicts are DeepEval objects, reused across retries and runs
+        self.truth_cache = TTLCache("validation_truths", max_entries=VALIDATION_CACHE_SIZE)
+        self.verdict_cache = TTLCache("validation_verdicts", max_entries=VALIDATION_CACHE_SIZE * 16)
+
+    def _make_metrics(self):
+        # DeepEval is heavy to import, so it waits until a report is actually validated.
+        # Metrics hold per-measurement state, so every run gets its own pair.
+        from deepeval.metrics import AnswerRelevancyMetric
+
+        faithfulness = make_cached_faithfulness(self.truth_cache, self.verdict_cache)
+        relevancy = AnswerRelevancyMetric(threshold=0.7, model=get_eval_model())
+        return faithfulness, relevancy
+
+    @staticmethod
+    async def _timed_measure(name: str, metric, test_case):
+        with deepeval_call(name, metric):
+            return await metric.a_measure(test_case, _show_indicator=False)
+
+    async def _measure(self, test_case, faith_test=None) -> tuple[Optional[float], float]:
+        """Relevancy of test_case, and faithfulness of faith_test when there is one (None otherwise)."""
+        faithfulness, relevancy = self._make_metrics()
+
+        async def skipped():
+            return None
+
+        faith_result, rel_result = await asyncio.gather(
+            self._timed_measure("faithfulness", faithfulness, faith_test) if faith_test else skipped(),
+            self._timed_measure("answer_relevancy", relevancy, test_case),
+            return_exceptions=True,
+        )
+
+        if faith_test is None:
+            faith_score = None
+        elif isinstance(faith_result, Exception):
+            print(f"Faithfulness validation error: {faith_result}")
+            faith_score = 0.0
+        else:
+            faith_score = faithfulness.score
+
+        if isinstance(rel_result, Exception):
+            print(f"Relevancy validation error: {rel_result}")
+            rel_score = 0.0
+        else:
+            rel_score = relevancy.score
+
+        return faith_score, rel_score
 
     def __call__(self, state: dict) -> dict:
         print("✅ Validating report...")
 
+        # Either way there is nothing to retry: a retry only follows a validated summary
         if not state.get("executive_summary"):
-            return state
+            return {"needs_retry": False}
+
+        time_budget = Budget.of(state)
+        if not time_budget.allows("validation"):
+            time_budget.skip("validation")
+            return {"needs_retry": False, "skipped": time_budget.skipped}
 
-        context = []
-        for ticker, data in state["stocks_data"].items():
-            market_data = data.get("market_data", "")
+        # The budget is per stock for a pair; larger baskets share twice that between them.
+        # A stock's analyses and market data share its part, analyses first
+        budget = CONTEXT_BUDGETS["validation"] * 2 // max(2, len(state["stocks_data"]))
+
+        context, saved = [], 0
+        for ticker, record in state["stocks_data"].items():
+            data = StockData.coerce(record)
+            lines = analysis_lines(ticker, data)
+            market_data = data.market_text
             if market_data:
-                context.append(market_data)
+                lines.append(market_data)
+                saved += data.compressed_tokens or 0
 
-            news = data.get("news_analysis", {})
-            risk = data.get("risk_assessment", {})
-            context.append(f"{ticker} news analysis: {news}")
-            context.append(f"{ticker} risk assessment: {risk}")
+            stock_context, trimmed = trim_context("\n".join(lines), budget)
+            saved += trimmed
+            if stock_context:
+                context.append(stock_context)
 
-        faith_test = LLMTestCase(
+        # Sentences whose numbers and tickers all match the context are settled locally;
+        # DeepEval's faithfulness judges only the rest
+        check = precheck(state["executive_summary"], "\n".join(context))
+        pending = unsettled(check, strict=True)
+
+        from deepeval.test_case import LLMTestCase
+
+        test_case = LLMTestCase(
             input=str(state["query"]),
             actual_output=state["executive_summary"],
             retrieval_context=context
         )
+        faith_test = LLMTestCase(
+            input=str(state["query"]),
+            actual_output="\n".join(pending),
+            retrieval_context=context
+        ) if pending else None
 
-        try:
-            self.faithfulness.measure(faith_test)
-            faith_score = self.faithfulness.score
-        except Exception as e:
-            print(f"Faithfulness validation error: {e}")
-            faith_score = 0.0
+        # Both metrics are several LLM calls each; run them side by side, on the long-lived
+        # loop so the pooled OpenAI connections are reused from one validation to the next
+        judged_score, rel_score = run_async(self._measure(test_case, faith_test))
 
-        try:
-            self.relevancy.measure(faith_test)
-            rel_score = self.relevancy.score
-        except Exception as e:
-            print(f"Relevancy validation error: {e}")
-            rel_score = 0.0
+        # Locally verified sentences count as fully faithful
+        verified = len(check.verified)
+        faith_score = (verified + (judged_score or 0.0) * len(pending)) / max(1, verified + len(pending))
+        if check.failed_claims:
+            print(f"Claims not found in the sources: {', '.join(check.failed_claims)}")
 
         passed = faith_score > 0.7 and rel_score > 0.7
         validation_result = state.get("validation_result", {})
         attempt = validation_result.get("attempt", 1) + 1 if validation_result else 1
 
-        state["validation_result"] = {
-            "passed": passed,
-            "scores": {
-                "faithfulness": faith_score,
-                "relevancy": rel_score
+        updates = {
+            "validation_result": {
+                "passed": passed,
+                "scores": {
+                    "faithfulness": faith_score,
+                    "relevancy": rel_score
+                },
+                "attempt": attempt
             },
-            "attempt": attempt
+            "tokens_saved": {"validation": saved},
         }
 
-        if not passed and attempt == 1:
-            state["needs_retry"] = True
-            state["executive_summary"] = None
+        # A retry is another synthesis and validation; near the deadline the first summary stands
+        if not passed and attempt == 1 and not time_budget.allows("retry"):
+            time_budget.skip("retry")
+            updates["skipped"] = time_budget.skipped
+            print("Note: Some claims could not be fully verified")
+        elif not passed and attempt == 1:
+            record_retry("validation")
+            updates["needs_retry"] = True
+            updates["executive_summary"] = None
         elif not passed:
             print("Note: Some claims could not be fully verified")
 
-        return state
\ No newline at end of file
+        return updates
\ No newline at end of file
@@ -1,30 +1,79 @@
+import os
 import gradio as gr
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from deadline import format_skipped
+from metrics import REGISTRY
+from reports import ReportService
 from workflow import Workflow
 
+# One workflow for every request; identical requests share a run or a cached report
 workflow = Workflow()
+reports = ReportService(workflow)
+
+
+NODE_LABELS = {
+    "parse_query": "🔍 Query parsed",
+    "get_market_data": "📊 Market data gathered",
+    "extract_fundamentals": "🔢 Fundamentals extracted",
+    "compress_context": "🗜️ Context compressed",
+    "analyze_news": "📰 News sentiment analyzed",
+    "assess_risk": "⚠️ Risk assessed",
+    "analyze_stocks": "📰 News sentiment and risk analyzed",
+    "synthesize_report": "📝 Summary written",
+    "validate_report": "✅ Report validated",
+}
+
+
+def format_report(final_state: dict) -> str:
+    if final_state.get("error_messages"):
+        return f"An error occurred: {final_state['error_messages'][0]}"
+
+    output = ""
+    if final_state.get("executive_summary"):
+        output += f"## 📝 Executive Summary\n\n{final_state['executive_summary']}\n\n"
+
+    if final_state.get("comparison_dashboard"):
+        output += f"## 📊 Comparison Dashboard\n\n```\n{final_state['comparison_dashboard']}\n```"
+
+    if final_state.get("skipped"):
+        output += f"\n\n_⏱️ Partial report, skipped to meet the deadline: {format_skipped(final_state['skipped'])}_"
+
+    return output
 
 
 def run_research(query: str):
     if not query:
-        return "Please enter a query to begin."
+        yield "Please enter a query to begin."
+        return
 
     try:
-        final_state = workflow.run(query)
+        progress, summary = [], ""
+        for event in reports.stream(query):
+            if event["type"] == "final":
+                report = format_report(event["state"])
+                if event["source"] == "cache":
+                    report = "_⚡ Served from a recent identical report_\n\n" + report
+                yield report
+                return
 
-        if final_state.get("error_messages"):
-            return f"An error occurred: {final_state['error_messages'][0]}"
+            if event["type"] == "waiting":
+                progress.append("⏳ The same report is already being prepared, waiting for it")
+            elif event["type"] == "token":
+                summary += event["content"]
+            else:
+                progress.append(NODE_LABELS.get(event["node"], event["node"]))
+                if event["node"] == "validate_report" and (event["update"] or {}).get("needs_retry"):
+                    progress.append("🔁 Regenerating summary after failed validation")
+                    summary = ""
 
-        output = ""
-        if final_state.get("executive_summary"):
-            output += f"## 📝 Executive Summary\n\n{final_state['executive_summary']}\n\n"
-
-        if final_state.get("comparison_dashboard"):
-            output += f"## 📊 Comparison Dashboard\n\n```\n{final_state['comparison_dashboard']}\n```"
-
-        return output
+            output = "\n".join(f"- {step}" for step in progress)
+            if summary:
+                output += f"\n\n## 📝 Executive Summary\n\n{summary}"
+            yield output
 
     except Exception as e:
-        return f"A critical error occurred: {str(e)}"
+        yield f"A critical error occurred: {str(e)}"
 
 
 iface = gr.Interface(
@@ -36,7 +85,7 @@ iface = gr.Interface(
     ),
     outputs=gr.Markdown(label="Research Report", elem_id="markdown-output"),
     title="🤖 Multi-Agent Stock Research",
-    description="Enter a query to research a single stock or compare two. The system uses multiple agents to parse, gather, analyze, and report.",
+    description="Enter a query to research a single stock or compare a basket of them. The system uses multiple agents to parse, gather, analyze, and report.",
     examples=[
         ["Analyze GOOGL"],
         ["Compare Apple and Microsoft"],
@@ -46,5 +95,22 @@ iface = gr.Interface(
     css="#markdown-output { white-space: pre-wrap; }",
 )
 
+# Gradio at /, Prometheus-style aggregates at /metrics on the same server
+server = FastAPI()
+
+
+@server.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint() -> str:
+    return REGISTRY.render()
+
+
+server = gr.mount_gradio_app(server, iface, path="/")
+
 if __name__ == "__main__":
-    iface.launch()
\ No newline at end of file
+    import uvicorn
+
+    uvicorn.run(
+        server,
+        host=os.getenv("GRADIO_SERVER_NAME", "127.0.0.1"),
+        port=int(os.getenv("GRADIO_SERVER_PORT", "7860")),
+    )
\ No newline at end of file
@@ -0,0 +1,58 @@
+import hashlib
+import time
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+from cache import TTLCache
+from config import ARTIFACT_CACHE_PATH, ARTIFACT_CACHE_SIZE, ARTIFACT_MAX_AGE
+from metrics import REGISTRY
+
+
+def source_hash(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()[:16]
+
+
+class ArtifactStore:
+    """Per-ticker results (market data, news analysis, risk assessment) kept while fresh.
+
+    Derived artifacts record a hash of the context they were computed from and are only
+    reused for that same context, so re-fetched market data always gets a fresh analysis.
+    """
+
+    def __init__(self, cache: Optional[TTLCache] = None, max_age: float = ARTIFACT_MAX_AGE):
+        self.cache = cache or TTLCache("artifacts", max_entries=ARTIFACT_CACHE_SIZE, path=ARTIFACT_CACHE_PATH)
+        self.max_age = max_age
+
+    def get(self, ticker: str, kind: str, source: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """{"value", "created_at"} for a fresh artifact built from source, else None."""
+        entry = self.cache.get(f"{kind}:{ticker.upper()}")
+        if entry is None or (source is not None and entry.get("source") != source_hash(source)):
+            return None
+        REGISTRY.inc("artifact_reuse_total", "Per-ticker artifacts reused instead of recomputed", kind=kind)
+        return entry
+
+    def put(self, ticker: str, kind: str, value: Any, source: Optional[str] = None) -> float:
+        created_at = time.time()
+        entry = {"value": value, "created_at": created_at, "source": source_hash(source) if source is not None else None}
+        self.cache.set(f"{kind}:{ticker.upper()}", entry, self.max_age)
+        return created_at
+
+    def renew(self, ticker: str, kind: str, max_age: Optional[float] = None) -> bool:
+        """Keep an artifact whose sources are known to be unchanged for another max_age seconds."""
+        key = f"{kind}:{ticker.upper()}"
+        entry = self.cache.get(key)
+        if entry is None:
+            return False
+        self.cache.set(key, entry, max_age or self.max_age)
+        return True
+
+    def discard(self, ticker: str, kind: str) -> None:
+        self.cache.delete(f"{kind}:{ticker.upper()}")
+
+    def clear(self) -> None:
+        self.cache.clear()
+
+
+@lru_cache(maxsize=None)
+def default_artifacts() -> ArtifactStore:
+    return ArtifactStore()
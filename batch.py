@@ -0,0 +1,86 @@
+import json
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import IO, Iterable, List
+
+from config import BATCH_CONCURRENCY
+
+
+def read_queries(lines: Iterable[str]) -> List[str]:
+    """One query or bare ticker per line; blank lines and # comments are skipped."""
+    queries = []
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            queries.append(line)
+    return queries
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_batch(workflow, queries: List[str], output: IO[str], concurrency: int = BATCH_CONCURRENCY) -> dict:
+    """Run every query through one shared workflow, writing a JSONL record as each finishes."""
+    latencies: List[float] = []
+    failed = 0
+
+    def run_one(query: str) -> dict:
+        started = time.perf_counter()
+        run_id = uuid.uuid4().hex
+        try:
+            final_state = workflow.run(query, run_id=run_id)
+            record = {
+                "query": query,
+                "tickers": final_state.get("query", {}).get("tickers", []),
+                "executive_summary": final_state.get("executive_summary"),
+                "comparison_dashboard": final_state.get("comparison_dashboard"),
+                "validation_result": final_state.get("validation_result"),
+                "skipped": final_state.get("skipped", []),
+                "error_messages": final_state.get("error_messages", []),
+                "tokens_saved": sum(final_state.get("tokens_saved", {}).values()),
+                "metrics": final_state.get("metrics"),
+            }
+        except Exception as e:
+            record = {"query": query, "error_messages": [f"A critical error occurred: {str(e)}"]}
+        # Failed runs can be picked up again with `run_cli.py --resume RUN_ID`
+        record["run_id"] = run_id
+        record["latency_s"] = round(time.perf_counter() - started, 3)
+        return record
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = [pool.submit(run_one, query) for query in queries]
+        for future in as_completed(futures):
+            record = future.result()
+            latencies.append(record["latency_s"])
+            if record["error_messages"]:
+                failed += 1
+            output.write(json.dumps(record) + "\n")
+            output.flush()
+    elapsed = time.perf_counter() - started
+
+    return {
+        "queries": len(queries),
+        "succeeded": len(queries) - failed,
+        "failed": failed,
+        "wall_time_s": elapsed,
+        "throughput_per_min": len(queries) / elapsed * 60 if elapsed else 0.0,
+        "latency_p50_s": percentile(latencies, 50),
+        "latency_p95_s": percentile(latencies, 95),
+        "latency_max_s": max(latencies, default=0.0),
+    }
+
+
+def format_summary(summary: dict) -> str:
+    return (
+        f"📦 Batch complete: {summary['succeeded']}/{summary['queries']} succeeded, {summary['failed']} failed\n"
+        f"⏱️ Wall time {summary['wall_time_s']:.1f}s, throughput {summary['throughput_per_min']:.1f} queries/min\n"
+        f"📈 Latency p50 {summary['latency_p50_s']:.1f}s, p95 {summary['latency_p95_s']:.1f}s, "
+        f"max {summary['latency_max_s']:.1f}s"
+    )
@@ -0,0 +1,128 @@
+"""Combined-analysis benchmark: one structured call per ticker for news and risk, against one each.
+
+Runs every query through both graphs offline, with the same stand-ins as pipeline.py, and
+compares the news/risk stage: LLM calls, prompt and completion tokens, estimated cost, and
+its wall time alongside whole-run latency. Artifacts and caches are cleared before every run,
+so each one really analyzes.
+
+The stand-ins answer after a fixed latency, so the timings count round trips, not generation
+time; token counts come from the actual prompts and (synthetic or recorded) answers.
+
+    python benchmarks/combined.py --runs 3 --llm-latency-ms 800
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS)
+
+from pipeline import DEFAULT_CASSETTE, DEFAULT_QUERIES, install_stand_ins  # noqa: E402
+
+from artifacts import default_artifacts  # noqa: E402
+from batch import percentile, read_queries  # noqa: E402
+from config import MARKET_DATA_MODE  # noqa: E402
+from workflow import Workflow  # noqa: E402
+
+from fakes import Cassette, CallStats  # noqa: E402
+
+# The news/risk stage of each graph: its nodes and the agents whose LLM calls it makes
+STAGES = {
+    "two-node": (("analyze_news", "assess_risk"), ("news_sentiment", "risk_assessment")),
+    "combined": (("analyze_stocks",), ("combined_analysis",)),
+}
+
+
+def run_variant(name: str, queries: list, args) -> dict:
+    nodes, agents = STAGES[name]
+    workflow = Workflow(market_data_mode=args.market_data_mode, combined_analysis=name == "combined")
+
+    runs = []
+    for query in queries:
+        default_artifacts().clear()
+        with contextlib.redirect_stdout(io.StringIO()):
+            state = workflow.run(query)
+        metrics = state["metrics"]
+        llm = [metrics["llm"].get(agent, {}) for agent in agents]
+        runs.append({
+            "calls": sum(values.get("calls", 0) for values in llm),
+            "prompt_tokens": sum(values.get("prompt_tokens", 0) for values in llm),
+            "completion_tokens": sum(values.get("completion_tokens", 0) for values in llm),
+            "cost_usd": sum(values.get("cost_usd", 0.0) for values in llm),
+            # The two-node branches run side by side, so the stage takes as long as the slower one
+            "stage_s": max(metrics["nodes"].get(node, {}).get("seconds", 0.0) for node in nodes),
+            "run_s": metrics["wall_time_s"],
+        })
+
+    count = len(runs)
+    stage = [run["stage_s"] for run in runs]
+    latency = [run["run_s"] for run in runs]
+    return {
+        "variant": name,
+        "runs": count,
+        "calls": round(sum(run["calls"] for run in runs) / count, 2),
+        "prompt_tokens": round(sum(run["prompt_tokens"] for run in runs) / count, 1),
+        "completion_tokens": round(sum(run["completion_tokens"] for run in runs) / count, 1),
+        "cost_usd": round(sum(run["cost_usd"] for run in runs) / count, 6),
+        "stage_p50_s": round(percentile(stage, 50), 3),
+        "stage_p95_s": round(percentile(stage, 95), 3),
+        "latency_p50_s": round(percentile(latency, 50), 3),
+        "latency_p95_s": round(percentile(latency, 95), 3),
+    }
+
+
+def format_comparison(results: list) -> str:
+    lines = [
+        f"{'per run':<18}" + "".join(f"{result['variant']:>14}" for result in results),
+        f"{'LLM calls':<18}" + "".join(f"{result['calls']:>14.2f}" for result in results),
+        f"{'prompt tokens':<18}" + "".join(f"{result['prompt_tokens']:>14,.0f}" for result in results),
+        f"{'completion tokens':<18}" + "".join(f"{result['completion_tokens']:>14,.0f}" for result in results),
+        f"{'cost':<18}" + "".join(f"{'$' + format(result['cost_usd'], '.5f'):>14}" for result in results),
+        f"{'stage p50 / p95':<18}"
+        + "".join(f"{result['stage_p50_s']:>7.2f}/{result['stage_p95_s']:.2f}s" for result in results),
+        f"{'run p50 / p95':<18}"
+        + "".join(f"{result['latency_p50_s']:>7.2f}/{result['latency_p95_s']:.2f}s" for result in results),
+    ]
+    two_node, combined = results
+    if two_node["prompt_tokens"]:
+        saved = 1 - combined["prompt_tokens"] / two_node["prompt_tokens"]
+        lines.append(f"\nCombined sends {saved:.0%} fewer prompt tokens for news and risk")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", metavar="FILE", help="One query per line (default: a built-in mix)")
+    parser.add_argument("--runs", type=int, default=3, help="Times each query is run per variant")
+    parser.add_argument("--llm-latency-ms", type=float, default=800.0)
+    parser.add_argument("--search-latency-ms", type=float, default=0.0)
+    parser.add_argument("--cassette", default=DEFAULT_CASSETTE)
+    parser.add_argument("--market-data-mode", choices=["fast", "react"], default=MARKET_DATA_MODE)
+    parser.add_argument("--json", metavar="FILE", help="Also write the results as JSON")
+    args = parser.parse_args()
+    # Cached answers would hide the calls being compared
+    args.record, args.no_cache, args.share_market_data = False, True, False
+
+    if args.queries:
+        with open(args.queries) as f:
+            queries = read_queries(f)
+    else:
+        queries = DEFAULT_QUERIES
+
+    install_stand_ins(args, Cassette(args.cassette), CallStats())
+    with contextlib.redirect_stdout(io.StringIO()):
+        Workflow(combined_analysis=True).run(queries[0])
+
+    results = [run_variant(name, queries * args.runs, args) for name in STAGES]
+    print(format_comparison(results))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"variants": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""Deterministic, offline stand-ins for the OpenAI chat models, Tavily and DeepEval.
+
+Responses are replayed from a JSON cassette keyed on the agent and the exact messages it
+was sent. Anything the cassette has no entry for gets a synthetic response shaped like
+the real one, so the whole graph runs with no keys and no network. In record mode the
+same stand-ins call the real services and write what they answer into the cassette.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter
+from typing import Any, List, Optional
+
+from langchain_core.callbacks import CallbackManagerForLLMRun, CallbackManagerForToolRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage, message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import BaseTool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import BaseModel, Field
+
+from compression import count_tokens
+from search import normalize_query
+
+
+class CallStats:
+    """Thread-safe count of the calls each stand-in answered, and from where."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls: Counter = Counter()
+        self.sources: Counter = Counter()
+
+    def record(self, name: str, source: str) -> None:
+        with self._lock:
+            self.calls[name] += 1
+            self.sources[source] += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self.calls.clear()
+            self.sources.clear()
+
+
+class Cassette:
+    """Recorded responses on disk as {key: payload} JSON."""
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self._lock = threading.Lock()
+        self.entries: dict = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.entries = json.load(f)
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            return self.entries.get(key)
+
+    def put(self, key: str, value: Any) -> None:
+        with self._lock:
+            self.entries[key] = value
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self._lock, open(self.path, "w") as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True)
+
+
+def _digest(value: Any) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()[:24]
+
+
+def _seed(text: str) -> int:
+    return int(hashlib.sha256(text.encode()).hexdigest()[:8], 16)
+
+
+def synthetic_value(schema: dict, name: str = "") -> Any:
+    """A plausible value for one JSON-schema property: the first quoted option, or a fixed number."""
+    options = re.findall(r"""["']([a-z]+)["']""", schema.get("description", ""))
+    kind = schema.get("type") or next(
+        (option.get("type") for option in schema.get("anyOf", []) if option.get("type") != "null"), "string"
+    )
+    if kind == "string":
+        return options[0] if options else f"synthetic {name}".strip()
+    if kind == "number":
+        return 0.8
+    if kind == "integer":
+        return 5
+    if kind == "boolean":
+        return True
+    if kind == "array":
+        return [synthetic_value(schema.get("items", {}), name) for _ in range(2)]
+    if kind == "object":
+        return {key: synthetic_value(value, key) for key, value in schema.get("properties", {}).items()}
+    return None
+
+
+def synthetic_market_text(query: str) -> List[dict]:
+    """Search results for a stock query, overlapping the way real results do."""
+    ticker = next(iter(re.findall(r"\b[A-Z][A-Z.]{0,5}\b", query)), "STOCK")
+    seed = _seed(ticker)
+    price = 50 + seed % 400 + (seed % 100) / 100
+    cap = 20 + seed % 2900
+    pe = 10 + seed % 60
+    beta = 0.6 + (seed % 120) / 100
+    facts = [
+        f"{ticker} stock price is ${price:.2f}, with a market cap of ${cap} billion.",
+        f"The P/E ratio for {ticker} stands at {pe} and its beta is {beta:.2f}.",
+        f"{ticker} reported quarterly revenue growth of {seed % 30}% year over year.",
+        f"Analysts raised their price target on {ticker} after the latest earnings call.",
+        f"{ticker}'s primary business spans products, services and licensing revenue streams.",
+        "Subscribe to our newsletter for the latest market updates.",
+    ]
+    return [
+        {
+            "title": f"{ticker} market update {i + 1}",
+            "url": f"https://example.com/{ticker.lower()}/{i + 1}",
+            "content": " ".join(facts[i % 3:] + facts[:i % 3]),
+        }
+        for i in range(5)
+    ]
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model that replays a cassette, falls back to synthetic answers, or records a real model."""
+
+    agent: str
+    cassette: Any
+    stats: Any
+    model: str = "gpt-4o-mini"
+    latency: float = 0.0
+    inner: Any = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat-model"
+
+    @property
+    def _identifying_params(self) -> dict:
+        # "model" is what the metrics price tokens by
+        return {"agent": self.agent, "model": self.model}
+
+    def bind_tools(self, tools: List[Any], tool_choice: Optional[str] = None, **kwargs: Any):
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], tool_choice=tool_choice, **kwargs)
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        tools: Optional[List[dict]] = None,
+        tool_choice: Optional[str] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        key = f"llm:{self.agent}:" + _digest([
+            [[m.type, m.content, [(c["name"], c["args"]) for c in getattr(m, "tool_calls", [])]] for m in messages],
+            [tool["function"]["name"] for tool in tools or []],
+        ])
+
+        recorded = self.cassette.get(key)
+        if recorded is not None:
+            message, source = messages_from_dict([recorded])[0], "replayed"
+            time.sleep(self.latency)
+        elif self.inner is not None:
+            model = self.inner.bind_tools(tools, tool_choice=tool_choice) if tools else self.inner
+            message, source = model.invoke(messages), "recorded"
+            self.cassette.put(key, message_to_dict(message))
+        else:
+            message, source = self._synthesize(messages, tools or []), "synthetic"
+            time.sleep(self.latency)
+
+        self.stats.record(self.agent, source)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _synthesize(self, messages: List[BaseMessage], tools: List[dict]) -> AIMessage:
+        prompt = "\n".join(str(m.content) for m in messages)
+        tool_calls, content = [], ""
+
+        if tools and self.agent != "market_data":
+            # Structured output: one call of the schema "tool"
+            function = tools[0]["function"]
+            properties = function.get("parameters", {}).get("properties", {})
+            args = {name: synthetic_value(schema, name) for name, schema in properties.items()}
+            tool_calls = [{"name": function["name"], "args": args, "id": f"call_{_digest(args)}"}]
+        elif tools and not any(isinstance(m, ToolMessage) for m in messages):
+            # ReAct: search once, then answer from what came back
+            ticker = next(iter(re.findall(r"ticker (\S+?)\.?\s", prompt)), "STOCK")
+            args = {"query": f"{ticker} stock price market cap P/E ratio beta latest news"}
+            tool_calls = [{"name": tools[0]["function"]["name"], "args": args, "id": f"call_{_digest(args)}"}]
+        elif tools:
+            content = "\n\n".join(str(m.content) for m in messages if isinstance(m, ToolMessage))
+        elif self.agent == "market_data":
+            # Fast-mode write-up: hand back the search results it was given
+            content = prompt.split("Search results:", 1)[-1].strip()
+        elif self.agent == "query_parser":
+            query = next(iter(re.findall(r'query: "(.*)"', prompt)), "")
+            tickers = [t for t in re.findall(r"\b[A-Z]{1,5}\b", query) if t not in {"I", "A", "AND", "OR", "VS"}]
+            content = json.dumps({
+                "tickers": tickers, "company_names": tickers, "is_comparison": len(tickers) > 1,
+                "query_intent": "synthetic",
+            })
+        else:
+            words = re.findall(r"[A-Za-z]+", prompt)
+            rng = _seed(prompt)
+            content = " ".join(words[(rng + i * 7) % len(words)] for i in range(150)) if words else "synthetic"
+
+        output = content or json.dumps([call["args"] for call in tool_calls])
+        return AIMessage(
+            content=content,
+            tool_calls=tool_calls,
+            usage_metadata={
+                "input_tokens": count_tokens(prompt),
+                "output_tokens": count_tokens(output),
+                "total_tokens": count_tokens(prompt) + count_tokens(output),
+            },
+        )
+
+
+class SearchInput(BaseModel):
+    query: str = Field(description="Search query to look up")
+
+
+class FakeSearchTool(BaseTool):
+    """Tavily stand-in with the same name and result shape."""
+
+    name: str = "tavily_search"
+    description: str = "A search engine optimized for comprehensive, accurate, and trusted results."
+    args_schema: type = SearchInput
+    cassette: Any
+    stats: Any
+    latency: float = 0.0
+    inner: Any = None
+
+    def _run(self, query: str, run_manager: Optional[CallbackManagerForToolRun] = None, **kwargs: Any) -> dict:
+        key = f"search:{normalize_query(query)}"
+
+        recorded = self.cassette.get(key)
+        if recorded is not None:
+            result, source = recorded, "replayed"
+            time.sleep(self.latency)
+        elif self.inner is not None:
+            result, source = self.inner.invoke({"query": query}), "recorded"
+            if isinstance(result, dict) and "error" not in result:
+                self.cassette.put(key, result)
+        else:
+            result, source = {"query": query, "results": synthetic_market_text(query)}, "synthetic"
+            time.sleep(self.latency)
+
+        self.stats.record("tavily", source)
+        return result
+
+
+class FakeMetric:
+    """DeepEval metric stand-in that always passes after the injected latency."""
+
+    def __init__(self, stats: CallStats, latency: float = 0.0, score: float = 1.0):
+        self.stats = stats
+        self.latency = latency
+        self.score = score
+
+    def measure(self, test_case: Any, *args: Any, **kwargs: Any) -> float:
+        time.sleep(self.latency)
+        self.stats.record("deepeval", "synthetic")
+        return self.score
+
+    async def a_measure(self, test_case: Any, *args: Any, **kwargs: Any) -> float:
+        await asyncio.sleep(self.latency)
+        self.stats.record("deepeval", "synthetic")
+        return self.score
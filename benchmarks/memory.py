@@ -0,0 +1,156 @@
+"""Memory benchmark: what one run costs to hold, snapshot and checkpoint.
+
+Runs the workflow offline, with the same stand-ins as pipeline.py, checkpointing to a scratch
+SQLite file. For a sequential and a concurrent pass it reports, per run:
+- the serialized size of the final state, as stored (market data as blob handles) and with the
+  market data inlined, as LangGraph would otherwise snapshot it at every step
+- the checkpoint bytes written
+- traced memory retained while the finished states are held, and the peak while running
+- how much text the blob store holds, against how much the runs referred to
+
+    python benchmarks/memory.py --runs 5 --concurrency 8
+"""
+import argparse
+import contextlib
+import dataclasses
+import io
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS)
+os.environ["BLOB_STORE_PATH"] = ""
+
+from pipeline import DEFAULT_CASSETTE, DEFAULT_QUERIES, install_stand_ins  # noqa: E402
+
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer  # noqa: E402
+
+from artifacts import default_artifacts  # noqa: E402
+from batch import read_queries  # noqa: E402
+from blobs import default_blobs, is_handle  # noqa: E402
+from config import MARKET_DATA_MODE  # noqa: E402
+from workflow import Workflow  # noqa: E402
+
+from fakes import Cassette, CallStats  # noqa: E402
+
+SERDE = JsonPlusSerializer()
+
+
+def state_bytes(state: dict) -> int:
+    return len(SERDE.dumps_typed(state)[1])
+
+
+def inlined(state: dict) -> dict:
+    """The state as it looked with plain per-ticker dicts holding the market data text."""
+    blobs = default_blobs()
+    stocks_data = {
+        ticker: {key: blobs.resolve(value) for key, value in dataclasses.asdict(data).items()}
+        for ticker, data in state.get("stocks_data", {}).items()
+    }
+    return {**state, "stocks_data": stocks_data}
+
+
+def checkpoint_bytes(path: str, run_id: str) -> int:
+    with sqlite3.connect(path) as db:
+        checkpoints = db.execute(
+            "SELECT COALESCE(SUM(LENGTH(checkpoint) + LENGTH(metadata)), 0) FROM checkpoints WHERE thread_id = ?",
+            (run_id,),
+        ).fetchone()[0]
+        writes = db.execute(
+            "SELECT COALESCE(SUM(LENGTH(value)), 0) FROM writes WHERE thread_id = ?", (run_id,)
+        ).fetchone()[0]
+    return checkpoints + writes
+
+
+def run_scenario(name: str, queries: list, concurrency: int, args, cassette: Cassette, stats: CallStats) -> dict:
+    default_artifacts().clear()
+    default_blobs().clear()
+    install_stand_ins(args, cassette, stats)
+    stats.reset()
+
+    checkpoints = os.path.join(tempfile.mkdtemp(prefix="bench-checkpoints-"), "checkpoints.sqlite")
+    workflow = Workflow(checkpoint_path=checkpoints, market_data_mode=args.market_data_mode)
+    workflow.app  # compiled up front, so the checkpointer isn't counted against the first run
+
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        states = list(pool.map(lambda query: workflow.run(query), queries))
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    stored = [state_bytes({k: v for k, v in state.items() if k != "metrics"}) for state in states]
+    inline = [state_bytes(inlined({k: v for k, v in state.items() if k != "metrics"})) for state in states]
+    referenced = sum(
+        len(default_blobs().resolve(data.market_data))
+        for state in states for data in state["stocks_data"].values() if is_handle(data.market_data)
+    )
+    runs = len(states)
+    return {
+        "scenario": name,
+        "concurrency": concurrency,
+        "runs": runs,
+        "state_kb": round(sum(stored) / runs / 1024, 2),
+        "state_inlined_kb": round(sum(inline) / runs / 1024, 2),
+        "checkpoint_kb": round(sum(checkpoint_bytes(checkpoints, s["run_id"]) for s in states) / runs / 1024, 1),
+        "retained_kb": round((retained - baseline) / runs / 1024, 1),
+        "peak_traced_mb": round((peak - baseline) / 2**20, 1),
+        "blob_store_kb": round(default_blobs().nbytes / 1024, 1),
+        "blobs": len(default_blobs()),
+        "referenced_kb": round(referenced / 1024, 1),
+    }
+
+
+def format_scenario(result: dict) -> str:
+    return "\n".join([
+        f"== {result['scenario']}: {result['runs']} runs, {result['concurrency']} workers ==",
+        f"state        {result['state_kb']:.2f} KB per snapshot  "
+        f"({result['state_inlined_kb']:.2f} KB with market data inlined)",
+        f"checkpoints  {result['checkpoint_kb']:.1f} KB written per run",
+        f"memory       {result['retained_kb']:.1f} KB retained per run, {result['peak_traced_mb']:.1f} MB peak traced",
+        f"blob store   {result['blob_store_kb']:.1f} KB in {result['blobs']} blobs for "
+        f"{result['referenced_kb']:.1f} KB referenced",
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", metavar="FILE", help="One query per line (default: a built-in mix)")
+    parser.add_argument("--runs", type=int, default=3, help="Times each query is run per scenario")
+    parser.add_argument("--concurrency", type=int, default=8, help="Workers for the concurrent scenario")
+    parser.add_argument("--cassette", default=DEFAULT_CASSETTE)
+    parser.add_argument("--market-data-mode", choices=["fast", "react"], default=MARKET_DATA_MODE)
+    parser.add_argument("--json", metavar="FILE", help="Also write the results as JSON")
+    args = parser.parse_args()
+    # Latency doesn't change what is held, so the stand-ins answer at once
+    args.llm_latency_ms = args.search_latency_ms = 0.0
+    args.record = args.no_cache = False
+
+    if args.queries:
+        with open(args.queries) as f:
+            queries = read_queries(f)
+    else:
+        queries = DEFAULT_QUERIES
+
+    cassette, stats = Cassette(args.cassette), CallStats()
+    with contextlib.redirect_stdout(io.StringIO()):
+        run_scenario("warm-up", queries[:1], 1, args, cassette, stats)
+
+    results = []
+    for name, concurrency in (("sequential", 1), ("concurrent", max(1, args.concurrency))):
+        with contextlib.redirect_stdout(io.StringIO()):
+            results.append(run_scenario(name, queries * args.runs, concurrency, args, cassette, stats))
+        print(format_scenario(results[-1]) + "\n")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"scenarios": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""Offline pipeline benchmark: run Workflow end to end against recorded or synthetic LLM/Tavily answers.
+
+Needs no API keys or network. Chat models and Tavily are replaced by stand-ins that replay
+a cassette (synthesizing anything it lacks) after a fixed injected latency, and DeepEval
+scoring by a stand-in that always passes. Reports latency percentiles, throughput, per-node
+timings, call counts and peak memory for a sequential and a concurrent pass.
+
+    python benchmarks/pipeline.py --runs 3 --concurrency 8 --llm-latency-ms 800 --search-latency-ms 1200
+    python benchmarks/pipeline.py --record   # real keys: call the services and refresh the cassette
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Keep every cache in memory and fundamentals in a scratch directory, so runs don't touch
+# (or get sped up by) the real .cache/
+os.environ["LLM_CACHE_PATH"] = ""
+os.environ["SEARCH_CACHE_PATH"] = ""
+os.environ["ARTIFACT_CACHE_PATH"] = ""
+os.environ["REPORT_CACHE_PATH"] = ""
+os.environ["CHECKPOINT_PATH"] = ""
+os.environ["BLOB_STORE_PATH"] = ""
+os.environ["FUNDAMENTALS_STORE_DIR"] = tempfile.mkdtemp(prefix="bench-fundamentals-")
+os.environ.setdefault("DEEPEVAL_TELEMETRY_OPT_OUT", "YES")
+# The stand-ins have no rate limits to respect; set TAVILY_RPM to measure throttling
+os.environ.setdefault("TAVILY_RPM", "0")
+
+from langchain_core.callbacks import BaseCallbackHandler  # noqa: E402
+
+import llm  # noqa: E402
+import search  # noqa: E402
+from agents import NewsSentimentAgent, RiskAssessmentAgent, ValidationAgent  # noqa: E402
+from batch import percentile, read_queries  # noqa: E402
+from cache import TTLCache  # noqa: E402
+from config import LLM_CACHE_SIZE, MARKET_DATA_MODE, SEARCH_CACHE_SIZE  # noqa: E402
+from artifacts import default_artifacts  # noqa: E402
+from fundamentals import default_store  # noqa: E402
+from workflow import Workflow  # noqa: E402
+
+from fakes import Cassette, CallStats, FakeChatModel, FakeMetric, FakeSearchTool  # noqa: E402
+
+DEFAULT_CASSETTE = os.path.join(ROOT, "benchmarks", "cassettes", "pipeline.json")
+
+DEFAULT_QUERIES = [
+    "Analyze AAPL",
+    "Compare Apple and Microsoft",
+    "NVDA vs AMD stock analysis",
+    "What is the risk profile for Tesla?",
+]
+
+
+class NodeTimer(BaseCallbackHandler):
+    """Wall time of every run of the given graph nodes, collected from LangChain callbacks."""
+
+    def __init__(self, nodes):
+        self.nodes = set(nodes)
+        self._lock = threading.Lock()
+        self._started: dict = {}
+        self.timings = defaultdict(list)
+
+    def on_chain_start(self, serialized, inputs, *, run_id, metadata=None, **kwargs):
+        node = (metadata or {}).get("langgraph_node")
+        # Nested graphs (the ReAct agent) report their own nodes; only count ours
+        if node in self.nodes and kwargs.get("name") == node:
+            with self._lock:
+                self._started[run_id] = (node, time.perf_counter())
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        with self._lock:
+            started = self._started.pop(run_id, None)
+            if started:
+                node, t0 = started
+                self.timings[node].append(time.perf_counter() - t0)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self.on_chain_end(None, run_id=run_id)
+
+
+def install_stand_ins(args, cassette: Cassette, stats: CallStats) -> None:
+    """Point llm/search/DeepEval at the stand-ins, with fresh in-memory caches."""
+    llm_latency, search_latency = args.llm_latency_ms / 1000, args.search_latency_ms / 1000
+
+    def chat_model(agent: str, **kwargs):
+        inner = None
+        if args.record:
+            from langchain_openai import ChatOpenAI
+
+            llm.require_api_keys()
+            real = {k: v for k, v in kwargs.items() if k != "cache"}
+            real["api_key"] = llm.OPENAI_API_KEY
+            if llm.OPENAI_API_BASE:
+                real["base_url"] = llm.OPENAI_API_BASE
+            inner = ChatOpenAI(**real)
+        cache = False if args.no_cache else kwargs["cache"]
+        return FakeChatModel(
+            agent=agent, cassette=cassette, stats=stats, model=kwargs["model"], latency=llm_latency, inner=inner,
+            cache=cache, callbacks=kwargs.get("callbacks"),
+        )
+
+    llm.set_response_cache(llm.LLMResponseCache(TTLCache("bench_llm", max_entries=LLM_CACHE_SIZE)))
+    llm.set_chat_model_factory(chat_model)
+
+    inner_search = None
+    if args.record:
+        from langchain_tavily import TavilySearch
+
+        search.require_api_keys()
+        inner_search = TavilySearch(max_results=7, tavily_api_key=search.TAVILY_API_KEY)
+    tool = FakeSearchTool(cassette=cassette, stats=stats, latency=search_latency, inner=inner_search)
+    if not args.no_cache:
+        tool = search.cached_search(tool, TTLCache("bench_search", max_entries=SEARCH_CACHE_SIZE))
+    search.set_search_tool(tool)
+
+    # DeepEval builds its own OpenAI client, so its metrics are swapped out at the agents
+    NewsSentimentAgent._make_validator = lambda self: FakeMetric(stats, llm_latency)
+    RiskAssessmentAgent._make_validator = lambda self: FakeMetric(stats, llm_latency)
+
+    async def measure(self, test_case, faith_test=None):
+        faithfulness, relevancy = FakeMetric(stats, llm_latency), FakeMetric(stats, llm_latency)
+        jobs = [ValidationAgent._timed_measure("answer_relevancy", relevancy, test_case)]
+        if faith_test is not None:
+            jobs.append(ValidationAgent._timed_measure("faithfulness", faithfulness, faith_test))
+        await asyncio.gather(*jobs)
+        return (faithfulness.score if faith_test is not None else None), relevancy.score
+
+    ValidationAgent._measure = measure
+
+
+def run_scenario(name: str, queries: list, concurrency: int, args, cassette: Cassette, stats: CallStats) -> dict:
+    store = default_store()
+    shutil.rmtree(store.directory, ignore_errors=True)
+    os.makedirs(store.directory, exist_ok=True)
+    default_artifacts().clear()
+    install_stand_ins(args, cassette, stats)
+    stats.reset()
+
+    workflow = Workflow(share_market_data=args.share_market_data, market_data_mode=args.market_data_mode,
+                        deadline=args.deadline)
+    timer = NodeTimer(workflow.graph.nodes)
+
+    def run_one(query: str):
+        started = time.perf_counter()
+        state = workflow.run(query, config={"callbacks": [timer]})
+        return time.perf_counter() - started, bool(state.get("error_messages"))
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(run_one, queries))
+    wall = time.perf_counter() - started
+    _, peak_traced = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies = [latency for latency, _ in results]
+    return {
+        "scenario": name,
+        "concurrency": concurrency,
+        "runs": len(queries),
+        "failed": sum(failed for _, failed in results),
+        "wall_time_s": round(wall, 3),
+        "throughput_per_min": round(len(queries) / wall * 60, 2) if wall else 0.0,
+        "latency_p50_s": round(percentile(latencies, 50), 3),
+        "latency_p95_s": round(percentile(latencies, 95), 3),
+        "latency_max_s": round(max(latencies, default=0.0), 3),
+        "nodes": {
+            node: {
+                "runs": len(times),
+                "p50_ms": round(percentile(times, 50) * 1000, 1),
+                "p95_ms": round(percentile(times, 95) * 1000, 1),
+            }
+            for node, times in timer.timings.items()
+        },
+        "calls": dict(stats.calls),
+        "call_sources": dict(stats.sources),
+        "peak_traced_mb": round(peak_traced / 2**20, 1),
+    }
+
+
+def format_scenario(result: dict) -> str:
+    calls = ", ".join(f"{name} {count}" for name, count in sorted(result["calls"].items())) or "none"
+    sources = ", ".join(f"{source} {count}" for source, count in sorted(result["call_sources"].items())) or "none"
+    lines = [
+        f"== {result['scenario']}: {result['runs']} runs, {result['concurrency']} workers ==",
+        f"latency      p50 {result['latency_p50_s']:.2f}s  p95 {result['latency_p95_s']:.2f}s  "
+        f"max {result['latency_max_s']:.2f}s",
+        f"throughput   {result['throughput_per_min']:.1f} runs/min  ({result['wall_time_s']:.1f}s wall, "
+        f"{result['failed']} failed)",
+        f"calls        {calls}",
+        f"answered     {sources}",
+        f"peak memory  {result['peak_traced_mb']:.1f} MB traced",
+        "nodes        p50 / p95 ms",
+    ]
+    for node, timing in result["nodes"].items():
+        lines.append(f"  {node:<22} {timing['p50_ms']:>8.1f} / {timing['p95_ms']:>8.1f}  ({timing['runs']} runs)")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", metavar="FILE", help="One query per line (default: a built-in mix)")
+    parser.add_argument("--runs", type=int, default=3, help="Times each query is run per scenario")
+    parser.add_argument("--concurrency", type=int, default=8, help="Workers for the concurrent scenario")
+    parser.add_argument("--llm-latency-ms", type=float, default=800.0)
+    parser.add_argument("--search-latency-ms", type=float, default=1200.0)
+    parser.add_argument("--cassette", default=DEFAULT_CASSETTE)
+    parser.add_argument("--record", action="store_true", help="Call the real services and save their answers")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the LLM and search caches")
+    parser.add_argument("--share-market-data", action="store_true", help="As in batch mode")
+    parser.add_argument("--market-data-mode", choices=["fast", "react"], default=MARKET_DATA_MODE)
+    parser.add_argument("--deadline", type=float, default=0.0, metavar="SECONDS",
+                        help="Per-run deadline, to see what degrades and what latency it buys (default: none)")
+    parser.add_argument("--json", metavar="FILE", help="Also write the results as JSON")
+    parser.add_argument("--verbose", action="store_true", help="Show the agents' progress output")
+    args = parser.parse_args()
+
+    if args.queries:
+        with open(args.queries) as f:
+            queries = read_queries(f)
+    else:
+        queries = DEFAULT_QUERIES
+
+    cassette, stats = Cassette(args.cassette), CallStats()
+    # One untimed run first, so lazy imports (DeepEval, LangGraph prebuilt) aren't billed to the first query
+    with contextlib.redirect_stdout(io.StringIO()):
+        run_scenario("warm-up", queries[:1], 1, args, cassette, stats)
+
+    scenarios = [("sequential", 1), ("concurrent", max(1, args.concurrency))]
+
+    results = []
+    for name, concurrency in scenarios:
+        output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+        with output:
+            results.append(run_scenario(name, queries * args.runs, concurrency, args, cassette, stats))
+        print(format_scenario(results[-1]) + "\n")
+
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"peak RSS {peak_rss_mb:.0f} MB")
+
+    if args.record:
+        cassette.save()
+        print(f"💾 Cassette saved to {args.cassette} ({len(cassette.entries)} entries)")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"scenarios": results, "peak_rss_mb": round(peak_rss_mb, 1)}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
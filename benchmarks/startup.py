@@ -0,0 +1,78 @@
+"""Cold-start benchmark: time `import workflow` and `Workflow()` in fresh interpreters.
+
+Exits non-zero when the median exceeds the budget or when construction pulls in a
+module that should only load on first use, so it can guard CI against regressions.
+
+    python benchmarks/startup.py --runs 5 --max-import-ms 1500 --max-construct-ms 100
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must not be imported just by building the graph
+LAZY_MODULES = ["deepeval", "openai", "langchain_openai", "langchain_tavily", "langgraph.prebuilt"]
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import workflow
+imported = time.perf_counter()
+workflow.Workflow()
+constructed = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "construct_ms": (constructed - imported) * 1000,
+    "loaded": [m for m in %r if m in sys.modules],
+}))
+""" % (LAZY_MODULES,)
+
+
+def measure_once() -> dict:
+    # No API keys: startup must not depend on them
+    env = {k: v for k, v in os.environ.items() if k not in ("OPENAI_API_KEY", "TAVILY_API_KEY")}
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-import-ms", type=float, default=1500.0)
+    parser.add_argument("--max-construct-ms", type=float, default=100.0)
+    args = parser.parse_args()
+
+    measure_once()  # warm the OS file cache and bytecode so runs are comparable
+    samples = [measure_once() for _ in range(args.runs)]
+
+    import_ms = statistics.median(s["import_ms"] for s in samples)
+    construct_ms = statistics.median(s["construct_ms"] for s in samples)
+    loaded = sorted({m for s in samples for m in s["loaded"]})
+
+    print(f"import workflow   median {import_ms:8.1f} ms  (budget {args.max_import_ms:.0f} ms)")
+    print(f"Workflow()        median {construct_ms:8.1f} ms  (budget {args.max_construct_ms:.0f} ms)")
+    print(f"eagerly loaded    {', '.join(loaded) or 'none'}")
+
+    failures = []
+    if import_ms > args.max_import_ms:
+        failures.append("import time over budget")
+    if construct_ms > args.max_construct_ms:
+        failures.append("construction time over budget")
+    if loaded:
+        failures.append(f"modules loaded at startup: {', '.join(loaded)}")
+
+    if failures:
+        print("❌ " + "; ".join(failures))
+        sys.exit(1)
+    print("✅ Startup within budget")
+
+
+if __name__ == "__main__":
+    main()
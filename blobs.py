@@ -0,0 +1,127 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Optional
+
+from config import BLOB_STORE_MAX_BYTES, BLOB_STORE_PATH, BLOB_STORE_TTL
+
+PREFIX = "blob:"
+
+
+def is_handle(value: Any) -> bool:
+    return isinstance(value, str) and value.startswith(PREFIX)
+
+
+class BlobStore:
+    """Content-addressed text, kept once however many runs refer to it.
+
+    Workflow state holds the short handle put() returns instead of the text, so LangGraph's
+    per-step snapshots and merges copy a few dozen bytes per payload. Payloads stay in memory up
+    to max_bytes, least recently used leaving first, and with a path also in SQLite, so a
+    checkpointed run can be resumed by another process.
+    """
+
+    # Disk pruning runs every PRUNE_INTERVAL writes rather than on each one
+    PRUNE_INTERVAL = 256
+    # A blob's disk timestamp moves to its latest put or get, at most once per RESTAMP_INTERVAL
+    # seconds, so pruning counts from when a run last used it rather than when it was first stored
+    RESTAMP_INTERVAL = 60 * 60
+
+    def __init__(self, max_bytes: int = BLOB_STORE_MAX_BYTES, path: Optional[str] = None, ttl: float = BLOB_STORE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.nbytes = 0
+        self._memory: OrderedDict[str, str] = OrderedDict()
+        self._stamped: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._db = None
+
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS blobs (key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    def put(self, text: str) -> str:
+        key = hashlib.sha256(text.encode()).hexdigest()
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+            else:
+                self._remember(key, text)
+            now = time.time()
+            if self._db is not None and now - self._stamped.get(key, 0.0) >= self.RESTAMP_INTERVAL:
+                # Text already on disk only has its timestamp moved on
+                self._db.execute(
+                    "INSERT INTO blobs (key, value, stored_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET stored_at = excluded.stored_at",
+                    (key, text, now),
+                )
+                self._stamped[key] = now
+                self._writes += 1
+                if self._writes % self.PRUNE_INTERVAL == 0:
+                    self._db.execute("DELETE FROM blobs WHERE stored_at <= ?", (now - self.ttl,))
+                self._db.commit()
+        return PREFIX + key
+
+    def get(self, handle: str) -> str:
+        """The text behind a handle; KeyError once it has left memory and there is no disk copy."""
+        key = handle[len(PREFIX):]
+        with self._lock:
+            text = self._memory.get(key)
+            if text is not None:
+                self._memory.move_to_end(key)
+                self._restamp(key)
+                return text
+            if self._db is not None:
+                row = self._db.execute("SELECT value FROM blobs WHERE key = ?", (key,)).fetchone()
+                if row:
+                    self._remember(key, row[0])
+                    self._restamp(key)
+                    return row[0]
+        raise KeyError(f"Blob {handle} is no longer stored")
+
+    def resolve(self, value: Any) -> Any:
+        """The text behind value if it is a handle; anything else (e.g. text from older checkpoints) as is."""
+        return self.get(value) if is_handle(value) else value
+
+    def __len__(self) -> int:
+        return len(self._memory)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._stamped.clear()
+            self.nbytes = 0
+            if self._db is not None:
+                self._db.execute("DELETE FROM blobs")
+                self._db.commit()
+
+    def _remember(self, key: str, text: str) -> None:
+        self._memory[key] = text
+        self.nbytes += len(text)
+        while self.nbytes > self.max_bytes and len(self._memory) > 1:
+            evicted_key, evicted = self._memory.popitem(last=False)
+            self._stamped.pop(evicted_key, None)
+            self.nbytes -= len(evicted)
+
+    def _restamp(self, key: str) -> None:
+        now = time.time()
+        if self._db is None or now - self._stamped.get(key, 0.0) < self.RESTAMP_INTERVAL:
+            return
+        self._db.execute("UPDATE blobs SET stored_at = ? WHERE key = ?", (now, key))
+        self._db.commit()
+        self._stamped[key] = now
+
+
+@lru_cache(maxsize=None)
+def default_blobs() -> BlobStore:
+    return BlobStore(path=BLOB_STORE_PATH)
@@ -0,0 +1,128 @@
+import re
+from typing import Iterable, List, NamedTuple
+
+import numpy as np
+
+from compression import SENTENCE_END
+from config import CLAIM_TOLERANCE
+from metrics import REGISTRY
+
+SCALES = {"k": 1e3, "thousand": 1e3, "m": 1e6, "million": 1e6, "b": 1e9, "bn": 1e9, "billion": 1e9,
+          "t": 1e12, "trillion": 1e12}
+
+NUMBER = re.compile(
+    r"(?P<currency>\$)?(?P<number>\d[\d,]*(?:\.\d+)?)\s?"
+    r"(?P<unit>%|percent\b|trillion\b|billion\b|million\b|thousand\b|bn\b|[kmbt]\b)?",
+    re.IGNORECASE,
+)
+
+# Capitalized abbreviations that are not tickers
+NOT_TICKERS = {
+    "AI", "API", "CEO", "CFO", "COO", "CTO", "EPS", "ETF", "EU", "EV", "FDA", "FTC", "GDP", "IPO", "IT", "LLC",
+    "NYSE", "PE", "Q1", "Q2", "Q3", "Q4", "SEC", "UK", "US", "USA", "USD", "YOY", "YTD", "ESG", "CPU", "GPU",
+    "AND", "OR", "VS", "THE", "NA", "BUY", "SELL", "HOLD", "NOT", "NEW", "TOP",
+}
+# Single capitals are skipped: they are far more often "P/E" or "S&P" than a ticker
+TICKER = re.compile(r"\b[A-Z]{2,5}(?:\.[A-Z])?\b")
+
+
+class Claim(NamedTuple):
+    text: str
+    # None for a ticker, the number (with its scale applied) otherwise
+    value: float | None
+    # Half a unit in the last place the claim was written to, e.g. 0.05 for "1.2"
+    rounding: float = 0.0
+
+
+class PreCheck(NamedTuple):
+    """Sentences of an output, by whether their claims all matched the context."""
+    verified: List[str]
+    unverified: List[str]
+    unchecked: List[str]
+    failed_claims: List[str]
+
+    @property
+    def claims_found(self) -> bool:
+        return bool(self.verified or self.unverified)
+
+
+def _numbers(text: str) -> Iterable[Claim]:
+    for match in NUMBER.finditer(text):
+        digits = match.group("number").replace(",", "")
+        value = float(digits)
+        unit = (match.group("unit") or "").lower()
+        decimals = len(digits.split(".")[1]) if "." in digits else 0
+        scale = SCALES.get(unit, 1.0)
+
+        # Counts, list numbering and years are not claims about the data
+        if not match.group("currency") and not unit and (
+            (decimals == 0 and value <= 10) or (decimals == 0 and 1900 <= value <= 2100)
+        ):
+            continue
+        yield Claim(match.group(0).strip(), value * scale, 0.5 * 10 ** -decimals * scale)
+
+
+def extract_claims(text: str) -> List[Claim]:
+    """Prices, percentages, ratios and tickers stated in text."""
+    claims = list(_numbers(text))
+    claims += [Claim(ticker, None) for ticker in TICKER.findall(text) if ticker not in NOT_TICKERS]
+    return claims
+
+
+def context_values(context: str) -> np.ndarray:
+    """Every number in the context, sorted, both as written and with any scale applied."""
+    values = []
+    for match in NUMBER.finditer(context):
+        value = float(match.group("number").replace(",", ""))
+        values.append(value)
+        unit = (match.group("unit") or "").lower()
+        if unit in SCALES:
+            values.append(value * SCALES[unit])
+    return np.unique(np.array(values, dtype=float))
+
+
+def matches(claim: Claim, values: np.ndarray, context: str) -> bool:
+    if claim.value is None:
+        return re.search(rf"\b{re.escape(claim.text)}\b", context) is not None
+    if not len(values):
+        return False
+    tolerance = max(abs(claim.value) * CLAIM_TOLERANCE, claim.rounding)
+    # The nearest context values sit on either side of the claim's insertion point
+    index = np.searchsorted(values, claim.value)
+    nearest = values[max(0, index - 1):index + 1]
+    return bool(np.any(np.abs(nearest - claim.value) <= tolerance))
+
+
+def precheck(output: str, context: str) -> PreCheck:
+    """Match the numbers and tickers in each sentence of output against context, within CLAIM_TOLERANCE."""
+    values = context_values(context)
+    verified, unverified, unchecked, failed = [], [], [], []
+    for line in output.splitlines():
+        for sentence in SENTENCE_END.split(line.strip()):
+            if not sentence:
+                continue
+            claims = extract_claims(sentence)
+            missing = [claim.text for claim in claims if not matches(claim, values, context)]
+            if not claims:
+                unchecked.append(sentence)
+            elif missing:
+                unverified.append(sentence)
+                failed += missing
+            else:
+                verified.append(sentence)
+
+    for outcome, count in (("verified", len(verified)), ("unverified", len(unverified)), ("unchecked", len(unchecked))):
+        if count:
+            REGISTRY.inc("precheck_sentences_total", "Sentences by local claim-check outcome", count, outcome=outcome)
+    return PreCheck(verified, unverified, unchecked, failed)
+
+
+def unsettled(check: PreCheck, strict: bool = False) -> List[str]:
+    """Sentences DeepEval still has to judge.
+
+    Always those with a claim that didn't match. Sentences without numbers or tickers are
+    included when strict, and otherwise only when nothing in the output was checkable.
+    """
+    if strict:
+        return check.unverified + check.unchecked
+    return check.unverified or ([] if check.claims_found else check.unchecked)
@@ -0,0 +1,115 @@
+import re
+from functools import lru_cache
+from typing import List
+
+# Web-page furniture rather than content, e.g. "Subscribe to our newsletter" or "Privacy Policy"
+_FURNITURE = (
+    r"(?:subscribe|sign up)(?: (?:now|today|for free))?(?: (?:to|for) (?:our|the|a) (?:free |daily |weekly )?newsletters?)?"
+    r"|(?:join|get) our (?:free |daily |weekly )?newsletters?"
+    r"|newsletters?|advertisement|sponsored"
+    r"|(?:click here(?: to)?|continue) read(?:ing)?(?: more)?|read more|click here"
+    r"|all rights reserved|terms of (?:use|service)|privacy policy|cookie (?:policy|settings)"
+    r"|accept(?: all)? cookies|log ?in|sign in|follow us"
+)
+# Notices that run to the end of their sentence, e.g. "We use cookies to improve your experience."
+_NOTICE = (
+    r"[\w&.,' ]{1,40}\. all rights reserved"
+    r"|(?:we use|this (?:site|website) uses) cookies\b[^.!?]*"
+    r"|(?:log ?in|sign in) to (?:continue|read|view)\b[^.!?]*"
+    r"|(?:please )?enable javascript\b[^.!?]*"
+    r"|follow us on [\w ,&]{1,40}"
+)
+# Lines made only of furniture, e.g. "Privacy Policy | Terms of Use", or of one notice
+BOILERPLATE = re.compile(rf"^\W*(?:(?:{_FURNITURE})(?:\W+(?:{_FURNITURE}))*|{_NOTICE})\W*$", re.IGNORECASE)
+DIGIT = re.compile(r"\d")
+TICKER_LIKE = re.compile(r"\b[A-Z]{2,5}(?:\.[A-Z])?\b")
+BARE_URL = re.compile(r"^\W*(https?://\S+|www\.\S+)\W*$")
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9$])")
+
+# Passages sharing at least this fraction of word shingles count as duplicates
+DUPLICATE_THRESHOLD = 0.7
+
+
+@lru_cache(maxsize=None)
+def _encoding():
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        # Not installed, or the encoding file can't be fetched (offline, no TIKTOKEN_CACHE_DIR)
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Token count with the gpt-4o tokenizer, or a 4-chars-per-token estimate when it is unavailable."""
+    encoding = _encoding()
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def split_passages(text: str) -> List[str]:
+    passages = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        # Long paragraphs dedupe better sentence by sentence
+        passages.extend(SENTENCE_END.split(line) if len(line) > 300 else [line])
+    return passages
+
+
+def _shingles(passage: str, size: int = 3) -> set:
+    words = re.findall(r"[a-z0-9$%]+(?:\.[a-z0-9]+)*", passage.lower())
+    if len(words) <= size:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _has_figures(passage: str) -> bool:
+    """Whether passage has a number, or a ticker-like word (capitals in a line that isn't all capitals)."""
+    return bool(DIGIT.search(passage) or not passage.isupper() and TICKER_LIKE.search(passage))
+
+
+def compress(text: str) -> str:
+    """Drop boilerplate lines and near-duplicate passages, keeping the first occurrence.
+
+    Only whole lines of boilerplate go; a line with a number or a ticker in it is always kept.
+    """
+    kept, kept_shingles = [], []
+    for passage in split_passages(text):
+        if BARE_URL.match(passage) or BOILERPLATE.match(passage) and not _has_figures(passage):
+            continue
+
+        shingles = _shingles(passage)
+        if any(
+            len(shingles & seen) / max(1, min(len(shingles), len(seen))) >= DUPLICATE_THRESHOLD
+            for seen in kept_shingles
+        ):
+            continue
+
+        kept.append(passage)
+        kept_shingles.append(shingles)
+    return "\n".join(kept)
+
+
+def fit_to_budget(text: str, budget: int) -> str:
+    """Keep whole passages from the top until the token budget is spent."""
+    if count_tokens(text) <= budget:
+        return text
+
+    kept, used = [], 0
+    for passage in text.split("\n"):
+        tokens = count_tokens(passage) + 1
+        if used + tokens > budget:
+            break
+        kept.append(passage)
+        used += tokens
+    return "\n".join(kept)
+
+
+def trim_context(text: str, budget: int) -> tuple[str, int]:
+    """fit_to_budget, also returning how many tokens were cut."""
+    trimmed = fit_to_budget(text, budget)
+    return trimmed, count_tokens(text) - count_tokens(trimmed)
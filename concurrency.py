@@ -0,0 +1,102 @@
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Tuple, TypeVar
+
+from config import MAX_CONCURRENCY
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def map_bounded(fn: Callable[[T], R], items: Iterable[T], max_workers: Optional[int] = None) -> List[R]:
+    """Apply fn to every item on a bounded thread pool, returning results in input order.
+
+    Each call runs in a copy of the caller's context so LangChain/LangGraph callbacks
+    (streaming, tracing) keep working inside worker threads.
+    """
+    items = list(items)
+    if not items:
+        return []
+
+    workers = max(1, min(max_workers or MAX_CONCURRENCY, len(items)))
+    if workers == 1:
+        return [fn(item) for item in items]
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(contextvars.copy_context().run, fn, item) for item in items]
+        return [future.result() for future in futures]
+
+
+@lru_cache(maxsize=None)
+def _background_loop() -> asyncio.AbstractEventLoop:
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="async-runner", daemon=True).start()
+    return loop
+
+
+def run_async(coro: Awaitable[R]) -> R:
+    """Run coro to completion on one long-lived event loop, from any thread.
+
+    Unlike asyncio.run, the loop outlives the call, so async HTTP clients pooled per loop
+    keep their connections between calls. coro runs in a copy of the caller's context.
+    """
+    loop = _background_loop()
+    result: Future = Future()
+
+    def hand_over(task: asyncio.Task) -> None:
+        if task.cancelled():
+            result.cancel()
+        elif task.exception() is not None:
+            result.set_exception(task.exception())
+        else:
+            result.set_result(task.result())
+
+    def start() -> None:
+        # A task copies the context it is created in: here, the caller's
+        loop.create_task(coro).add_done_callback(hand_over)
+
+    loop.call_soon_threadsafe(start, context=contextvars.copy_context())
+    return result.result()
+
+
+class SingleFlight:
+    """Collapse concurrent calls that share a key into one execution whose result everyone gets."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+
+    def begin(self, key: Hashable) -> Tuple[Future, bool]:
+        """Join the call in flight for key, or start one; the second value is True for the caller that must run it."""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+        return future, leader
+
+    def finish(self, key: Hashable, result: Any = None, error: Optional[BaseException] = None) -> None:
+        """Hand the leader's outcome to everyone waiting on key."""
+        with self._lock:
+            future = self._calls.pop(key)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key: Hashable, fn: Callable[[], R]) -> R:
+        future, leader = self.begin(key)
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            self.finish(key, error=e)
+            raise
+        self.finish(key, result=result)
+        return result
@@ -7,5 +7,134 @@ TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_API_BASE = os.getenv("OPENAI_API_BASE")
 
-if not TAVILY_API_KEY or not OPENAI_API_KEY:
-    raise ValueError("API keys for Tavily and OpenAI must be set in your .env file.")
\ No newline at end of file
+# Upper bound on concurrent per-ticker LLM/Tavily calls inside a single agent
+MAX_CONCURRENCY = int(os.getenv("MAX_CONCURRENCY", "4"))
+# Upper bound on whole workflows running at once in batch mode
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+
+# Tavily result cache: in-memory LRU in front of SQLite (set SEARCH_CACHE_PATH="" to keep it in memory only)
+SEARCH_CACHE_PATH = os.getenv("SEARCH_CACHE_PATH", ".cache/search.sqlite") or None
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "512"))
+SEARCH_CACHE_MAX_DISK_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_DISK_ENTRIES", "20000"))
+# Seconds before a cached search expires, by what the query asks for
+SEARCH_TTL_QUOTE = int(os.getenv("SEARCH_TTL_QUOTE", str(15 * 60)))
+SEARCH_TTL_NEWS = int(os.getenv("SEARCH_TTL_NEWS", str(60 * 60)))
+SEARCH_TTL_PROFILE = int(os.getenv("SEARCH_TTL_PROFILE", str(7 * 24 * 60 * 60)))
+SEARCH_TTL_DEFAULT = int(os.getenv("SEARCH_TTL_DEFAULT", str(60 * 60)))
+
+# Shared LLM response cache (set LLM_CACHE_PATH="" to keep it in memory only)
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", ".cache/llm.sqlite") or None
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "1024"))
+LLM_CACHE_MAX_DISK_ENTRIES = int(os.getenv("LLM_CACHE_MAX_DISK_ENTRIES", "20000"))
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(6 * 60 * 60)))
+# Comma-separated agent names that always call the model fresh
+LLM_CACHE_DISABLED = {
+    name.strip() for name in os.getenv("LLM_CACHE_DISABLED", "synthesis").split(",") if name.strip()
+}
+
+# DeepEval truths per context and verdicts per claim, reused across validation retries
+VALIDATION_CACHE_SIZE = int(os.getenv("VALIDATION_CACHE_SIZE", "256"))
+VALIDATION_CACHE_TTL = int(os.getenv("VALIDATION_CACHE_TTL", str(60 * 60)))
+
+# Columnar per-ticker fundamentals history, and how long a stored record counts as fresh
+FUNDAMENTALS_STORE_DIR = os.getenv("FUNDAMENTALS_STORE_DIR", ".cache/fundamentals")
+FUNDAMENTALS_MAX_AGE = int(os.getenv("FUNDAMENTALS_MAX_AGE", str(15 * 60)))
+
+# Per-ticker market data, news and risk results reused across runs while fresh
+# (set ARTIFACT_CACHE_PATH="" for memory only)
+ARTIFACT_CACHE_PATH = os.getenv("ARTIFACT_CACHE_PATH", ".cache/artifacts.sqlite") or None
+ARTIFACT_CACHE_SIZE = int(os.getenv("ARTIFACT_CACHE_SIZE", "1024"))
+ARTIFACT_MAX_AGE = int(os.getenv("ARTIFACT_MAX_AGE", str(15 * 60)))
+
+# LangGraph checkpoints of every run, so failed runs can resume (set CHECKPOINT_PATH="" to disable)
+CHECKPOINT_PATH = os.getenv("CHECKPOINT_PATH", ".cache/checkpoints.sqlite") or None
+# Checkpoints of runs idle this long are pruned (default 7 days, as long as their blobs are kept)
+CHECKPOINT_TTL = int(os.getenv("CHECKPOINT_TTL", str(7 * 24 * 60 * 60)))
+
+# Large per-run text (market data) is stored once per distinct payload and referenced from run
+# state by handle: in memory up to BLOB_STORE_MAX_BYTES, and on disk for BLOB_STORE_TTL seconds
+# so checkpointed runs can resume in another process (set BLOB_STORE_PATH="" for memory only)
+BLOB_STORE_PATH = os.getenv("BLOB_STORE_PATH", ".cache/blobs.sqlite") or None
+BLOB_STORE_MAX_BYTES = int(os.getenv("BLOB_STORE_MAX_BYTES", str(256 * 1024 * 1024)))
+BLOB_STORE_TTL = int(os.getenv("BLOB_STORE_TTL", str(7 * 24 * 60 * 60)))
+
+# Finished web-app reports, keyed by sorted tickers + analysis type (set REPORT_CACHE_PATH="" for memory only)
+REPORT_CACHE_PATH = os.getenv("REPORT_CACHE_PATH", ".cache/reports.sqlite") or None
+REPORT_CACHE_SIZE = int(os.getenv("REPORT_CACHE_SIZE", "256"))
+REPORT_CACHE_TTL = int(os.getenv("REPORT_CACHE_TTL", str(15 * 60)))
+
+# How market data is gathered: "fast" makes a fixed set of searches in parallel and one LLM call
+# to write them up; "react" lets the model choose its searches, within the caps below
+MARKET_DATA_MODE = os.getenv("MARKET_DATA_MODE", "fast")
+REACT_MAX_ITERATIONS = int(os.getenv("REACT_MAX_ITERATIONS", "4"))
+REACT_MAX_SEARCHES = int(os.getenv("REACT_MAX_SEARCHES", "6"))
+
+# Analyze news sentiment and risk in one structured LLM call per ticker instead of two (1 to enable)
+COMBINED_ANALYSIS = os.getenv("COMBINED_ANALYSIS", "0") == "1"
+
+# Prompt-token budget for the market data each agent sees, after dedupe and boilerplate removal
+CONTEXT_BUDGETS = {
+    "news_sentiment": int(os.getenv("CONTEXT_BUDGET_NEWS", "1500")),
+    "risk_assessment": int(os.getenv("CONTEXT_BUDGET_RISK", "1500")),
+    "validation": int(os.getenv("CONTEXT_BUDGET_VALIDATION", "2000")),
+    # Search results written up into market data
+    "market_data": int(os.getenv("CONTEXT_BUDGET_MARKET_DATA", "3000")),
+}
+
+# Watchlist refresh mode: seconds between passes, and where the last seen source hashes are kept
+WATCHLIST_INTERVAL = int(os.getenv("WATCHLIST_INTERVAL", str(15 * 60)))
+WATCHLIST_STATE_PATH = os.getenv("WATCHLIST_STATE_PATH", ".cache/watchlist.sqlite") or None
+
+# Provider limits shared by every client in the process (0 turns a limit off); requests over
+# budget wait, and a 429 pauses all callers of the provider before up to RATE_LIMIT_MAX_RETRIES retries
+OPENAI_RPM = int(os.getenv("OPENAI_RPM", "500"))
+OPENAI_TPM = int(os.getenv("OPENAI_TPM", "200000"))
+TAVILY_RPM = int(os.getenv("TAVILY_RPM", "100"))
+RATE_LIMIT_MAX_RETRIES = int(os.getenv("RATE_LIMIT_MAX_RETRIES", "5"))
+
+# Pooled keep-alive connections to OpenAI, shared by every agent and DeepEval
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "50"))
+
+# Seconds a request may run before it degrades to a partial report (0 for no deadline)
+REQUEST_DEADLINE = float(os.getenv("REQUEST_DEADLINE", "0"))
+# Seconds held back for the rest of the run at each point where it can degrade: ReAct stops
+# searching, optional DeepEval checks are skipped, the validation retry and then validation
+# itself are dropped, once no more than this is left
+DEADLINE_RESERVES = {
+    "react": float(os.getenv("DEADLINE_RESERVE_REACT", "30")),
+    "deepeval": float(os.getenv("DEADLINE_RESERVE_DEEPEVAL", "20")),
+    "retry": float(os.getenv("DEADLINE_RESERVE_RETRY", "15")),
+    "validation": float(os.getenv("DEADLINE_RESERVE_VALIDATION", "0")),
+}
+
+# Server mode: worker processes (each with a warm Workflow), jobs each one runs at once, the
+# SQLite job queue they share, how long finished jobs are kept, and how often idle workers poll
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", str(os.cpu_count() or 2)))
+SERVER_WORKER_THREADS = int(os.getenv("SERVER_WORKER_THREADS", "4"))
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", ".cache/jobs.sqlite")
+JOB_RETENTION = int(os.getenv("JOB_RETENTION", str(24 * 60 * 60)))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "0.2"))
+
+# Relative tolerance when matching a number in generated text against the source context
+CLAIM_TOLERANCE = float(os.getenv("CLAIM_TOLERANCE", "0.01"))
+
+# Most stocks one query may compare
+MAX_TICKERS = int(os.getenv("MAX_TICKERS", "50"))
+
+# Comparisons of more stocks than this are summarized group by group, then combined
+SYNTHESIS_CHUNK_SIZE = int(os.getenv("SYNTHESIS_CHUNK_SIZE", "8"))
+
+# Weight of each factor in the comparison ranking (0 leaves a factor out)
+RANKING_WEIGHTS = {
+    "sentiment": float(os.getenv("RANK_WEIGHT_SENTIMENT", "0.3")),
+    "risk_score": float(os.getenv("RANK_WEIGHT_RISK", "0.3")),
+    "beta": float(os.getenv("RANK_WEIGHT_BETA", "0.15")),
+    "pe_ratio": float(os.getenv("RANK_WEIGHT_PE", "0.15")),
+    "market_cap": float(os.getenv("RANK_WEIGHT_MARKET_CAP", "0.1")),
+}
+
+
+def require_api_keys():
+    """Called when the first OpenAI/Tavily client is built, so importing the package never needs keys."""
+    if not TAVILY_API_KEY or not OPENAI_API_KEY:
+        raise ValueError("API keys for Tavily and OpenAI must be set in your .env file.")
@@ -0,0 +1,66 @@
+"""Per-request deadlines.
+
+A run's deadline is a wall-clock time kept in its state, so it still holds after a resume.
+At each point where the run can degrade, a node checks whether more than that stage's
+reserve (DEADLINE_RESERVES) is left for the rest of the run; if not, it cuts the optional
+work and records it in the state's "skipped" list, which marks the report as partial.
+"""
+import math
+import time
+from typing import Any, Dict, List, Optional
+
+from config import DEADLINE_RESERVES
+from metrics import REGISTRY
+
+# What each degradation gives up, as reported to the user
+STAGES = {
+    "react": "market data searching cut short",
+    "deepeval": "DeepEval faithfulness check",
+    "retry": "validation retry",
+    "validation": "report validation",
+}
+
+
+def deadline_at(seconds: Optional[float]) -> Optional[float]:
+    """Wall-clock deadline for a request given seconds from now; None for no deadline."""
+    return time.time() + seconds if seconds else None
+
+
+class Budget:
+    """A node's view of its run's deadline, collecting what it skipped to stay within it."""
+
+    def __init__(self, deadline: Optional[float] = None):
+        self.deadline = deadline
+        self.skipped: List[Dict[str, Any]] = []
+
+    @classmethod
+    def of(cls, state: dict) -> "Budget":
+        return cls(state.get("deadline"))
+
+    def remaining(self) -> float:
+        return math.inf if self.deadline is None else self.deadline - time.time()
+
+    def cutoff(self, stage: str) -> float:
+        """Wall-clock time after which stage's optional work must stop."""
+        return math.inf if self.deadline is None else self.deadline - DEADLINE_RESERVES[stage]
+
+    def allows(self, stage: str) -> bool:
+        return time.time() < self.cutoff(stage)
+
+    def skip(self, stage: str, ticker: Optional[str] = None) -> None:
+        # Appended from worker threads; list.append is atomic
+        self.skipped.append({"stage": stage, "ticker": ticker})
+        REGISTRY.inc("deadline_skips_total", "Optional steps skipped to meet a request deadline", stage=stage)
+
+
+def format_skipped(skipped: List[Dict[str, Any]]) -> str:
+    """'report validation; DeepEval faithfulness check (AAPL, MSFT)' for a run's skipped list."""
+    tickers: Dict[str, List[str]] = {}
+    for entry in skipped:
+        names = tickers.setdefault(entry["stage"], [])
+        if entry.get("ticker") and entry["ticker"] not in names:
+            names.append(entry["ticker"])
+    return "; ".join(
+        f"{STAGES.get(stage, stage)} ({', '.join(names)})" if names else STAGES.get(stage, stage)
+        for stage, names in tickers.items()
+    )
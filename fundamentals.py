@@ -0,0 +1,144 @@
+import os
+import re
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+import numpy as np
+from pydantic import BaseModel
+
+from config import FUNDAMENTALS_STORE_DIR
+
+FIELDS = ("price", "market_cap", "pe_ratio", "beta")
+
+RECORD_DTYPE = np.dtype([("timestamp", "<f8")] + [(field, "<f8") for field in FIELDS])
+
+SCALES = {"trillion": 1e12, "t": 1e12, "billion": 1e9, "b": 1e9, "bn": 1e9, "million": 1e6, "m": 1e6}
+
+NUMBER = r"(-?\d[\d,]*(?:\.\d+)?)"
+PATTERNS = {
+    "price": re.compile(r"(?:stock|share|current|closing|last)\s+price[^$\d\n]{0,40}\$?\s*" + NUMBER, re.I),
+    "market_cap": re.compile(
+        r"market\s+cap(?:itali[sz]ation)?[^$\d\n]{0,40}\$?\s*" + NUMBER + r"\s*(trillion|billion|million|bn|t|b|m)?\b",
+        re.I,
+    ),
+    "pe_ratio": re.compile(r"(?:\bP/?E\b|price[- ]to[- ]earnings)(?:\s*\(P/E\))?(?:\s+ratio)?[^\d\n-]{0,40}" + NUMBER, re.I),
+    "beta": re.compile(r"\bbeta\b(?:\s+value)?[^\d\n-]{0,40}" + NUMBER, re.I),
+}
+
+
+class Fundamentals(BaseModel):
+    """Key numbers for one stock, extracted from market data text."""
+    price: Optional[float] = None
+    market_cap: Optional[float] = None
+    pe_ratio: Optional[float] = None
+    beta: Optional[float] = None
+
+    def is_complete(self) -> bool:
+        return all(getattr(self, field) is not None for field in FIELDS)
+
+
+def extract_fundamentals(text: str) -> Fundamentals:
+    """Pull price, market cap, P/E and beta out of free-form market data text."""
+    values = {}
+    for field, pattern in PATTERNS.items():
+        match = pattern.search(text or "")
+        if not match:
+            continue
+        value = float(match.group(1).replace(",", ""))
+        if field == "market_cap" and match.group(2):
+            value *= SCALES[match.group(2).lower()]
+        values[field] = value
+    return Fundamentals(**values)
+
+
+def describe_fundamentals(fundamentals: Fundamentals) -> str:
+    """Render fundamentals as text that extract_fundamentals reads back unchanged."""
+    lines = []
+    if fundamentals.price is not None:
+        lines.append(f"Current Stock Price: ${fundamentals.price:,.2f}")
+    if fundamentals.market_cap is not None:
+        lines.append(f"Market Capitalization: ${fundamentals.market_cap:,.0f}")
+    if fundamentals.pe_ratio is not None:
+        lines.append(f"P/E Ratio: {fundamentals.pe_ratio:g}")
+    if fundamentals.beta is not None:
+        lines.append(f"Beta: {fundamentals.beta:g}")
+    return "\n".join(lines)
+
+
+def format_market_cap(value: Optional[float]) -> str:
+    if value is None:
+        return "N/A"
+    for suffix, scale in (("T", 1e12), ("B", 1e9), ("M", 1e6)):
+        if abs(value) >= scale:
+            return f"${value / scale:.2f}{suffix}"
+    return f"${value:,.0f}"
+
+
+class FundamentalsStore:
+    """Append-only per-ticker time series of fundamentals, memory-mapped from disk.
+
+    Each ticker is one flat file of fixed-size RECORD_DTYPE rows, so history reads are
+    zero-copy NumPy views and screening many tickers is column arithmetic.
+    """
+
+    def __init__(self, directory: str = FUNDAMENTALS_STORE_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, ticker: str) -> str:
+        return os.path.join(self.directory, f"{re.sub(r'[^A-Za-z0-9._-]', '_', ticker.upper())}.bin")
+
+    def append(self, ticker: str, fundamentals: Fundamentals, timestamp: Optional[float] = None) -> None:
+        record = np.zeros(1, dtype=RECORD_DTYPE)
+        record["timestamp"] = timestamp if timestamp is not None else time.time()
+        for field in FIELDS:
+            value = getattr(fundamentals, field)
+            record[field] = np.nan if value is None else value
+        with self._lock, open(self._path(ticker), "ab") as f:
+            f.write(record.tobytes())
+
+    def history(self, ticker: str) -> np.ndarray:
+        path = self._path(ticker)
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        rows = size // RECORD_DTYPE.itemsize
+        if rows == 0:
+            return np.zeros(0, dtype=RECORD_DTYPE)
+        return np.memmap(path, dtype=RECORD_DTYPE, mode="r", shape=(rows,))
+
+    def latest(self, ticker: str, max_age: Optional[float] = None) -> Optional[Fundamentals]:
+        """Newest value of each field within max_age seconds, or None if nothing is fresh."""
+        rows = self.history(ticker)
+        if max_age is not None:
+            rows = rows[rows["timestamp"] >= time.time() - max_age]
+        if len(rows) == 0:
+            return None
+
+        values = {}
+        for field in FIELDS:
+            known = rows[field][~np.isnan(rows[field])]
+            if len(known):
+                values[field] = float(known[-1])
+        return Fundamentals(**values)
+
+    def snapshot(self, tickers: List[str], max_age: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """Latest fundamentals for many tickers as aligned columns, NaN where unknown."""
+        columns = {field: np.full(len(tickers), np.nan) for field in FIELDS}
+        for i, ticker in enumerate(tickers):
+            latest = self.latest(ticker, max_age)
+            if latest is None:
+                continue
+            for field in FIELDS:
+                value = getattr(latest, field)
+                if value is not None:
+                    columns[field][i] = value
+        columns["ticker"] = np.array(tickers)
+        return columns
+
+
+@lru_cache(maxsize=None)
+def default_store() -> FundamentalsStore:
+    return FundamentalsStore()
+
@@ -0,0 +1,98 @@
+"""Pooled httpx clients for OpenAI, shared by every agent's ChatOpenAI and DeepEval's judges.
+
+Requests go through a transport that waits for rate-limit budget first and retries 429s
+after a provider-wide pause, so concurrent agents back off together.
+"""
+import asyncio
+import re
+import weakref
+from functools import lru_cache
+
+import httpx
+
+from config import HTTP_MAX_CONNECTIONS, RATE_LIMIT_MAX_RETRIES
+from ratelimit import RateLimiter, provider_limiter, retry_after
+
+MAX_TOKENS = re.compile(rb'"max_(?:completion_)?tokens"\s*:\s*(\d+)')
+
+# Assumed completion size when a request doesn't cap it
+DEFAULT_COMPLETION_TOKENS = 512
+
+LIMITS = httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_CONNECTIONS)
+TIMEOUT = httpx.Timeout(120.0, connect=10.0)
+
+
+def estimate_tokens(request: httpx.Request) -> int:
+    """What a request counts against tokens-per-minute: its prompt (~4 bytes a token) plus its completion cap."""
+    try:
+        body = request.content
+    except httpx.RequestNotRead:
+        return DEFAULT_COMPLETION_TOKENS
+    match = MAX_TOKENS.search(body)
+    completion = int(match.group(1)) if match else DEFAULT_COMPLETION_TOKENS
+    return len(body) // 4 + completion
+
+
+class RateLimitedTransport(httpx.BaseTransport):
+    def __init__(self, limiter: RateLimiter, transport: httpx.BaseTransport):
+        self.limiter = limiter
+        self.transport = transport
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        tokens = estimate_tokens(request)
+        for attempt in range(RATE_LIMIT_MAX_RETRIES + 1):
+            self.limiter.acquire(tokens)
+            response = self.transport.handle_request(request)
+            if response.status_code != 429 or attempt == RATE_LIMIT_MAX_RETRIES:
+                break
+            response.close()
+            self.limiter.backoff(attempt, retry_after(response.headers))
+        self.limiter.observe(response.headers)
+        return response
+
+    def close(self) -> None:
+        self.transport.close()
+
+
+class AsyncRateLimitedTransport(httpx.AsyncBaseTransport):
+    """Async counterpart; connections are pooled per event loop, since they can't cross loops."""
+
+    def __init__(self, limiter: RateLimiter):
+        self.limiter = limiter
+        self._transports = weakref.WeakKeyDictionary()
+
+    def _transport(self) -> httpx.AsyncHTTPTransport:
+        loop = asyncio.get_running_loop()
+        transport = self._transports.get(loop)
+        if transport is None:
+            transport = self._transports[loop] = httpx.AsyncHTTPTransport(limits=LIMITS)
+        return transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        transport = self._transport()
+        tokens = estimate_tokens(request)
+        for attempt in range(RATE_LIMIT_MAX_RETRIES + 1):
+            await self.limiter.aacquire(tokens)
+            response = await transport.handle_async_request(request)
+            if response.status_code != 429 or attempt == RATE_LIMIT_MAX_RETRIES:
+                break
+            await response.aclose()
+            self.limiter.backoff(attempt, retry_after(response.headers))
+        self.limiter.observe(response.headers)
+        return response
+
+    async def aclose(self) -> None:
+        transport = self._transports.pop(asyncio.get_running_loop(), None)
+        if transport is not None:
+            await transport.aclose()
+
+
+@lru_cache(maxsize=None)
+def openai_http_client() -> httpx.Client:
+    transport = RateLimitedTransport(provider_limiter("openai"), httpx.HTTPTransport(limits=LIMITS))
+    return httpx.Client(transport=transport, timeout=TIMEOUT)
+
+
+@lru_cache(maxsize=None)
+def openai_async_http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=AsyncRateLimitedTransport(provider_limiter("openai")), timeout=TIMEOUT)
@@ -0,0 +1,129 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from config import JOB_QUEUE_PATH, JOB_RETENTION
+
+# A job is "queued" until a worker claims it, "running" until it finishes, then "done" or "failed"
+ACTIVE = ("queued", "running")
+
+
+class JobQueue:
+    """Research requests waiting for, being run by, or finished by server workers.
+
+    Backed by one SQLite file that the API process and every worker process open; a job is
+    claimed inside an IMMEDIATE transaction, so two workers never take the same one.
+    """
+
+    # Finished jobs are pruned every PRUNE_INTERVAL submissions rather than on each one
+    PRUNE_INTERVAL = 64
+
+    def __init__(self, path: str = JOB_QUEUE_PATH, retention: float = JOB_RETENTION):
+        self.path = path
+        self.retention = retention
+        self._lock = threading.Lock()
+        self._submits = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Autocommit, so claim() can open its own IMMEDIATE transaction
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, query TEXT NOT NULL, options TEXT NOT NULL, status TEXT NOT NULL, "
+            "worker TEXT, result TEXT, error TEXT, "
+            "created_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+
+    def submit(self, query: str, **options: Any) -> Dict[str, Any]:
+        """Queue a query, or return the job already queued or running for the same text."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    "SELECT * FROM jobs WHERE query = ? AND options = ? AND status IN (?, ?) ORDER BY created_at LIMIT 1",
+                    (query, json.dumps(options, sort_keys=True), *ACTIVE),
+                ).fetchone()
+                if row is None:
+                    job_id = uuid.uuid4().hex
+                    self._db.execute(
+                        "INSERT INTO jobs (id, query, options, status, created_at) VALUES (?, ?, ?, 'queued', ?)",
+                        (job_id, query, json.dumps(options, sort_keys=True), time.time()),
+                    )
+                    row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                self._submits += 1
+                if self._submits % self.PRUNE_INTERVAL == 0:
+                    self._db.execute(
+                        "DELETE FROM jobs WHERE status NOT IN (?, ?) AND finished_at <= ?",
+                        (*ACTIVE, time.time() - self.retention),
+                    )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return self._record(row)
+
+    def claim(self, worker: str) -> Optional[Dict[str, Any]]:
+        """Take the oldest queued job for worker, or None when there is none."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    "SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+                ).fetchone()
+                if row is not None:
+                    self._db.execute(
+                        "UPDATE jobs SET status = 'running', worker = ?, started_at = ? WHERE id = ?",
+                        (worker, time.time(), row["id"]),
+                    )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return self.get(row["id"]) if row is not None else None
+
+    def finish(self, job_id: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> None:
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                ("failed" if error else "done", json.dumps(result) if result is not None else None, error,
+                 time.time(), job_id),
+            )
+
+    def requeue(self, worker: Optional[str] = None) -> int:
+        """Put running jobs back in the queue: worker's after it died, or every one after a restart."""
+        with self._lock:
+            if worker is None:
+                cursor = self._db.execute(
+                    "UPDATE jobs SET status = 'queued', worker = NULL, started_at = NULL WHERE status = 'running'"
+                )
+            else:
+                cursor = self._db.execute(
+                    "UPDATE jobs SET status = 'queued', worker = NULL, started_at = NULL "
+                    "WHERE status = 'running' AND worker = ?",
+                    (worker,),
+                )
+            return cursor.rowcount
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._record(row) if row is not None else None
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    @staticmethod
+    def _record(row: sqlite3.Row) -> Dict[str, Any]:
+        record = dict(row)
+        record["options"] = json.loads(record["options"])
+        record["result"] = json.loads(record["result"]) if record["result"] is not None else None
+        return record
@@ -0,0 +1,152 @@
+import hashlib
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Callable, Optional, Sequence
+
+from langchain_core.caches import BaseCache
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, Generation
+from pydantic import BaseModel
+
+from cache import TTLCache
+from metrics import LLMMetricsHandler
+from config import (
+    OPENAI_API_KEY,
+    OPENAI_API_BASE,
+    LLM_CACHE_PATH,
+    LLM_CACHE_SIZE,
+    LLM_CACHE_MAX_DISK_ENTRIES,
+    LLM_CACHE_TTL,
+    LLM_CACHE_DISABLED,
+    require_api_keys,
+)
+
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
+
+
+class LLMResponseCache(BaseCache):
+    """LangChain cache over a TTLCache.
+
+    LangChain's llm_string already encodes the model, its parameters and any bound
+    tools or response_format, so structured-output schemas are part of the key.
+    """
+
+    def __init__(self, store: TTLCache, ttl: float = LLM_CACHE_TTL):
+        self.store = store
+        self.ttl = ttl
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\x00{prompt}".encode()).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        cached = self.store.get(self._key(prompt, llm_string))
+        if cached is None:
+            return None
+        generations = [_load_generation(generation) for generation in cached]
+        # Lets LLMMetricsHandler count this as a hit rather than billed tokens
+        for generation in generations:
+            generation.generation_info = {**(generation.generation_info or {}), "cache_hit": True}
+        return generations
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        generations = [_dump_generation(generation) for generation in return_val]
+        self.store.set(self._key(prompt, llm_string), generations, self.ttl)
+
+    def clear(self, **kwargs: Any) -> None:
+        self.store.clear()
+
+    def stats(self) -> dict:
+        return self.store.stats()
+
+
+def _dump_generation(generation: Generation) -> dict:
+    if not isinstance(generation, ChatGeneration):
+        return {"text": generation.text, "generation_info": generation.generation_info}
+
+    message = generation.message
+    # OpenAI structured output leaves the pydantic object under additional_kwargs["parsed"];
+    # store it as a dict so it serializes, the output parser rebuilds the typed model on a hit
+    parsed = message.additional_kwargs.get("parsed")
+    if isinstance(parsed, BaseModel):
+        additional_kwargs = {**message.additional_kwargs, "parsed": parsed.model_dump()}
+        message = message.model_copy(update={"additional_kwargs": additional_kwargs})
+    return {"message": message_to_dict(message), "generation_info": generation.generation_info}
+
+
+def _load_generation(data: dict) -> Generation:
+    if "message" not in data:
+        return Generation(text=data["text"], generation_info=data["generation_info"])
+    message = messages_from_dict([data["message"]])[0]
+    return ChatGeneration(message=message, generation_info=data["generation_info"])
+
+
+_response_cache: Optional[BaseCache] = None
+
+
+@lru_cache(maxsize=None)
+def _default_response_cache() -> LLMResponseCache:
+    store = TTLCache(
+        "llm_responses",
+        max_entries=LLM_CACHE_SIZE,
+        path=LLM_CACHE_PATH,
+        max_disk_entries=LLM_CACHE_MAX_DISK_ENTRIES,
+    )
+    return LLMResponseCache(store)
+
+
+def set_response_cache(cache: Optional[BaseCache]) -> None:
+    """Swap in another LangChain cache backend for every model built after this call."""
+    global _response_cache
+    _response_cache = cache
+
+
+def response_cache() -> BaseCache:
+    return _response_cache or _default_response_cache()
+
+
+_chat_model_factory: Optional[Callable[..., Any]] = None
+
+
+def set_chat_model_factory(factory: Optional[Callable[..., Any]]) -> None:
+    """Build every model through factory(agent, **kwargs) instead of ChatOpenAI, e.g. offline stand-ins."""
+    global _chat_model_factory
+    _chat_model_factory = factory
+
+
+def get_chat_model(agent: str, **kwargs: Any) -> "ChatOpenAI":
+    """Build the ChatOpenAI client for an agent, sharing one response cache unless the agent opts out."""
+    kwargs.setdefault("model", "gpt-4o-mini")
+    kwargs.setdefault("cache", False if agent in LLM_CACHE_DISABLED else response_cache())
+    kwargs.setdefault("callbacks", [LLMMetricsHandler(agent)])
+    if _chat_model_factory is not None:
+        return _chat_model_factory(agent, **kwargs)
+
+    # Imported here so the openai SDK only loads once a model is actually needed
+    from langchain_openai import ChatOpenAI
+
+    require_api_keys()
+    kwargs.setdefault("api_key", OPENAI_API_KEY)
+    if OPENAI_API_BASE:
+        kwargs.setdefault("base_url", OPENAI_API_BASE)
+    # Token usage on streamed responses too, for the metrics
+    kwargs.setdefault("stream_usage", True)
+    # Every agent shares one connection pool and the process-wide OpenAI rate limits
+    from http_clients import openai_async_http_client, openai_http_client
+
+    kwargs.setdefault("http_client", openai_http_client())
+    kwargs.setdefault("http_async_client", openai_async_http_client())
+    return ChatOpenAI(**kwargs)
+
+
+def get_eval_model(model: str = "gpt-4o-mini"):
+    """DeepEval's OpenAI judge, on the same connection pool and rate limits as the agents."""
+    from deepeval.models import OpenAIModel
+    from http_clients import openai_async_http_client, openai_http_client
+
+    kwargs = {"api_key": OPENAI_API_KEY} if OPENAI_API_KEY else {}
+    if OPENAI_API_BASE:
+        kwargs["base_url"] = OPENAI_API_BASE
+    return OpenAIModel(
+        model=model, http_client=openai_http_client(), async_http_client=openai_async_http_client(), **kwargs
+    )
@@ -0,0 +1,251 @@
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import Context, ContextVar, copy_context
+from typing import Any, Dict, Iterator, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+# USD per million (prompt, completion) tokens; models not listed are counted at zero cost
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+}
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    prompt_price, completion_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+
+class MetricsRegistry:
+    """Process-wide counters, rendered in the Prometheus text exposition format."""
+
+    def __init__(self, prefix: str = "stock_research"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._values: Dict[str, Dict[Tuple[Tuple[str, str], ...], float]] = defaultdict(dict)
+        self._help: Dict[str, Tuple[str, str]] = {}
+
+    def _add(self, name: str, kind: str, help_text: str, labels: Dict[str, str], value: float) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._help.setdefault(name, (kind, help_text))
+            series = self._values[name]
+            series[key] = series.get(key, 0.0) + value
+
+    def inc(self, name: str, help_text: str, value: float = 1.0, **labels: str) -> None:
+        self._add(name, "counter", help_text, labels, value)
+
+    def observe(self, name: str, help_text: str, seconds: float, **labels: str) -> None:
+        """Summary without quantiles: _sum and _count are enough for rates and averages."""
+        self._add(f"{name}_sum", "summary", help_text, labels, seconds)
+        self._add(f"{name}_count", "summary", help_text, labels, 1)
+
+    def render(self) -> str:
+        lines, described = [], set()
+        with self._lock:
+            for name in sorted(self._values):
+                kind, help_text = self._help[name]
+                base = name.rsplit("_", 1)[0] if kind == "summary" else name
+                if base not in described:
+                    described.add(base)
+                    lines.append(f"# HELP {self.prefix}_{base} {help_text}")
+                    lines.append(f"# TYPE {self.prefix}_{base} {kind}")
+                for labels, value in sorted(self._values[name].items()):
+                    rendered = ",".join(f'{k}="{v}"' for k, v in labels)
+                    lines.append(f"{self.prefix}_{name}{{{rendered}}} {value:g}" if rendered else f"{self.prefix}_{name} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+class RunMetrics:
+    """Breakdown of one workflow run: where the time, tokens and money went."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.nodes: Dict[str, Dict[str, float]] = defaultdict(lambda: {"calls": 0, "seconds": 0.0})
+        self.llm: Dict[str, Dict[str, float]] = defaultdict(lambda: {
+            "calls": 0, "cache_hits": 0, "errors": 0, "prompt_tokens": 0, "completion_tokens": 0,
+            "cost_usd": 0.0, "seconds": 0.0,
+        })
+        self.tavily = {"calls": 0, "cache_hits": 0, "seconds": 0.0}
+        self.deepeval: Dict[str, Dict[str, float]] = defaultdict(lambda: {"calls": 0, "errors": 0, "cost_usd": 0.0, "seconds": 0.0})
+        self.retries: Dict[str, int] = defaultdict(int)
+
+    def summary(self) -> Dict[str, Any]:
+        def rounded(values: Dict[str, float]) -> Dict[str, float]:
+            return {
+                name: round(value, 6 if name == "cost_usd" else 3) if isinstance(value, float) else value
+                for name, value in values.items()
+            }
+
+        with self._lock:
+            llm = {agent: rounded(values) for agent, values in self.llm.items()}
+            deepeval = {name: rounded(values) for name, values in self.deepeval.items()}
+            return {
+                "wall_time_s": round(time.perf_counter() - self.started, 3),
+                "nodes": {node: rounded(values) for node, values in self.nodes.items()},
+                "llm": llm,
+                "tavily": rounded(self.tavily),
+                "deepeval": deepeval,
+                "retries": dict(self.retries),
+                "totals": {
+                    "llm_calls": sum(v["calls"] for v in llm.values()),
+                    "prompt_tokens": sum(v["prompt_tokens"] for v in llm.values()),
+                    "completion_tokens": sum(v["completion_tokens"] for v in llm.values()),
+                    "cost_usd": round(
+                        sum(v["cost_usd"] for v in llm.values()) + sum(v["cost_usd"] for v in deepeval.values()), 6
+                    ),
+                },
+            }
+
+
+_current_run: ContextVar[Optional[RunMetrics]] = ContextVar("current_run_metrics", default=None)
+
+
+def start_run() -> Tuple[RunMetrics, Context]:
+    """A fresh RunMetrics and a context to run the workflow in; whatever runs there, including
+    threads LangGraph and map_bounded start from it, records into that RunMetrics."""
+    run = RunMetrics()
+    context = copy_context()
+    context.run(_current_run.set, run)
+    return run, context
+
+
+def finish_run(run: RunMetrics) -> Dict[str, Any]:
+    REGISTRY.inc("runs_total", "Completed workflow runs")
+    REGISTRY.observe("run_seconds", "Wall time of whole workflow runs", time.perf_counter() - run.started)
+    return run.summary()
+
+
+def _update(section: str, key: Optional[str] = None, **values: float) -> None:
+    run = _current_run.get()
+    if run is None:
+        return
+    with run._lock:
+        target = getattr(run, section)
+        if key is not None:
+            target = target[key]
+        for name, value in values.items():
+            target[name] += value
+
+
+def record_node(node: str, seconds: float) -> None:
+    REGISTRY.observe("node_seconds", "Wall time per graph node run", seconds, node=node)
+    _update("nodes", node, calls=1, seconds=seconds)
+
+
+def record_llm(agent: str, model: str, seconds: float, prompt_tokens: int, completion_tokens: int,
+               cache_hit: bool = False, error: bool = False) -> None:
+    cost = estimate_cost(model, prompt_tokens, completion_tokens)
+    cache = "hit" if cache_hit else "miss"
+    REGISTRY.inc("llm_calls_total", "LLM calls by agent and response cache outcome", agent=agent, cache=cache)
+    REGISTRY.observe("llm_seconds", "LLM call wall time", seconds, agent=agent)
+    REGISTRY.inc("llm_tokens_total", "Billed LLM tokens", prompt_tokens, agent=agent, kind="prompt")
+    REGISTRY.inc("llm_tokens_total", "Billed LLM tokens", completion_tokens, agent=agent, kind="completion")
+    REGISTRY.inc("llm_cost_usd_total", "Estimated LLM spend in USD", cost, agent=agent)
+    if error:
+        REGISTRY.inc("llm_errors_total", "LLM calls that raised", agent=agent)
+    _update(
+        "llm", agent, calls=1, cache_hits=int(cache_hit), errors=int(error), prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens, cost_usd=cost, seconds=seconds,
+    )
+
+
+def record_search(seconds: float, cache_hit: bool) -> None:
+    REGISTRY.inc("tavily_calls_total", "Tavily searches by cache outcome", cache="hit" if cache_hit else "miss")
+    REGISTRY.observe("tavily_seconds", "Tavily search wall time", seconds)
+    _update("tavily", calls=1, cache_hits=int(cache_hit), seconds=seconds)
+
+
+def record_retry(kind: str) -> None:
+    REGISTRY.inc("retries_total", "Retried pipeline steps", kind=kind)
+    _update("retries", **{kind: 1})
+
+
+@contextmanager
+def deepeval_call(name: str, metric: Any) -> Iterator[None]:
+    """Time a DeepEval measurement and pick up the cost it reports for its own model calls."""
+    started, error = time.perf_counter(), False
+    try:
+        yield
+    except Exception:
+        error = True
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        cost = getattr(metric, "evaluation_cost", None) or 0.0
+        REGISTRY.inc("deepeval_calls_total", "DeepEval metric measurements", metric=name)
+        REGISTRY.observe("deepeval_seconds", "DeepEval measurement wall time", seconds, metric=name)
+        REGISTRY.inc("deepeval_cost_usd_total", "DeepEval-reported spend in USD", cost, metric=name)
+        _update("deepeval", name, calls=1, errors=int(error), cost_usd=cost, seconds=seconds)
+
+
+def instrument_node(name: str, node: Any) -> Any:
+    """Wrap a graph node so every run of it is timed."""
+    def timed(state: dict) -> dict:
+        started = time.perf_counter()
+        try:
+            return node(state)
+        finally:
+            record_node(name, time.perf_counter() - started)
+
+    return timed
+
+
+class LLMMetricsHandler(BaseCallbackHandler):
+    """Attached to every chat model: times each call and records its token usage and cost.
+
+    Responses served by LLMResponseCache are flagged in their generation_info and counted
+    as cache hits with no billed tokens.
+    """
+
+    def __init__(self, agent: str):
+        self.agent = agent
+        self._started: Dict[UUID, Tuple[float, str]] = {}
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        params = kwargs.get("invocation_params") or {}
+        model = params.get("model") or params.get("model_name") or "unknown"
+        self._started[run_id] = (time.perf_counter(), model)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        started, model = self._started.pop(run_id, (time.perf_counter(), "unknown"))
+        generation = response.generations[0][0] if response.generations and response.generations[0] else None
+        cache_hit = bool(generation and (generation.generation_info or {}).get("cache_hit"))
+
+        usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+        prompt_tokens = 0 if cache_hit else usage.get("input_tokens", 0)
+        completion_tokens = 0 if cache_hit else usage.get("output_tokens", 0)
+        record_llm(self.agent, model, time.perf_counter() - started, prompt_tokens, completion_tokens, cache_hit)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        started, model = self._started.pop(run_id, (time.perf_counter(), "unknown"))
+        record_llm(self.agent, model, time.perf_counter() - started, 0, 0, error=True)
+
+
+def format_run_metrics(summary: Dict[str, Any]) -> str:
+    """Human-readable breakdown for the CLI."""
+    totals = summary["totals"]
+    lines = [
+        f"⏱️ {summary['wall_time_s']:.1f}s total, {totals['llm_calls']} LLM calls, "
+        f"{totals['prompt_tokens']:,} prompt + {totals['completion_tokens']:,} completion tokens, "
+        f"~${totals['cost_usd']:.4f}",
+    ]
+    for node, values in sorted(summary["nodes"].items(), key=lambda item: -item[1]["seconds"]):
+        lines.append(f"   {node:<22} {values['seconds']:>7.2f}s")
+    tavily = summary["tavily"]
+    if tavily["calls"]:
+        lines.append(f"   Tavily: {tavily['calls']} searches ({tavily['cache_hits']} cached), {tavily['seconds']:.2f}s")
+    if summary["retries"]:
+        lines.append("   Retries: " + ", ".join(f"{kind} {count}" for kind, count in summary["retries"].items()))
+    return "\n".join(lines)
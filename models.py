@@ -1,6 +1,8 @@
-from typing import List, Dict, Optional
+from dataclasses import dataclass, fields, replace
+from typing import Any, List, Dict, Optional
 from enum import Enum
 from pydantic import BaseModel, Field
+from blobs import default_blobs
 
 
 class AnalysisType(Enum):
@@ -15,11 +17,36 @@ class StockQuery(BaseModel):
     analysis_type: Optional[AnalysisType] = None
 
 
-class StockData(BaseModel):
-    """Data collected for a single stock."""
+@dataclass(slots=True)
+class StockData:
+    """Data collected for a single stock, as held in workflow state.
+
+    A slotted record rather than a dict, and the market data as a blob handle rather
+    than its text, so the copies LangGraph makes of the state at every step stay small.
+    """
     market_data: Optional[str] = None
-    sentiment_analysis: Optional[str] = None
-    risk_analysis: Optional[str] = None
+    market_data_fetched_at: Optional[float] = None
+    # Tokens compression took out of market_data; every prompt that sends it counts them as saved
+    compressed_tokens: Optional[int] = None
+    fundamentals: Optional[Dict[str, Any]] = None
+    news_analysis: Optional[Dict[str, Any]] = None
+    risk_assessment: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def coerce(cls, value: Any) -> "StockData":
+        """A record from a record, a dict of its fields (as older checkpoints hold), or None."""
+        if isinstance(value, cls):
+            return value
+        names = {field.name for field in fields(cls)}
+        return cls(**{key: item for key, item in (value or {}).items() if key in names})
+
+    def updated(self, changes: Dict[str, Any]) -> "StockData":
+        """A new record with changes applied; this one is left alone, as earlier snapshots share it."""
+        return replace(self, **changes)
+
+    @property
+    def market_text(self) -> str:
+        return default_blobs().resolve(self.market_data) or ""
 
 
 class ValidationResult(BaseModel):
@@ -0,0 +1,118 @@
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from config import RANKING_WEIGHTS
+from fundamentals import format_market_cap
+from models import StockData
+
+SENTIMENT_SCORES = {"positive": 3.0, "neutral": 2.0, "negative": 1.0}
+
+# +1 where more is better, -1 where less is better
+DIRECTIONS = {"sentiment": 1.0, "risk_score": -1.0, "beta": -1.0, "pe_ratio": -1.0, "market_cap": 1.0}
+FACTORS = tuple(DIRECTIONS)
+
+
+def _number(value: Any) -> Optional[float]:
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+
+def stock_factors(data: StockData) -> Dict[str, Optional[float]]:
+    """The rankable numbers for one stock: analyses for sentiment and risk, fundamentals for the rest."""
+    news = data.news_analysis or {}
+    risk = data.risk_assessment or {}
+    fundamentals = data.fundamentals or {}
+    beta = _number(fundamentals.get("beta"))
+    return {
+        "sentiment": SENTIMENT_SCORES.get(news.get("sentiment")),
+        "risk_score": _number(risk.get("risk_score")),
+        "beta": beta if beta is not None else _number(risk.get("beta")),
+        "pe_ratio": _number(fundamentals.get("pe_ratio")),
+        "market_cap": _number(fundamentals.get("market_cap")),
+    }
+
+
+def factor_matrix(factors: List[Dict[str, Optional[float]]]) -> np.ndarray:
+    """One row per stock, one column per factor, NaN where a value is unknown or meaningless."""
+    matrix = np.array(
+        [[np.nan if row[factor] is None else row[factor] for factor in FACTORS] for row in factors], dtype=float
+    ).reshape(len(factors), len(FACTORS))
+
+    # Negative earnings make P/E meaningless rather than cheap; size ranks on a log scale
+    pe = matrix[:, FACTORS.index("pe_ratio")]
+    pe[pe <= 0] = np.nan
+    cap = matrix[:, FACTORS.index("market_cap")]
+    cap[cap <= 0] = np.nan
+    matrix[:, FACTORS.index("market_cap")] = np.log10(cap)
+    return matrix
+
+
+def score_matrix(matrix: np.ndarray, weights: Dict[str, float]) -> np.ndarray:
+    """Weighted sum of per-factor z-scores, signed so higher is better.
+
+    A missing value scores as the basket average, and a factor that doesn't vary
+    across the basket contributes nothing.
+    """
+    known = ~np.isnan(matrix)
+    counts = np.maximum(known.sum(axis=0), 1)
+    mean = np.where(known, matrix, 0.0).sum(axis=0) / counts
+    deviation = np.where(known, matrix - mean, 0.0)
+    std = np.sqrt((deviation ** 2).sum(axis=0) / counts)
+    z = np.divide(deviation, std, out=np.zeros_like(deviation), where=std > 0)
+
+    direction = np.array([DIRECTIONS[factor] for factor in FACTORS])
+    weight = np.array([weights.get(factor, 0.0) for factor in FACTORS])
+    return (z * direction) @ weight / (weight.sum() or 1.0)
+
+
+def rank_stocks(
+    stocks_data: Dict[str, StockData], tickers: List[str], weights: Optional[Dict[str, float]] = None
+) -> List[Dict[str, Any]]:
+    """Tickers best first, each with its rank, weighted score and the raw factor values."""
+    weights = RANKING_WEIGHTS if weights is None else weights
+    records = [StockData.coerce(stocks_data.get(ticker)) for ticker in tickers]
+    factors = [stock_factors(data) for data in records]
+    scores = score_matrix(factor_matrix(factors), weights)
+
+    ranking = []
+    for rank, index in enumerate(np.argsort(-scores, kind="stable"), start=1):
+        data = records[index]
+        ranking.append({
+            "rank": rank,
+            "ticker": tickers[index],
+            "score": round(float(scores[index]), 3),
+            **factors[index],
+            "price": (data.fundamentals or {}).get("price"),
+            "volatility": (data.risk_assessment or {}).get("volatility"),
+            "sentiment_label": (data.news_analysis or {}).get("sentiment"),
+        })
+    return ranking
+
+
+def _fmt(value, spec: str) -> str:
+    return "N/A" if value is None else format(value, spec)
+
+
+def format_ranking(ranking: List[Dict[str, Any]], weights: Optional[Dict[str, float]] = None) -> str:
+    """Ranked comparison table for the dashboard."""
+    weights = RANKING_WEIGHTS if weights is None else weights
+    rule = "═" * 92
+    lines = [
+        f"📊 Ranked Comparison of {len(ranking)} Stocks",
+        rule,
+        f"{'Rank':<5}{'Ticker':<8}{'Score':>7}  {'Sentiment':<10}{'Risk':>5}  {'Volatility':<11}"
+        f"{'Price ($)':>10}{'Market Cap':>12}{'P/E':>8}{'Beta':>7}",
+        "─" * 92,
+    ]
+    for row in ranking:
+        lines.append(
+            f"{row['rank']:<5}{row['ticker']:<8}{row['score']:>+7.2f}  {row['sentiment_label'] or 'N/A':<10}"
+            f"{_fmt(row['risk_score'], '.0f'):>5}  {row['volatility'] or 'N/A':<11}"
+            f"{_fmt(row['price'], '.2f'):>10}{format_market_cap(row['market_cap']):>12}"
+            f"{_fmt(row['pe_ratio'], '.1f'):>8}{_fmt(row['beta'], '.2f'):>7}"
+        )
+    lines.append(rule)
+    if ranking:
+        lines.append(f"Overall Winner: {ranking[0]['ticker']}")
+    lines.append("Weights: " + ", ".join(f"{factor} {weights.get(factor, 0.0):g}" for factor in FACTORS))
+    return "\n".join(lines)
@@ -0,0 +1,122 @@
+import asyncio
+import random
+import threading
+import time
+from functools import lru_cache
+from typing import Mapping, Optional
+
+from config import OPENAI_RPM, OPENAI_TPM, TAVILY_RPM
+from metrics import REGISTRY
+
+# Longest single sleep, so a waiting caller notices a shorter pause set by another thread
+MAX_SLEEP = 1.0
+
+
+class TokenBucket:
+    """A per-minute allowance that refills continuously; spending past empty leaves a debt."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        self._refill(now)
+        # Anything larger than a whole minute's allowance goes once the bucket is full
+        needed = min(amount, self.capacity)
+        return 0.0 if self.level >= needed else (needed - self.level) / self.rate
+
+    def take(self, amount: float) -> None:
+        self.level -= amount
+
+
+class RateLimiter:
+    """Requests- and tokens-per-minute budgets for one provider, shared by every client in the process.
+
+    A 429 pauses all callers of the provider at once, instead of each retrying on its own.
+    """
+
+    def __init__(self, provider: str, rpm: float = 0, tpm: float = 0):
+        self.provider = provider
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self._lock = threading.Lock()
+        self._paused_until = 0.0
+
+    def _reserve(self, tokens: float) -> float:
+        """Spend the budget for one request if it is there now; otherwise how long to wait."""
+        with self._lock:
+            now = time.monotonic()
+            wait = self._paused_until - now
+            if self.requests:
+                wait = max(wait, self.requests.wait_time(1, now))
+            if self.tokens and tokens:
+                wait = max(wait, self.tokens.wait_time(tokens, now))
+            if wait > 0:
+                return wait
+            if self.requests:
+                self.requests.take(1)
+            if self.tokens and tokens:
+                self.tokens.take(tokens)
+            return 0.0
+
+    def acquire(self, tokens: float = 0) -> None:
+        waited = 0.0
+        while (wait := self._reserve(tokens)) > 0:
+            time.sleep(min(wait, MAX_SLEEP))
+            waited += min(wait, MAX_SLEEP)
+        self._record_wait(waited)
+
+    async def aacquire(self, tokens: float = 0) -> None:
+        waited = 0.0
+        while (wait := self._reserve(tokens)) > 0:
+            await asyncio.sleep(min(wait, MAX_SLEEP))
+            waited += min(wait, MAX_SLEEP)
+        self._record_wait(waited)
+
+    def _record_wait(self, seconds: float) -> None:
+        if seconds:
+            REGISTRY.inc("rate_limit_wait_seconds_total", "Time spent waiting for rate-limit budget", seconds,
+                         provider=self.provider)
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """After a 429, pause the provider for retry_after seconds, or an exponential backoff with jitter."""
+        delay = retry_after if retry_after is not None else min(60.0, 2.0 ** attempt) * random.uniform(0.5, 1.0)
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        REGISTRY.inc("rate_limited_total", "Requests answered with HTTP 429", provider=self.provider)
+        return delay
+
+    def observe(self, headers: Mapping[str, str]) -> None:
+        """Adopt the provider's own count of what is left, when it is lower than ours."""
+        with self._lock:
+            for bucket, header in ((self.requests, "x-ratelimit-remaining-requests"),
+                                   (self.tokens, "x-ratelimit-remaining-tokens")):
+                value = headers.get(header)
+                if bucket is not None and value is not None:
+                    try:
+                        bucket.level = min(bucket.level, float(value))
+                    except ValueError:
+                        pass
+
+
+def retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    """Seconds a 429 asks us to wait, from retry-after-ms or retry-after; None if it doesn't say."""
+    for header, scale in (("retry-after-ms", 1000.0), ("retry-after", 1.0)):
+        try:
+            return float(headers[header]) / scale
+        except (KeyError, TypeError, ValueError):
+            continue
+    return None
+
+
+@lru_cache(maxsize=None)
+def provider_limiter(provider: str) -> RateLimiter:
+    limits = {"openai": (OPENAI_RPM, OPENAI_TPM), "tavily": (TAVILY_RPM, 0)}
+    rpm, tpm = limits.get(provider, (0, 0))
+    return RateLimiter(provider, rpm, tpm)
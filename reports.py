@@ -0,0 +1,126 @@
+import contextvars
+import queue
+import threading
+from typing import Any, Dict, Iterator, Optional
+
+from agents import QueryParserAgent
+from cache import TTLCache
+from concurrency import SingleFlight
+from config import REPORT_CACHE_PATH, REPORT_CACHE_SIZE, REPORT_CACHE_TTL
+from metrics import REGISTRY
+
+# What a finished report keeps; market data and the per-run metrics are left out
+REPORT_FIELDS = (
+    "query", "messages", "error_messages", "executive_summary", "comparison_dashboard", "validation_result", "skipped",
+)
+
+
+def canonical_key(query: Dict[str, Any]) -> str:
+    """"Compare Apple and Microsoft" and "MSFT vs AAPL" both become "comparison:AAPL,MSFT"."""
+    return f"{query.get('analysis_type', 'single')}:{','.join(sorted(query['tickers']))}"
+
+
+class ReportService:
+    """Serves whole reports by canonical request, from cache or by sharing one run among concurrent callers."""
+
+    def __init__(self, workflow, cache: Optional[TTLCache] = None, ttl: float = REPORT_CACHE_TTL):
+        self.workflow = workflow
+        self.parser = QueryParserAgent()
+        self.cache = cache or TTLCache("reports", max_entries=REPORT_CACHE_SIZE, path=REPORT_CACHE_PATH)
+        self.ttl = ttl
+        self._inflight = SingleFlight()
+
+    def parse(self, query_text: str) -> Dict[str, Any]:
+        """Parser update for the query: {"query": ...} with tickers, or {"error_messages": [...]}."""
+        return self.parser({"query": {"user_input": query_text}})
+
+    def stream(
+        self, query_text: str, refresh: bool = False, ttl: Optional[float] = None, deadline: Optional[float] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Workflow.stream, except the "final" event also says where the report came from.
+
+        "source" is "cache" for a stored report, "shared" when another request was already
+        producing the same one, and "fresh" when this request ran the workflow. A shared
+        report is preceded by a {"type": "waiting"} event. With refresh, a stored report
+        is ignored and replaced. deadline (seconds) applies to a fresh run.
+        """
+        parsed = self.parse(query_text)
+        if parsed.get("error_messages") or not parsed.get("query", {}).get("tickers"):
+            errors = parsed.get("error_messages") or ["Could not identify any stocks in your query"]
+            yield {"type": "final", "state": {"error_messages": errors}, "source": "fresh"}
+            return
+
+        query = parsed["query"]
+        preset = {"tickers": sorted(query["tickers"]), "analysis_type": query.get("analysis_type", "single")}
+        key = canonical_key(preset)
+
+        cached = None if refresh else self.cache.get(key)
+        if cached is not None:
+            REGISTRY.inc("report_requests_total", "Report requests by how they were served", source="cache")
+            yield {"type": "final", "state": cached, "source": "cache"}
+            return
+
+        future, leader = self._inflight.begin(key)
+        if not leader:
+            REGISTRY.inc("report_requests_total", "Report requests by how they were served", source="shared")
+            yield {"type": "waiting"}
+            yield {"type": "final", "state": future.result(), "source": "shared"}
+            return
+
+        REGISTRY.inc("report_requests_total", "Report requests by how they were served", source="fresh")
+        # The run goes on in its own thread, so it still finishes for everyone waiting on it
+        # if this request's consumer goes away (e.g. a closed browser tab closes the generator)
+        events: queue.Queue = queue.Queue()
+        threading.Thread(
+            target=contextvars.copy_context().run,
+            args=(self._produce, key, query_text, preset, deadline, ttl, events),
+            name=f"report-{key}",
+            daemon=True,
+        ).start()
+        while True:
+            event = events.get()
+            if event["type"] == "error":
+                raise event["error"]
+            yield event
+            if event["type"] == "final":
+                return
+
+    def _produce(self, key: str, query_text: str, preset: Dict[str, Any], deadline: Optional[float],
+                 ttl: Optional[float], events: queue.Queue) -> None:
+        """Run the workflow for key: progress events go to events, the report to everyone waiting on key."""
+        try:
+            final_state = None
+            for event in self.workflow.stream(query_text, parsed=preset, deadline=deadline):
+                if event["type"] == "final":
+                    final_state = event["state"]
+                else:
+                    events.put(event)
+
+            report = {field: final_state.get(field) for field in REPORT_FIELDS}
+            # Failed and deadline-cut runs are shared with whoever was waiting, but never cached
+            if not report["error_messages"] and not report["skipped"] and report["executive_summary"]:
+                self.cache.set(key, report, ttl or self.ttl)
+        except BaseException as e:
+            self._inflight.finish(key, error=e)
+            events.put({"type": "error", "error": e})
+            return
+
+        self._inflight.finish(key, result=report)
+        events.put({"type": "final", "state": final_state, "source": "fresh"})
+
+    def run(
+        self, query_text: str, refresh: bool = False, ttl: Optional[float] = None, deadline: Optional[float] = None
+    ) -> Dict[str, Any]:
+        final = {}
+        for event in self.stream(query_text, refresh=refresh, ttl=ttl, deadline=deadline):
+            final = event
+        return final["state"]
+
+    def renew(self, query: Dict[str, Any], ttl: Optional[float] = None) -> bool:
+        """Serve the stored report for a parsed query for another ttl seconds; False if there is none."""
+        key = canonical_key(query)
+        report = self.cache.get(key)
+        if report is None:
+            return False
+        self.cache.set(key, report, ttl or self.ttl)
+        return True
@@ -1,14 +1,58 @@
 import argparse
+import sys
 from workflow import Workflow
+from batch import read_queries, run_batch, format_summary
+from config import BATCH_CONCURRENCY, REQUEST_DEADLINE, WATCHLIST_INTERVAL
+from deadline import format_skipped
+from metrics import format_run_metrics
 
 
 def main():
     parser = argparse.ArgumentParser(description="Run the stock research agent from your terminal.")
-    parser.add_argument("query", type=str, help="Your query, e.g., 'Compare AAPL and MSFT'")
+    parser.add_argument("query", type=str, nargs="?", help="Your query, e.g., 'Compare AAPL and MSFT'")
+    parser.add_argument("--no-stream", action="store_true",
+                        help="Wait for the full report instead of streaming progress and summary tokens")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="Run every query (or bare ticker) in FILE, one per line; use '-' for stdin")
+    parser.add_argument("--output", metavar="FILE", default="batch_results.jsonl",
+                        help="Where batch mode streams JSONL results (default: batch_results.jsonl)")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY,
+                        help=f"Maximum workflows running at once in batch mode (default: {BATCH_CONCURRENCY})")
+    parser.add_argument("--metrics", action="store_true",
+                        help="Print where the run's time, tokens and estimated cost went")
+    parser.add_argument("--watch", metavar="FILE",
+                        help="Keep the reports for every query (or ticker) in FILE fresh, re-checking on a schedule")
+    parser.add_argument("--interval", type=int, default=WATCHLIST_INTERVAL,
+                        help=f"Seconds between watchlist passes (default: {WATCHLIST_INTERVAL})")
+    parser.add_argument("--once", action="store_true", help="Make a single watchlist pass and exit")
+    parser.add_argument("--deadline", type=float, default=REQUEST_DEADLINE, metavar="SECONDS",
+                        help="Finish within SECONDS, giving up optional steps and marking the report partial "
+                             f"if needed (default: {REQUEST_DEADLINE:g}, 0 for no deadline)")
+    parser.add_argument("--resume", metavar="RUN_ID",
+                        help="Continue a crashed or interrupted run from its last completed step")
+    parser.add_argument("--inspect", metavar="RUN_ID",
+                        help="Show the checkpointed steps of a run and where it stopped")
     args = parser.parse_args()
 
-    workflow = Workflow()
-    final_state = workflow.run(args.query)
+    if args.batch:
+        run_batch_mode(args)
+        return
+    if args.watch:
+        run_watch_mode(args)
+        return
+    if args.inspect:
+        inspect_run(Workflow(), args.inspect)
+        return
+    if not args.query and not args.resume:
+        parser.error("a query is required unless --batch, --watch, --resume or --inspect is given")
+
+    workflow = Workflow(deadline=args.deadline)
+    if args.resume:
+        final_state = workflow.resume(args.resume)
+    elif args.no_stream:
+        final_state = workflow.run(args.query)
+    else:
+        final_state = stream_to_terminal(workflow, args.query)
 
     print("\n" + "─" * 50)
 
@@ -17,13 +61,100 @@ def main():
         for error in final_state["error_messages"]:
             print(f"  {error}")
     else:
-        if final_state.get("executive_summary"):
+        # When streaming, the summary has already been printed as it was written
+        if final_state.get("executive_summary") and args.no_stream:
             print("📝 Executive Summary:")
             print(final_state["executive_summary"])
 
         if final_state.get("comparison_dashboard"):
             print(final_state["comparison_dashboard"])
 
+    if final_state.get("skipped"):
+        print(f"⏱️ Partial report, skipped to meet the deadline: {format_skipped(final_state['skipped'])}")
+
+    if args.metrics and final_state.get("metrics"):
+        print(format_run_metrics(final_state["metrics"]))
+    print(f"🔖 Run id: {final_state.get('run_id')}")
+
+
+def inspect_run(workflow: Workflow, run_id: str):
+    history = workflow.state_history(run_id)
+    if not history:
+        print(f"❌ No checkpoints found for run {run_id}")
+        return
+
+    for checkpoint in history:
+        nodes = ", ".join(checkpoint["nodes"]) or "input"
+        upcoming = ", ".join(checkpoint["next"]) or "done"
+        print(f"  step {checkpoint['step']:>2}  {nodes:<40} → {upcoming}")
+
+    state = workflow.get_state(run_id)
+    values = state["values"]
+    print("\n" + "─" * 50)
+    print(f"Query: {values.get('query', {}).get('user_input', '')}")
+    if state["completed"]:
+        print("✅ Run completed")
+    else:
+        print(f"⏸️ Stopped before: {', '.join(state['next'])} (resume with --resume {run_id})")
+    for error in values.get("error_messages", []):
+        print(f"  ❌ {error}")
+
+
+def stream_to_terminal(workflow: Workflow, query: str) -> dict:
+    final_state = {}
+    in_summary = False
+
+    for event in workflow.stream(query):
+        if event["type"] == "token":
+            if not in_summary:
+                print("\n📝 Executive Summary:")
+                in_summary = True
+            print(event["content"], end="", flush=True)
+        elif event["type"] == "node":
+            if in_summary:
+                print("\n")
+                in_summary = False
+            print(f"   ✔ {event['node']} done")
+            if event["node"] == "validate_report" and (event["update"] or {}).get("needs_retry"):
+                print("🔁 Summary failed validation, regenerating...")
+        else:
+            final_state = event["state"]
+
+    return final_state
+
+
+def run_batch_mode(args):
+    if args.batch == "-":
+        queries = read_queries(sys.stdin)
+    else:
+        with open(args.batch) as f:
+            queries = read_queries(f)
+
+    # One workflow for the whole batch, so market data for a ticker is fetched once
+    workflow = Workflow(share_market_data=True, deadline=args.deadline)
+    with open(args.output, "w") as output:
+        summary = run_batch(workflow, queries, output, args.concurrency)
+
+    print("\n" + "─" * 50)
+    print(format_summary(summary))
+    print(f"Results written to {args.output}")
+
+
+def run_watch_mode(args):
+    from reports import ReportService
+    from watchlist import WatchlistRefresher
+
+    with open(args.watch) as f:
+        entries = read_queries(f)
+
+    # Reports land in the shared report cache, where the web app serves them from
+    refresher = WatchlistRefresher(ReportService(Workflow()), entries, interval=args.interval)
+    print(f"👀 Watching {len(entries)} entries, every {args.interval}s (Ctrl+C to stop)")
+    try:
+        refresher.run(passes=1 if args.once else None)
+    except KeyboardInterrupt:
+        print("\n👋 Stopped watching")
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,158 @@
+import json
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Iterator, Optional
+
+from langchain_core.callbacks import CallbackManagerForToolRun
+from langchain_core.tools import BaseTool
+
+from cache import TTLCache
+from metrics import record_search
+from ratelimit import provider_limiter
+from config import (
+    TAVILY_API_KEY,
+    SEARCH_CACHE_PATH,
+    SEARCH_CACHE_SIZE,
+    SEARCH_CACHE_MAX_DISK_ENTRIES,
+    SEARCH_TTL_QUOTE,
+    SEARCH_TTL_NEWS,
+    SEARCH_TTL_PROFILE,
+    SEARCH_TTL_DEFAULT,
+    RATE_LIMIT_MAX_RETRIES,
+    require_api_keys,
+)
+
+# Checked in order, so a query mentioning both price and business gets the shorter TTL
+QUERY_KINDS = [
+    ("quote", re.compile(r"\b(price|quote|market cap|capitali[sz]ation|p/?e|beta|trading|today|52.week)\b")),
+    ("news", re.compile(r"\b(news|latest|recent|earnings|announce\w*|headlines?|this week|guidance)\b")),
+    ("profile", re.compile(r"\b(business|overview|profile|revenue streams?|segments?|products?|about|history)\b")),
+]
+
+SEARCH_TTLS = {
+    "quote": SEARCH_TTL_QUOTE,
+    "news": SEARCH_TTL_NEWS,
+    "profile": SEARCH_TTL_PROFILE,
+    "default": SEARCH_TTL_DEFAULT,
+}
+
+
+# Set by fresh_searches(): cached results are skipped, though new ones are still cached
+_skip_cached: ContextVar[bool] = ContextVar("skip_cached_searches", default=False)
+
+
+@contextmanager
+def fresh_searches() -> Iterator[None]:
+    """Searches made inside this block (and threads started from it) go to the search engine."""
+    token = _skip_cached.set(True)
+    try:
+        yield
+    finally:
+        _skip_cached.reset(token)
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, strip punctuation and sort terms so reworded searches share a cache entry."""
+    terms = re.findall(r"[a-z0-9$%./-]+", query.lower())
+    return " ".join(sorted(set(terms)))
+
+
+def is_rate_limited(result: Any) -> bool:
+    # langchain-tavily turns HTTP errors into {"error": ...} rather than raising
+    if not isinstance(result, dict) or "error" not in result:
+        return False
+    error = str(result["error"]).lower()
+    return "429" in error or "rate limit" in error or "too many requests" in error
+
+
+def classify_query(query: str) -> str:
+    text = query.lower()
+    for kind, pattern in QUERY_KINDS:
+        if pattern.search(text):
+            return kind
+    return "default"
+
+
+class CachedSearchTool(BaseTool):
+    """Wraps a search tool with a TTL cache keyed on the normalized query and its options."""
+
+    inner: BaseTool
+    cache: Any
+
+    def _run(
+        self,
+        query: str,
+        run_manager: Optional[CallbackManagerForToolRun] = None,
+        **kwargs: Any,
+    ) -> Any:
+        options = {k: v for k, v in kwargs.items() if v is not None}
+        cached = None if _skip_cached.get() else self.cache.get(self._key(query, options))
+        if cached is not None:
+            record_search(0.0, cache_hit=True)
+            return cached
+        return self._fetch(query, options)
+
+    def refresh(self, query: str, **options: Any) -> Any:
+        """Search again regardless of the cache, and cache what comes back."""
+        return self._fetch(query, {k: v for k, v in options.items() if v is not None})
+
+    @staticmethod
+    def _key(query: str, options: dict) -> str:
+        return json.dumps([normalize_query(query), options], sort_keys=True)
+
+    def _fetch(self, query: str, options: dict) -> Any:
+        limiter = provider_limiter("tavily")
+        started = time.perf_counter()
+        for attempt in range(RATE_LIMIT_MAX_RETRIES + 1):
+            limiter.acquire()
+            result = self.inner.invoke({"query": query, **options})
+            if not is_rate_limited(result) or attempt == RATE_LIMIT_MAX_RETRIES:
+                break
+            limiter.backoff(attempt)
+        record_search(time.perf_counter() - started, cache_hit=False)
+        # Tavily reports API failures as {"error": ...} instead of raising; never cache those
+        if isinstance(result, dict) and "error" not in result:
+            self.cache.set(self._key(query, options), result, SEARCH_TTLS[classify_query(query)])
+        return result
+
+
+def cached_search(tool: BaseTool, cache: Optional[TTLCache] = None) -> CachedSearchTool:
+    if cache is None:
+        cache = TTLCache(
+            "search_results",
+            max_entries=SEARCH_CACHE_SIZE,
+            path=SEARCH_CACHE_PATH,
+            max_disk_entries=SEARCH_CACHE_MAX_DISK_ENTRIES,
+        )
+    return CachedSearchTool(
+        name=tool.name,
+        description=tool.description,
+        args_schema=tool.args_schema,
+        inner=tool,
+        cache=cache,
+    )
+
+
+_search_tool: Optional[BaseTool] = None
+
+
+def set_search_tool(tool: Optional[BaseTool]) -> None:
+    """Use tool instead of the shared Tavily tool for agents built after this call."""
+    global _search_tool
+    _search_tool = tool
+
+
+def get_search_tool() -> BaseTool:
+    return _search_tool or _default_search_tool()
+
+
+@lru_cache(maxsize=None)
+def _default_search_tool() -> CachedSearchTool:
+    """The shared, cached Tavily tool, built on first use."""
+    from langchain_tavily import TavilySearch
+
+    require_api_keys()
+    return cached_search(TavilySearch(max_results=7, tavily_api_key=TAVILY_API_KEY))
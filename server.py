@@ -0,0 +1,214 @@
+"""Server mode: an HTTP job API in front of a pool of worker processes.
+
+Requests are queued in SQLite (jobqueue.py). Each worker process holds a warm Workflow and
+runs SERVER_WORKER_THREADS jobs at once. Workers share the on-disk search, LLM, artifact and
+report caches, so work done by one is reused by all of them.
+
+    python server.py --workers 4 --port 8000
+    curl -X POST localhost:8000/jobs -H 'Content-Type: application/json' -d '{"query": "Compare AAPL and MSFT"}'
+    curl localhost:8000/jobs/JOB_ID/result
+"""
+import argparse
+import importlib
+import multiprocessing
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, Field
+
+from config import (
+    JOB_POLL_INTERVAL,
+    LLM_CACHE_PATH,
+    SEARCH_CACHE_PATH,
+    SERVER_WORKER_THREADS,
+    SERVER_WORKERS,
+)
+from jobqueue import ACTIVE, JobQueue
+
+# Imported by warm_up() so the first job in a worker doesn't pay for it
+WARM_MODULES = ("langchain_openai", "langgraph.prebuilt", "deepeval.metrics")
+
+# How often the pool checks for workers that died
+SUPERVISE_INTERVAL = 1.0
+
+
+class JobRequest(BaseModel):
+    query: str = Field(..., min_length=1, description="e.g. 'Compare AAPL and MSFT'")
+    refresh: bool = Field(False, description="Ignore a cached report and run afresh")
+    deadline: Optional[float] = Field(None, gt=0, description="Seconds the run may take before degrading")
+
+
+def warm_up(workflow) -> None:
+    """Compile the graph and load what the first run would, before taking jobs."""
+    workflow.app
+    for module in WARM_MODULES:
+        importlib.import_module(module)
+
+
+def run_job(reports, job: Dict[str, Any]) -> tuple[Dict[str, Any], Optional[str]]:
+    """The job's report and where it came from, and the first error if it failed."""
+    from reports import REPORT_FIELDS
+
+    options = job["options"]
+    final = {}
+    for event in reports.stream(job["query"], refresh=options.get("refresh", False), deadline=options.get("deadline")):
+        final = event
+    state = final["state"]
+    result = {field: state.get(field) for field in REPORT_FIELDS}
+    result["run_id"] = state.get("run_id")
+    result["source"] = final.get("source")
+    errors = state.get("error_messages") or []
+    return result, errors[0] if errors else None
+
+
+def worker_main(threads: int, stop) -> None:
+    """Entry point of a worker process: take jobs from the queue until stop.value is set."""
+    from reports import ReportService
+    from workflow import Workflow
+
+    worker = str(os.getpid())
+    queue = JobQueue()
+    # One workflow shared by the process's threads, so concurrent jobs for a ticker share one
+    # market data fetch; shared results expire after ARTIFACT_MAX_AGE like stored artifacts
+    workflow = Workflow(share_market_data=True)
+    reports = ReportService(workflow)
+    warm_up(workflow)
+    print(f"👷 Worker {worker} ready ({threads} at a time)", flush=True)
+
+    def take_jobs():
+        while not stop.value:
+            job = queue.claim(worker)
+            if job is None:
+                time.sleep(JOB_POLL_INTERVAL)
+                continue
+            try:
+                result, error = run_job(reports, job)
+            except Exception as e:
+                result, error = None, f"A critical error occurred: {str(e)}"
+            queue.finish(job["id"], result=result, error=error)
+
+    runners = [threading.Thread(target=take_jobs, name=f"job-runner-{i}") for i in range(max(1, threads))]
+    for runner in runners:
+        runner.start()
+    for runner in runners:
+        runner.join()
+
+
+class WorkerPool:
+    """Worker processes, restarted when one dies; the jobs it was running go back in the queue."""
+
+    def __init__(self, queue: JobQueue, workers: int = SERVER_WORKERS, threads: int = SERVER_WORKER_THREADS):
+        self.queue = queue
+        self.workers = max(1, workers)
+        self.threads = threads
+        # Spawned rather than forked: the parent's threads and SQLite connections don't survive a fork
+        self._context = multiprocessing.get_context("spawn")
+        # A lock-free flag, not an Event: a worker killed while waiting on an Event keeps its lock
+        self._stop_workers = self._context.RawValue("b", 0)
+        self._stop = threading.Event()
+        self._processes: List[multiprocessing.Process] = []
+        self._supervisor: Optional[threading.Thread] = None
+
+    def _spawn(self):
+        process = self._context.Process(target=worker_main, args=(self.threads, self._stop_workers), daemon=True)
+        process.start()
+        return process
+
+    def start(self) -> None:
+        # Jobs left running by a previous server never finish otherwise
+        requeued = self.queue.requeue()
+        if requeued:
+            print(f"🔁 Requeued {requeued} jobs left running by the last server")
+        self._processes = [self._spawn() for _ in range(self.workers)]
+        self._supervisor = threading.Thread(target=self._supervise, name="worker-supervisor", daemon=True)
+        self._supervisor.start()
+
+    def _supervise(self) -> None:
+        while not self._stop.wait(SUPERVISE_INTERVAL):
+            for index, process in enumerate(self._processes):
+                if process.is_alive():
+                    continue
+                requeued = self.queue.requeue(str(process.pid))
+                print(f"⚠️ Worker {process.pid} exited ({process.exitcode}); restarting, {requeued} jobs requeued")
+                self._processes[index] = self._spawn()
+
+    def alive(self) -> int:
+        return sum(process.is_alive() for process in self._processes)
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """Let workers finish the jobs they have, then end them."""
+        self._stop.set()
+        self._stop_workers.value = 1
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+
+
+def create_app(queue: JobQueue, pool: Optional[WorkerPool] = None) -> FastAPI:
+    app = FastAPI(title="Stock Research Jobs")
+
+    def status(job: Dict[str, Any]) -> Dict[str, Any]:
+        fields = ("id", "query", "status", "error", "created_at", "started_at", "finished_at")
+        return {field: job[field] for field in fields}
+
+    @app.post("/jobs", status_code=202)
+    def submit(request: JobRequest) -> Dict[str, Any]:
+        options = {key: value for key, value in request.model_dump(exclude={"query"}).items() if value}
+        return status(queue.submit(request.query.strip(), **options))
+
+    @app.get("/jobs/{job_id}")
+    def get_status(job_id: str) -> Dict[str, Any]:
+        job = queue.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"No job {job_id}")
+        return status(job)
+
+    @app.get("/jobs/{job_id}/result")
+    def get_result(job_id: str):
+        job = queue.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"No job {job_id}")
+        # Still queued or running: 202 with the status, so clients know to poll again
+        if job["status"] in ACTIVE:
+            return JSONResponse(status(job), status_code=202)
+        return {**status(job), "result": job["result"]}
+
+    @app.get("/health")
+    def health() -> Dict[str, Any]:
+        return {"workers": pool.alive() if pool else 0, "jobs": queue.counts()}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve stock research jobs from a pool of worker processes.")
+    parser.add_argument("--workers", type=int, default=SERVER_WORKERS,
+                        help=f"Worker processes (default: {SERVER_WORKERS})")
+    parser.add_argument("--threads", type=int, default=SERVER_WORKER_THREADS,
+                        help=f"Jobs each worker runs at once (default: {SERVER_WORKER_THREADS})")
+    parser.add_argument("--host", default=os.getenv("SERVER_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("SERVER_PORT", "8000")))
+    args = parser.parse_args()
+
+    if not SEARCH_CACHE_PATH or not LLM_CACHE_PATH:
+        print("⚠️ Search or LLM cache is memory-only; workers will not share its results")
+
+    import uvicorn
+
+    queue = JobQueue()
+    pool = WorkerPool(queue, args.workers, args.threads)
+    pool.start()
+    print(f"🚀 Serving jobs on http://{args.host}:{args.port} with {args.workers} workers")
+    try:
+        uvicorn.run(create_app(queue, pool), host=args.host, port=args.port)
+    finally:
+        pool.stop()
+
+
+if __name__ == "__main__":
+    main()
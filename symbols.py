@@ -0,0 +1,249 @@
+import re
+from functools import lru_cache
+from typing import Optional
+
+# (ticker, company name, extra aliases). Aliases must point at exactly one ticker;
+# names shared by several listings (e.g. share classes) only map to the primary one.
+SYMBOLS = [
+    ("AAPL", "Apple", ["apple inc", "iphone maker"]),
+    ("MSFT", "Microsoft", ["microsoft corp", "microsoft corporation"]),
+    ("GOOGL", "Alphabet", ["google", "alphabet inc"]),
+    ("AMZN", "Amazon", ["amazon.com", "amazon com"]),
+    ("META", "Meta Platforms", ["meta", "facebook"]),
+    ("NVDA", "Nvidia", ["nvidia corp", "nvidia corporation"]),
+    ("TSLA", "Tesla", ["tesla motors", "tesla inc"]),
+    ("NFLX", "Netflix", []),
+    ("AMD", "Advanced Micro Devices", ["amd"]),
+    ("INTC", "Intel", ["intel corp"]),
+    ("AVGO", "Broadcom", []),
+    ("QCOM", "Qualcomm", []),
+    ("TXN", "Texas Instruments", []),
+    ("MU", "Micron Technology", ["micron"]),
+    ("ARM", "Arm Holdings", []),
+    ("TSM", "Taiwan Semiconductor", ["tsmc", "taiwan semiconductor manufacturing"]),
+    ("ASML", "ASML Holding", ["asml"]),
+    ("SMCI", "Super Micro Computer", ["supermicro", "super micro"]),
+    ("ORCL", "Oracle", []),
+    ("CRM", "Salesforce", []),
+    ("ADBE", "Adobe", []),
+    ("IBM", "IBM", ["international business machines"]),
+    ("CSCO", "Cisco", ["cisco systems"]),
+    ("NOW", "ServiceNow", []),
+    ("INTU", "Intuit", []),
+    ("SNOW", "Snowflake", []),
+    ("PLTR", "Palantir", ["palantir technologies"]),
+    ("SHOP", "Shopify", []),
+    ("UBER", "Uber", ["uber technologies"]),
+    ("LYFT", "Lyft", []),
+    ("ABNB", "Airbnb", []),
+    ("SPOT", "Spotify", []),
+    ("PYPL", "PayPal", []),
+    ("SQ", "Block", ["square", "block inc"]),
+    ("COIN", "Coinbase", []),
+    ("HOOD", "Robinhood", ["robinhood markets"]),
+    ("SNAP", "Snap", ["snapchat"]),
+    ("PINS", "Pinterest", []),
+    ("RDDT", "Reddit", []),
+    ("DIS", "Disney", ["walt disney"]),
+    ("CMCSA", "Comcast", []),
+    ("T", "AT&T", ["at&t", "at and t"]),
+    ("VZ", "Verizon", []),
+    ("TMUS", "T-Mobile", ["t-mobile", "t mobile"]),
+    ("BABA", "Alibaba", []),
+    ("JD", "JD.com", ["jd.com"]),
+    ("PDD", "PDD Holdings", ["pinduoduo", "temu"]),
+    ("BIDU", "Baidu", []),
+    ("NIO", "NIO", ["nio"]),
+    ("RIVN", "Rivian", ["rivian automotive"]),
+    ("LCID", "Lucid", ["lucid motors", "lucid group"]),
+    ("F", "Ford", ["ford motor"]),
+    ("GM", "General Motors", []),
+    ("TM", "Toyota", ["toyota motor"]),
+    ("HMC", "Honda", ["honda motor"]),
+    ("STLA", "Stellantis", []),
+    ("BA", "Boeing", []),
+    ("AIR", "Airbus", []),
+    ("LMT", "Lockheed Martin", ["lockheed"]),
+    ("RTX", "RTX", ["raytheon"]),
+    ("NOC", "Northrop Grumman", ["northrop"]),
+    ("GE", "General Electric", ["ge aerospace"]),
+    ("CAT", "Caterpillar", []),
+    ("DE", "Deere", ["john deere", "deere & company"]),
+    ("HON", "Honeywell", []),
+    ("MMM", "3M", ["3m"]),
+    ("UPS", "United Parcel Service", ["ups"]),
+    ("FDX", "FedEx", []),
+    ("DAL", "Delta Air Lines", ["delta airlines"]),
+    ("UAL", "United Airlines", []),
+    ("AAL", "American Airlines", []),
+    ("LUV", "Southwest Airlines", ["southwest"]),
+    ("JPM", "JPMorgan Chase", ["jpmorgan", "jp morgan", "chase"]),
+    ("BAC", "Bank of America", ["bofa"]),
+    ("WFC", "Wells Fargo", []),
+    ("C", "Citigroup", ["citi", "citibank"]),
+    ("GS", "Goldman Sachs", ["goldman"]),
+    ("MS", "Morgan Stanley", []),
+    ("SCHW", "Charles Schwab", ["schwab"]),
+    ("BLK", "BlackRock", []),
+    ("V", "Visa", []),
+    ("MA", "Mastercard", []),
+    ("AXP", "American Express", ["amex"]),
+    ("BRK.B", "Berkshire Hathaway", ["berkshire"]),
+    ("WMT", "Walmart", []),
+    ("COST", "Costco", []),
+    ("TGT", "Target", []),
+    ("HD", "Home Depot", ["the home depot"]),
+    ("LOW", "Lowe's", ["lowes", "lowe's"]),
+    ("NKE", "Nike", []),
+    ("SBUX", "Starbucks", []),
+    ("MCD", "McDonald's", ["mcdonalds", "mcdonald's"]),
+    ("CMG", "Chipotle", ["chipotle mexican grill"]),
+    ("KO", "Coca-Cola", ["coca cola", "coke"]),
+    ("PEP", "PepsiCo", ["pepsi"]),
+    ("PG", "Procter & Gamble", ["procter and gamble", "p&g"]),
+    ("CL", "Colgate-Palmolive", ["colgate"]),
+    ("PM", "Philip Morris", ["philip morris international"]),
+    ("MO", "Altria", []),
+    ("JNJ", "Johnson & Johnson", ["johnson and johnson", "j&j"]),
+    ("PFE", "Pfizer", []),
+    ("MRK", "Merck", []),
+    ("ABBV", "AbbVie", []),
+    ("LLY", "Eli Lilly", ["lilly"]),
+    ("NVO", "Novo Nordisk", ["novo"]),
+    ("BMY", "Bristol-Myers Squibb", ["bristol myers", "bristol-myers"]),
+    ("AMGN", "Amgen", []),
+    ("GILD", "Gilead", ["gilead sciences"]),
+    ("MRNA", "Moderna", []),
+    ("UNH", "UnitedHealth", ["unitedhealth group", "united health"]),
+    ("CVS", "CVS Health", ["cvs"]),
+    ("ISRG", "Intuitive Surgical", []),
+    ("TMO", "Thermo Fisher", ["thermo fisher scientific"]),
+    ("XOM", "Exxon Mobil", ["exxon", "exxonmobil"]),
+    ("CVX", "Chevron", []),
+    ("COP", "ConocoPhillips", ["conoco"]),
+    ("SHEL", "Shell", []),
+    ("BP", "BP", ["british petroleum"]),
+    ("OXY", "Occidental Petroleum", ["occidental"]),
+    ("NEE", "NextEra Energy", ["nextera"]),
+    ("DUK", "Duke Energy", []),
+    ("ENPH", "Enphase Energy", ["enphase"]),
+    ("FSLR", "First Solar", []),
+    ("LIN", "Linde", []),
+    ("NEM", "Newmont", []),
+    ("FCX", "Freeport-McMoRan", ["freeport mcmoran", "freeport"]),
+    ("AMT", "American Tower", []),
+    ("PLD", "Prologis", []),
+    ("O", "Realty Income", []),
+    ("SPY", "SPDR S&P 500 ETF", ["s&p 500", "s&p500", "sp500"]),
+    ("QQQ", "Invesco QQQ", ["nasdaq 100", "nasdaq-100"]),
+]
+
+# Capitalized words that look like tickers but are just English in a query
+NON_TICKER_WORDS = {
+    "I", "A", "AND", "OR", "VS", "THE", "IS", "IT", "OF", "TO", "IN", "ON", "FOR", "ME", "MY",
+    "AN", "AS", "AT", "BE", "BY", "DO", "IF", "NO", "SO", "UP", "US", "WE", "ETF", "CEO",
+    "AI", "EPS", "PE", "IPO", "USA", "YTD", "Q1", "Q2", "Q3", "Q4",
+}
+
+# Listed tickers that are also everyday words, e.g. "Is NOW a good time to buy Apple?". Written bare,
+# with no "$" and no company name around them, they could be either, so the LLM decides
+AMBIGUOUS_TICKERS = {
+    "NOW", "ALL", "ARE", "ARM", "AIR", "CAT", "LOW", "COST", "SPOT", "SNAP", "SHOP", "HOOD", "COIN", "PINS",
+    "SNOW", "DE", "MA", "MO", "MS", "PM", "O", "F", "T", "C", "V",
+}
+
+# Single-word names that are also ordinary words; only trusted when capitalized
+COMMON_WORD_ALIASES = {
+    "target", "block", "square", "shell", "chase", "snap", "visa", "meta", "coke", "novo",
+    "lilly", "ups", "lucid", "oracle", "southwest", "citi", "goldman",
+}
+
+# What comes before a word capitalized only because it starts a sentence ("" at the start of the query)
+SENTENCE_ENDS = ("", ".", "!", "?", ":", ";")
+
+COMPARISON_WORDS = re.compile(r"\b(compare[sd]?|comparison|vs\.?|versus|or|better|against|between)\b", re.IGNORECASE)
+
+TOKEN = re.compile(r"\$?[A-Za-z0-9][A-Za-z0-9&.'\-]*")
+
+
+def _words(text: str) -> list[str]:
+    return [word.lower().rstrip(".'") for word in TOKEN.findall(text)]
+
+
+class SymbolIndex:
+    """Word-level trie over company names and aliases, plus an exact ticker set."""
+
+    def __init__(self, symbols: list[tuple[str, str, list[str]]] = SYMBOLS):
+        self.names = {ticker: name for ticker, name, _ in symbols}
+        self.trie: dict = {}
+        for ticker, name, aliases in symbols:
+            for alias in [name, *aliases]:
+                node = self.trie
+                for word in _words(alias):
+                    node = node.setdefault(word, {})
+                node["$"] = ticker
+
+    def resolve(self, query: str) -> Optional[dict]:
+        """Resolve tickers and comparison intent locally.
+
+        Returns None when the query names nothing we know or contains a ticker-like
+        token we cannot place, so the caller can fall back to the LLM.
+        """
+        spans = [match.span() for match in TOKEN.finditer(query)]
+        raw_tokens = [query[start:end] for start, end in spans]
+        words = [token.lower().rstrip(".'") for token in raw_tokens]
+        tickers: list[str] = []
+
+        i = 0
+        while i < len(words):
+            raw = raw_tokens[i].lstrip("$").rstrip(".'")
+            explicit = raw_tokens[i].startswith("$") or (raw.isupper() and raw not in NON_TICKER_WORDS)
+
+            # Longest alias match starting at this word
+            node, match, match_end = self.trie, None, i
+            for j in range(i, len(words)):
+                node = node.get(words[j])
+                if node is None:
+                    break
+                if "$" in node:
+                    match, match_end = node["$"], j + 1
+
+            if match and match_end == i + 1 and words[i] in COMMON_WORD_ALIASES:
+                if not raw[:1].isupper():
+                    match = None
+                elif query[:spans[i][0]].rstrip()[-1:] in SENTENCE_ENDS:
+                    # Capitalized only because a sentence starts here: "Chase the momentum in NVDA"
+                    return None
+
+            if explicit and raw.upper() in AMBIGUOUS_TICKERS and not raw_tokens[i].startswith("$") \
+                    and match_end <= i + 1:
+                # "NOW" alone, not "$NOW" or part of a longer name such as "Arm Holdings"
+                return None
+            if explicit and raw.upper() in self.names:
+                match, match_end = raw.upper(), max(match_end, i + 1)
+            elif explicit and match is None and 1 < len(raw) <= 5 and raw.isalpha():
+                # Looks like a ticker we don't know: let the LLM decide
+                return None
+
+            if match:
+                if match not in tickers:
+                    tickers.append(match)
+                i = match_end
+            else:
+                i += 1
+
+        is_comparison = bool(COMPARISON_WORDS.search(query))
+        # Nothing found, or a comparison where we only recognised one side
+        if not tickers or (is_comparison and len(tickers) == 1):
+            return None
+
+        return {
+            "tickers": tickers,
+            "company_names": [self.names[ticker] for ticker in tickers],
+            "is_comparison": is_comparison or len(tickers) > 1,
+        }
+
+
+@lru_cache(maxsize=None)
+def default_index() -> SymbolIndex:
+    return SymbolIndex()
@@ -0,0 +1,28 @@
+"""Offline test setup: every cache in memory, and the benchmarks' stand-ins for OpenAI, Tavily and DeepEval."""
+import argparse
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+# Points every cache at memory (and fundamentals at a scratch directory) before config is imported
+import pipeline  # noqa: E402
+
+from artifacts import default_artifacts  # noqa: E402
+from blobs import default_blobs  # noqa: E402
+from fakes import Cassette, CallStats  # noqa: E402
+
+
+@pytest.fixture
+def stand_ins() -> CallStats:
+    """Synthetic LLM, search and DeepEval answers with no latency; returns their call counts."""
+    args = argparse.Namespace(llm_latency_ms=0.0, search_latency_ms=0.0, record=False, no_cache=True)
+    stats = CallStats()
+    pipeline.install_stand_ins(args, Cassette(None), stats)
+    default_artifacts().clear()
+    default_blobs().clear()
+    return stats
@@ -0,0 +1,26 @@
+import pytest
+
+from agents import CombinedAnalysisAgent, NewsSentimentAgent, RiskAssessmentAgent, SynthesisAgent, ValidationAgent
+
+
+@pytest.fixture
+def restored_state(stand_ins):
+    """State as an older checkpoint restores it: per-ticker records as plain dicts."""
+    market_data = "AAPL trades at $230.10, P/E 35.2, beta 1.2. Apple shares rose 2% on strong iPhone demand."
+    return {
+        "query": {"user_input": "Analyze AAPL", "tickers": ["AAPL"], "analysis_type": "single"},
+        "stocks_data": {"AAPL": {
+            "market_data": market_data,
+            "news_analysis": {"sentiment": "positive", "key_points": ["iPhone demand"]},
+            "risk_assessment": {"risk_score": 4, "volatility": "medium"},
+        }},
+        "executive_summary": "AAPL trades at $230.10.",
+    }
+
+
+@pytest.mark.parametrize("agent", [
+    NewsSentimentAgent, RiskAssessmentAgent, CombinedAnalysisAgent, SynthesisAgent, ValidationAgent,
+])
+def test_agents_read_records_stored_as_dicts(agent, restored_state):
+    update = agent()(restored_state)
+    assert not update.get("error_messages")
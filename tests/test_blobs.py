@@ -0,0 +1,35 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import blobs
+from blobs import BlobStore
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = SimpleNamespace(offset=0.0)
+    fake.time = lambda: time.time() + fake.offset
+    monkeypatch.setattr(blobs, "time", fake)
+    return fake
+
+
+def test_blobs_in_use_outlive_the_ttl(tmp_path, clock):
+    path = str(tmp_path / "blobs.sqlite")
+    store = BlobStore(path=path, ttl=100)
+    store.PRUNE_INTERVAL, store.RESTAMP_INTERVAL = 1, 10
+    used = store.put("AAPL market data")
+    unused = store.put("MSFT market data")
+
+    # Still in memory, so put() and get() don't write the text again, but they restamp it
+    clock.offset = 60
+    assert store.put("AAPL market data") == used
+    clock.offset = 120
+    assert store.get(used) == "AAPL market data"
+    store.put("NVDA market data")  # prunes
+
+    reopened = BlobStore(path=path, ttl=100)
+    assert reopened.get(used) == "AAPL market data"
+    with pytest.raises(KeyError):
+        reopened.get(unused)
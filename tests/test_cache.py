@@ -0,0 +1,104 @@
+import os
+import time
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+from langchain_core.tools import BaseTool
+
+import cache
+import search
+from cache import TTLCache
+from fakes import Cassette, CallStats, FakeSearchTool
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = SimpleNamespace(offset=0.0)
+    fake.time = lambda: time.time() + fake.offset
+    monkeypatch.setattr(cache, "time", fake)
+    return fake
+
+
+def test_entries_expire(clock):
+    store = TTLCache("test")
+    store.set("AAPL", {"price": 230.1}, ttl=60)
+    assert store.get("AAPL") == {"price": 230.1}
+    clock.offset = 61
+    assert store.get("AAPL") is None
+    assert store.stats()["size"] == 0
+
+
+def test_memory_is_bounded_least_recently_used_first():
+    store = TTLCache("test", max_entries=2)
+    store.set("AAPL", 1, ttl=60)
+    store.set("MSFT", 2, ttl=60)
+    store.get("AAPL")
+    store.set("NVDA", 3, ttl=60)
+    assert store.get("MSFT") is None
+    assert store.get("AAPL") == 1 and store.get("NVDA") == 3
+
+
+def test_disk_entries_outlive_the_process_until_they_expire(tmp_path, clock):
+    path = os.path.join(tmp_path, "cache.sqlite")
+    TTLCache("test", path=path).set("AAPL", {"price": 230.1}, ttl=60)
+
+    assert TTLCache("test", path=path).get("AAPL") == {"price": 230.1}
+    clock.offset = 61
+    assert TTLCache("test", path=path).get("AAPL") is None
+
+
+def test_disk_is_pruned_to_max_disk_entries(tmp_path, monkeypatch):
+    monkeypatch.setattr(TTLCache, "PRUNE_INTERVAL", 4)
+    store = TTLCache("test", max_entries=1, path=os.path.join(tmp_path, "cache.sqlite"), max_disk_entries=2)
+    for i in range(4):
+        store.set(f"key{i}", i, ttl=60 + i)
+    rows = store._db.execute("SELECT key FROM test ORDER BY key").fetchall()
+    assert [row[0] for row in rows] == ["key2", "key3"]
+
+
+class ErrorSearch(BaseTool):
+    name: str = "tavily_search"
+    description: str = "Always fails"
+    calls: int = 0
+
+    def _run(self, query: str, **kwargs: Any) -> Any:
+        self.calls += 1
+        return {"error": "HTTP 500"}
+
+
+@pytest.fixture
+def no_rate_limit(monkeypatch):
+    monkeypatch.setattr(search, "provider_limiter", lambda provider: SimpleNamespace(acquire=lambda: None))
+
+
+def test_reworded_searches_share_an_entry(no_rate_limit):
+    stats = CallStats()
+    tool = search.cached_search(FakeSearchTool(cassette=Cassette(None), stats=stats), TTLCache("test"))
+
+    first = tool.invoke({"query": "AAPL stock latest news"})
+    assert tool.invoke({"query": "latest news: AAPL stock"}) == first
+    assert stats.calls["tavily"] == 1
+
+
+def test_failed_searches_are_not_cached(no_rate_limit):
+    inner = ErrorSearch()
+    tool = search.cached_search(inner, TTLCache("test"))
+    tool.invoke({"query": "AAPL stock price"})
+    tool.invoke({"query": "AAPL stock price"})
+    assert inner.calls == 2
+
+
+def test_quotes_expire_before_profiles(no_rate_limit, clock):
+    stats = CallStats()
+    tool = search.cached_search(FakeSearchTool(cassette=Cassette(None), stats=stats), TTLCache("test"))
+    assert search.classify_query("AAPL stock price market cap") == "quote"
+    assert search.classify_query("AAPL company business overview") == "profile"
+    assert search.SEARCH_TTLS["quote"] < search.SEARCH_TTLS["profile"]
+
+    tool.invoke({"query": "AAPL stock price market cap"})
+    tool.invoke({"query": "AAPL company business overview"})
+    clock.offset = search.SEARCH_TTLS["quote"] + 1
+    tool.invoke({"query": "AAPL stock price market cap"})
+    tool.invoke({"query": "AAPL company business overview"})
+    assert stats.calls["tavily"] == 3
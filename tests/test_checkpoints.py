@@ -0,0 +1,55 @@
+import os
+import sqlite3
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import workflow
+from workflow import Workflow
+
+DAY = 24 * 60 * 60
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = SimpleNamespace(offset=0.0)
+    fake.time = lambda: time.time() + fake.offset
+    monkeypatch.setattr(workflow, "time", fake)
+    return fake
+
+
+def test_idle_runs_are_pruned(stand_ins, tmp_path, clock, monkeypatch):
+    path = os.path.join(tmp_path, "checkpoints.sqlite")
+    flow = Workflow(checkpoint_path=path, checkpoint_ttl=7 * DAY)
+    monkeypatch.setattr(flow, "PRUNE_INTERVAL", 2)
+
+    old = flow.run("Analyze AAPL")["run_id"]
+    assert flow.get_state(old)["completed"]
+
+    # The second run is the PRUNE_INTERVAL-th, so it prunes the first, now idle for 8 days
+    clock.offset = 8 * DAY
+    new = flow.run("Analyze MSFT")["run_id"]
+
+    assert flow.get_state(old)["values"] == {}
+    with pytest.raises(ValueError):
+        flow.resume(old)
+    assert flow.get_state(new)["completed"]
+    with sqlite3.connect(path) as db:
+        assert {row[0] for row in db.execute("SELECT DISTINCT thread_id FROM checkpoints")} == {new}
+        assert {row[0] for row in db.execute("SELECT DISTINCT thread_id FROM writes")} <= {new}
+
+
+def test_prune_on_demand(stand_ins, tmp_path):
+    flow = Workflow(checkpoint_path=os.path.join(tmp_path, "checkpoints.sqlite"))
+    run_id = flow.run("Analyze AAPL")["run_id"]
+
+    assert flow.prune_checkpoints() == 0
+    assert flow.prune_checkpoints(max_age=-1) == 1
+    assert flow.get_state(run_id)["values"] == {}
+
+
+def test_no_checkpoints_nothing_to_prune(stand_ins):
+    flow = Workflow(checkpoint_path=None)
+    flow.run("Analyze AAPL")
+    assert flow.prune_checkpoints() == 0
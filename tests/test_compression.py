@@ -0,0 +1,97 @@
+import time
+
+import pytest
+
+from agents import ContextCompressionAgent, NewsSentimentAgent
+from compression import compress, fit_to_budget, split_passages, trim_context
+
+FINANCIAL_LINES = [
+    "Netflix added 9.3 million subscribers in the quarter, beating estimates.",
+    "Google's advertisement revenue rose 11% to $65.9 billion.",
+    "Spotify grew premium subscribers to 252 million.",
+    "Read more: Apple stock price is $230.10.",
+    "Apple launched a new sign up flow for Apple Card, and AAPL rose 2%.",
+    "Subscribers to the NYT newsletter rose to 11 million.",
+    "Analysts say the cookie maker's margins are under pressure.",
+    "Meta said advertisement pricing held up despite weaker demand in Europe.",
+]
+
+BOILERPLATE_LINES = [
+    "Subscribe to our newsletter",
+    "SUBSCRIBE NOW",
+    "Sign up for our free newsletter!",
+    "Advertisement",
+    "Read more",
+    "Continue reading",
+    "Click here to read more »",
+    "Reuters. All rights reserved.",
+    "Privacy Policy | Terms of Use",
+    "We use cookies to improve your experience.",
+    "Accept all cookies",
+    "Log in to continue reading",
+    "Please enable JavaScript to view this page.",
+    "Follow us on Twitter, Facebook & LinkedIn",
+    "https://example.com/markets/aapl",
+]
+
+
+@pytest.mark.parametrize("line", FINANCIAL_LINES)
+def test_content_lines_are_kept(line):
+    assert compress(line) == line
+
+
+@pytest.mark.parametrize("line", BOILERPLATE_LINES)
+def test_whole_boilerplate_lines_are_dropped(line):
+    assert compress(line) == ""
+
+
+def test_boilerplate_lines_with_figures_are_kept():
+    assert compress("Subscribe for $1 a week") == "Subscribe for $1 a week"
+
+
+def test_near_duplicates_keep_the_first():
+    text = "\n".join([
+        "Apple reported revenue of $94.9 billion for the quarter.",
+        "Advertisement",
+        "Apple reported revenue of $94.9 billion for the quarter, analysts said.",
+        "Microsoft's cloud revenue grew 29%.",
+    ])
+    assert compress(text).splitlines() == [
+        "Apple reported revenue of $94.9 billion for the quarter.",
+        "Microsoft's cloud revenue grew 29%.",
+    ]
+
+
+def test_long_paragraphs_split_into_sentences():
+    sentence = "Apple shares rose 2% after earnings beat estimates on strong services growth. "
+    assert len(split_passages(sentence * 5)) == 5
+
+
+def test_budget_keeps_whole_passages_from_the_top():
+    text = "\n".join(f"Line {i} with some market data text." for i in range(100))
+    trimmed, saved = trim_context(text, 50)
+    assert trimmed == fit_to_budget(text, 50)
+    assert text.startswith(trimmed) and trimmed.endswith("text.")
+    assert saved > 0
+    assert trim_context("short", 50) == ("short", 0)
+
+
+@pytest.mark.parametrize("line", ["log in to read " * 20 + "!x", "Privacy Policy | " * 17 + "x"])
+def test_near_miss_lines_match_quickly(line):
+    start = time.perf_counter()
+    assert compress(line) == line.strip()
+    assert time.perf_counter() - start < 0.5
+
+
+def test_compression_savings_count_once_per_prompt_sent(stand_ins):
+    raw = "AAPL trades at $230.10 after strong iPhone demand.\nSubscribe to our newsletter\nPrivacy Policy | Terms of Use\n"
+    state = {"query": {"tickers": ["AAPL"]}, "stocks_data": {"AAPL": {"market_data": raw}}}
+    update = ContextCompressionAgent()(state)
+    record = update["stocks_data"]["AAPL"]
+    assert "tokens_saved" not in update and record["compressed_tokens"] > 0
+
+    state["stocks_data"]["AAPL"] = record
+    sent = NewsSentimentAgent()(state)
+    reused = NewsSentimentAgent()(state)
+    assert sent["tokens_saved"]["news_sentiment"] == record["compressed_tokens"]
+    assert reused["tokens_saved"]["news_sentiment"] == 0
@@ -0,0 +1,139 @@
+import asyncio
+import contextvars
+import threading
+import time
+
+import pytest
+
+from concurrency import SingleFlight, map_bounded, run_async
+from http_clients import AsyncRateLimitedTransport
+from ratelimit import RateLimiter
+
+request_id = contextvars.ContextVar("request_id", default=None)
+
+
+def test_results_keep_input_order():
+    def slow_square(n):
+        time.sleep(0.01 * (5 - n))
+        return n * n
+
+    assert map_bounded(slow_square, range(5), max_workers=5) == [0, 1, 4, 9, 16]
+    assert map_bounded(slow_square, [], max_workers=5) == []
+
+
+def test_no_more_than_max_workers_at_once():
+    lock, running, peak = threading.Lock(), [0], [0]
+
+    def work(_):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.02)
+        with lock:
+            running[0] -= 1
+
+    map_bounded(work, range(12), max_workers=3)
+    assert peak[0] == 3
+
+
+def test_workers_see_the_callers_context():
+    request_id.set("run-1")
+    assert map_bounded(lambda _: request_id.get(), range(4), max_workers=4) == ["run-1"] * 4
+
+
+def test_errors_reach_the_caller():
+    def fail_on_two(n):
+        if n == 2:
+            raise ValueError("no data for ticker 2")
+        return n
+
+    with pytest.raises(ValueError, match="ticker 2"):
+        map_bounded(fail_on_two, range(4), max_workers=4)
+
+
+def test_concurrent_calls_for_a_key_share_one_execution():
+    flight, started, release = SingleFlight(), threading.Event(), threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait(1)
+        return "AAPL market data"
+
+    leader = threading.Thread(target=lambda: flight.do("AAPL", fetch))
+    leader.start()
+    started.wait(1)
+    results = []
+    followers = [threading.Thread(target=lambda: results.append(flight.do("AAPL", fetch))) for _ in range(4)]
+    for follower in followers:
+        follower.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join()
+
+    assert calls == [1]
+    assert results == ["AAPL market data"] * 4
+    # Once finished, the key is free: the next call runs again
+    assert flight.do("AAPL", lambda: "fresh") == "fresh"
+
+
+def test_errors_reach_every_waiter():
+    flight, started, release = SingleFlight(), threading.Event(), threading.Event()
+
+    def fail():
+        started.set()
+        release.wait(1)
+        raise RuntimeError("search failed")
+
+    errors = []
+
+    def call():
+        try:
+            flight.do("AAPL", fail)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait(1)
+    follower = threading.Thread(target=call)
+    follower.start()
+    time.sleep(0.05)
+    release.set()
+    leader.join()
+    follower.join()
+    assert errors == ["search failed", "search failed"]
+
+
+def test_run_async_keeps_one_loop_and_the_callers_context():
+    async def loop_and_request():
+        await asyncio.sleep(0)
+        return asyncio.get_running_loop(), request_id.get()
+
+    request_id.set("run-2")
+    first, second = run_async(loop_and_request()), run_async(loop_and_request())
+    assert first[0] is second[0]
+    assert first[1] == second[1] == "run-2"
+
+    results = map_bounded(lambda _: run_async(loop_and_request())[1], range(4), max_workers=4)
+    assert results == ["run-2"] * 4
+
+
+def test_run_async_raises_the_coroutines_error():
+    async def fail():
+        raise ValueError("judge unavailable")
+
+    with pytest.raises(ValueError, match="judge unavailable"):
+        run_async(fail())
+
+
+def test_pooled_async_transport_is_reused_across_calls():
+    transport = AsyncRateLimitedTransport(RateLimiter("test"))
+
+    async def pooled():
+        return transport._transport()
+
+    assert run_async(pooled()) is run_async(pooled())
+    assert len(transport._transports) == 1
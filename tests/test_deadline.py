@@ -0,0 +1,92 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+from langgraph.graph import END
+
+import deadline
+from agents import SynthesisAgent, ValidationAgent
+from config import DEADLINE_RESERVES
+from deadline import Budget, deadline_at, format_skipped
+from workflow import Workflow
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Moves deadline's idea of now: set clock.offset to jump ahead."""
+    fake = SimpleNamespace(offset=0.0)
+    fake.time = lambda: time.time() + fake.offset
+    monkeypatch.setattr(deadline, "time", fake)
+    return fake
+
+
+def test_no_deadline_allows_everything():
+    budget = Budget()
+    assert deadline_at(0) is None
+    assert all(budget.allows(stage) for stage in DEADLINE_RESERVES)
+    assert budget.remaining() == float("inf")
+
+
+def test_stages_stop_in_reserve_order(clock):
+    budget = Budget(deadline_at(100))
+    clock.offset = 100 - DEADLINE_RESERVES["react"] + 1
+    assert not budget.allows("react")
+    assert budget.allows("validation")
+    clock.offset = 101
+    assert not budget.allows("validation")
+
+
+def test_skips_are_listed_per_stage():
+    budget = Budget()
+    budget.skip("deepeval", "AAPL")
+    budget.skip("deepeval", "MSFT")
+    budget.skip("validation")
+    assert format_skipped(budget.skipped) == "DeepEval faithfulness check (AAPL, MSFT); report validation"
+
+
+def route(**state):
+    return Workflow(checkpoint_path=None).decide_after_validation(state)
+
+
+def test_routing_after_validation():
+    assert route(needs_retry=True, validation_result={"attempt": 1}, skipped=[]) == "synthesize_report"
+    assert route(needs_retry=True, validation_result={"attempt": 2}, skipped=[]) == END
+    assert route(needs_retry=False, validation_result={"attempt": 1}, skipped=[]) == END
+    skipped = [{"stage": "validation", "ticker": None}]
+    assert route(needs_retry=True, validation_result={"attempt": 1}, skipped=skipped) == END
+
+
+def test_validation_clears_retry_when_it_cannot_run(clock):
+    agent = ValidationAgent()
+    assert agent({"executive_summary": None, "needs_retry": True}) == {"needs_retry": False}
+
+    state = {"executive_summary": "AAPL trades at $230.", "needs_retry": True, "deadline": deadline_at(10)}
+    clock.offset = 20
+    update = agent(state)
+    assert update["needs_retry"] is False
+    assert update["skipped"] == [{"stage": "validation", "ticker": None}]
+
+
+def test_deadline_passing_during_retry_ends_the_run(stand_ins, clock, monkeypatch):
+    async def failing(self, test_case, faith_test=None):
+        return 0.0, 0.0
+
+    synthesize = SynthesisAgent.__call__
+    calls = []
+
+    def slow_retry(self, state):
+        calls.append(state)
+        result = synthesize(self, state)
+        if len(calls) == 2:
+            clock.offset = 3600
+        return result
+
+    monkeypatch.setattr(ValidationAgent, "_measure", failing)
+    monkeypatch.setattr(SynthesisAgent, "__call__", slow_retry)
+
+    result = Workflow(checkpoint_path=None).run("Analyze AAPL", deadline=600)
+
+    assert len(calls) == 2
+    assert result["executive_summary"]
+    assert {"stage": "validation", "ticker": None} in result["skipped"]
+    assert stand_ins.calls["deepeval"] == 0
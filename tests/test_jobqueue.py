@@ -0,0 +1,102 @@
+import os
+import threading
+
+import pytest
+
+from jobqueue import JobQueue
+
+
+@pytest.fixture
+def path(tmp_path):
+    return os.path.join(tmp_path, "jobs.sqlite")
+
+
+def test_identical_pending_jobs_are_one(path):
+    queue = JobQueue(path)
+    first = queue.submit("Compare AAPL and MSFT", deadline=60)
+    assert queue.submit("Compare AAPL and MSFT", deadline=60)["id"] == first["id"]
+    assert queue.submit("Compare AAPL and MSFT")["id"] != first["id"]
+
+    queue.finish(queue.claim("w1")["id"], result={"executive_summary": "..."})
+    assert queue.submit("Compare AAPL and MSFT", deadline=60)["id"] != first["id"]
+
+
+def test_jobs_are_claimed_oldest_first_and_finished(path):
+    queue = JobQueue(path)
+    first, second = queue.submit("Analyze AAPL"), queue.submit("Analyze MSFT")
+
+    job = queue.claim("w1")
+    assert job["id"] == first["id"] and job["status"] == "running" and job["worker"] == "w1"
+    assert queue.claim("w2")["id"] == second["id"]
+    assert queue.claim("w3") is None
+
+    queue.finish(first["id"], result={"executive_summary": "AAPL looks fine"})
+    queue.finish(second["id"], result=None, error="No market data")
+    assert queue.get(first["id"])["result"] == {"executive_summary": "AAPL looks fine"}
+    assert queue.get(second["id"])["status"] == "failed"
+    assert queue.counts() == {"done": 1, "failed": 1}
+    assert queue.get("missing") is None
+
+
+def test_each_job_is_claimed_once_across_connections(path):
+    ids = {JobQueue(path).submit(f"Analyze {i}")["id"] for i in range(40)}
+    claimed, lock = [], threading.Lock()
+
+    def work(worker):
+        queue = JobQueue(path)
+        while (job := queue.claim(worker)) is not None:
+            with lock:
+                claimed.append(job["id"])
+
+    threads = [threading.Thread(target=work, args=(f"w{i}",)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(claimed) == sorted(ids)
+
+
+def test_requeue_returns_running_jobs(path):
+    queue = JobQueue(path)
+    queue.submit("Analyze AAPL")
+    queue.submit("Analyze MSFT")
+    dead, alive = queue.claim("dead"), queue.claim("alive")
+
+    assert queue.requeue("dead") == 1
+    assert queue.get(dead["id"])["status"] == "queued"
+    assert queue.get(alive["id"])["status"] == "running"
+    assert queue.claim("new")["id"] == dead["id"]
+    assert queue.requeue() == 2
+
+
+def test_old_finished_jobs_are_pruned(path, monkeypatch):
+    queue = JobQueue(path, retention=0)
+    monkeypatch.setattr(JobQueue, "PRUNE_INTERVAL", 2)
+    job = queue.submit("Analyze AAPL")
+    queue.finish(queue.claim("w1")["id"], result={})
+    queue.submit("Analyze MSFT")
+    assert queue.get(job["id"]) is None
+
+
+def test_http_api(path):
+    testclient = pytest.importorskip("fastapi.testclient")
+    from server import create_app
+
+    queue = JobQueue(path)
+    client = testclient.TestClient(create_app(queue))
+
+    response = client.post("/jobs", json={"query": "Compare AAPL and MSFT", "deadline": 60})
+    assert response.status_code == 202
+    job_id = response.json()["id"]
+    assert queue.get(job_id)["options"] == {"deadline": 60}
+    assert client.post("/jobs", json={"query": ""}).status_code == 422
+
+    assert client.get(f"/jobs/{job_id}").json()["status"] == "queued"
+    assert client.get(f"/jobs/{job_id}/result").status_code == 202
+    assert client.get("/jobs/missing/result").status_code == 404
+
+    queue.finish(queue.claim("w1")["id"], result={"executive_summary": "Both look fine"})
+    result = client.get(f"/jobs/{job_id}/result")
+    assert result.status_code == 200
+    assert result.json()["result"] == {"executive_summary": "Both look fine"}
+    assert client.get("/health").json() == {"workers": 0, "jobs": {"done": 1}}
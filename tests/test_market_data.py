@@ -0,0 +1,38 @@
+import time
+from types import SimpleNamespace
+
+import cache
+from agents import MarketDataAgent
+from config import ARTIFACT_CACHE_SIZE, ARTIFACT_MAX_AGE
+
+
+def test_shared_results_expire_like_artifacts(monkeypatch):
+    clock = SimpleNamespace(offset=0.0)
+    clock.time = lambda: time.time() + clock.offset
+    monkeypatch.setattr(cache, "time", clock)
+
+    agent = MarketDataAgent(share_results=True)
+    fetches = []
+
+    def fetch(ticker, known=None, budget=None):
+        fetches.append(ticker)
+        return f"{ticker} market data #{len(fetches)}", None
+
+    monkeypatch.setattr(agent, "_fetch_ticker", fetch)
+
+    assert agent._fetch_shared("AAPL") == ("AAPL market data #1", None)
+    assert agent._fetch_shared("AAPL") == ("AAPL market data #1", None)
+    clock.offset = ARTIFACT_MAX_AGE + 1
+    assert agent._fetch_shared("AAPL") == ("AAPL market data #2", None)
+    assert fetches == ["AAPL", "AAPL"]
+    assert agent._results.max_entries == ARTIFACT_CACHE_SIZE
+
+
+def test_failed_fetches_are_not_shared(monkeypatch):
+    agent = MarketDataAgent(share_results=True)
+    answers = iter([("Failed to fetch data for AAPL", "Error fetching market data for AAPL: boom"),
+                    ("AAPL market data", None)])
+    monkeypatch.setattr(agent, "_fetch_ticker", lambda ticker, known=None, budget=None: next(answers))
+
+    assert agent._fetch_shared("AAPL")[1] is not None
+    assert agent._fetch_shared("AAPL") == ("AAPL market data", None)
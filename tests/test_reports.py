@@ -0,0 +1,74 @@
+import threading
+import time
+
+import pytest
+
+from agents import SynthesisAgent
+from cache import TTLCache
+from reports import ReportService
+from workflow import Workflow
+
+
+@pytest.fixture
+def service(stand_ins):
+    return ReportService(Workflow(checkpoint_path=None), cache=TTLCache("test_reports"))
+
+
+@pytest.fixture
+def held_synthesis(monkeypatch):
+    """Synthesis waits until the returned event is set, so requests can gather around one run."""
+    release = threading.Event()
+    synthesize = SynthesisAgent.__call__
+
+    def held(self, state):
+        release.wait(5)
+        return synthesize(self, state)
+
+    monkeypatch.setattr(SynthesisAgent, "__call__", held)
+    return release
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    assert condition()
+
+
+def test_identical_requests_share_a_run_then_the_cache(service):
+    first = service.run("Compare AAPL and MSFT")
+    assert first["executive_summary"]
+
+    events = list(service.stream("MSFT vs AAPL"))
+    assert events[-1]["source"] == "cache"
+    assert events[-1]["state"]["executive_summary"] == first["executive_summary"]
+
+
+def test_waiters_get_the_report_when_the_leader_disconnects(service, held_synthesis):
+    leader = service.stream("Compare AAPL and MSFT")
+    assert next(leader)["type"] == "node"
+
+    waiter_events = []
+    waiter = threading.Thread(target=lambda: waiter_events.extend(service.stream("MSFT vs AAPL")))
+    waiter.start()
+    wait_for(lambda: waiter_events)
+
+    # The leader's consumer goes away mid-run
+    leader.close()
+    held_synthesis.set()
+    waiter.join(5)
+
+    assert [event["type"] for event in waiter_events] == ["waiting", "final"]
+    assert waiter_events[-1]["source"] == "shared"
+    assert waiter_events[-1]["state"]["executive_summary"]
+    # The run finished and was cached even though its leader left
+    wait_for(lambda: list(service.stream("Compare AAPL and MSFT"))[-1]["source"] == "cache")
+
+
+def test_run_errors_reach_the_leader_and_waiters(service, monkeypatch):
+    def broken(self, state):
+        raise RuntimeError("synthesis failed")
+
+    monkeypatch.setattr(SynthesisAgent, "__call__", broken)
+    with pytest.raises(RuntimeError, match="synthesis failed"):
+        service.run("Compare AAPL and MSFT")
@@ -0,0 +1,57 @@
+import pytest
+
+from agents import QueryParserAgent
+from symbols import SymbolIndex
+
+
+@pytest.fixture(scope="module")
+def index():
+    return SymbolIndex()
+
+
+@pytest.mark.parametrize("query, tickers, comparison", [
+    ("Analyze AAPL", ["AAPL"], False),
+    ("Compare Apple and Microsoft", ["AAPL", "MSFT"], True),
+    ("MSFT vs AAPL", ["MSFT", "AAPL"], True),
+    ("What is the risk profile for Tesla?", ["TSLA"], False),
+    ("Analyze ServiceNow", ["NOW"], False),
+    ("Compare $NOW and Salesforce", ["NOW", "CRM"], True),
+    ("Arm Holdings vs Nvidia", ["ARM", "NVDA"], True),
+    ("Is Target a buy?", ["TGT"], False),
+    ("How is Berkshire doing", ["BRK.B"], False),
+])
+def test_known_names_and_tickers_resolve_locally(index, query, tickers, comparison):
+    parsed = index.resolve(query)
+    assert parsed["tickers"] == tickers
+    assert parsed["is_comparison"] is comparison
+
+
+@pytest.mark.parametrize("query", [
+    # Everyday words that are also listed tickers
+    "Is NOW a good time to buy Apple?",
+    "SNAP",
+    "Should I buy AAPL or COST",
+    # Name-words capitalized only because they start a sentence
+    "Chase the momentum in NVDA",
+    "Buy NVDA. Target prices look stretched",
+    # Ticker-like tokens we don't know, or nothing we know at all
+    "Analyze XYZQ",
+    "How is the market today?",
+    # A comparison with only one side recognised
+    "Compare Apple and some startup",
+])
+def test_ambiguous_queries_go_to_the_llm(index, query):
+    assert index.resolve(query) is None
+
+
+def test_common_words_only_count_when_capitalized(index):
+    assert index.resolve("I need to target growth stocks like Nvidia")["tickers"] == ["NVDA"]
+
+
+def test_parser_asks_the_llm_about_ambiguous_words(stand_ins):
+    update = QueryParserAgent()({"query": {"user_input": "Is NOW a good time to buy Apple?"}})
+    assert stand_ins.calls["query_parser"] == 1
+    assert update["query"]["user_input"] == "Is NOW a good time to buy Apple?"
+
+    QueryParserAgent()({"query": {"user_input": "Compare Apple and Microsoft"}})
+    assert stand_ins.calls["query_parser"] == 1
@@ -0,0 +1,103 @@
+import asyncio
+import warnings
+
+import pytest
+
+deepeval_metrics = pytest.importorskip("deepeval.metrics")
+
+from deepeval.metrics import FaithfulnessMetric  # noqa: E402
+from deepeval.metrics.faithfulness.schema import FaithfulnessVerdict  # noqa: E402
+from deepeval.test_case import LLMTestCase  # noqa: E402
+
+import agents.validation as validation  # noqa: E402
+from agents import ValidationAgent  # noqa: E402
+from cache import TTLCache  # noqa: E402
+from compression import count_tokens  # noqa: E402
+from config import CONTEXT_BUDGETS  # noqa: E402
+
+
+def test_eval_model_is_current(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", DeprecationWarning)
+        model = validation.get_eval_model()
+    assert type(model).__name__ == "OpenAIModel"
+
+
+def test_installed_deepeval_has_the_cached_steps():
+    # Fails on a DeepEval upgrade that renames or stops calling the steps the cache overrides
+    assert validation.cache_hooks_supported(FaithfulnessMetric)
+
+
+@pytest.fixture
+def judge(monkeypatch):
+    """FaithfulnessMetric's LLM steps answered locally; records what each step was asked."""
+    asked = {"truths": 0, "verdicts": []}
+
+    async def truths(self, retrieval_context, multimodal):
+        asked["truths"] += 1
+        return ["Apple trades at $230."]
+
+    async def claims(self, actual_output, multimodal):
+        return actual_output.split("\n")
+
+    async def verdicts(self, multimodal):
+        asked["verdicts"].append(list(self.claims))
+        return [FaithfulnessVerdict(verdict="yes") for _ in self.claims]
+
+    async def reason(self, multimodal):
+        return "All claims are supported."
+
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(FaithfulnessMetric, "_a_generate_truths", truths)
+    monkeypatch.setattr(FaithfulnessMetric, "_a_generate_claims", claims)
+    monkeypatch.setattr(FaithfulnessMetric, "_a_generate_verdicts", verdicts)
+    monkeypatch.setattr(FaithfulnessMetric, "_a_generate_reason", reason)
+    return asked
+
+
+def measure(metric, output):
+    test_case = LLMTestCase(input="Analyze AAPL", actual_output=output, retrieval_context=["AAPL: $230"])
+    return asyncio.run(metric.a_measure(test_case, _show_indicator=False))
+
+
+def test_retry_only_judges_new_claims(judge):
+    truth_cache, verdict_cache = TTLCache("truths"), TTLCache("verdicts")
+
+    assert measure(validation.make_cached_faithfulness(truth_cache, verdict_cache), "Apple trades at $230.\nIt is rated buy.") == 1.0
+    assert measure(validation.make_cached_faithfulness(truth_cache, verdict_cache), "Apple trades at $230.\nIt is a hold.") == 1.0
+
+    assert judge["truths"] == 1
+    assert judge["verdicts"] == [["Apple trades at $230.", "It is rated buy."], ["It is a hold."]]
+
+
+def test_changed_internals_fall_back_to_the_plain_metric(judge, monkeypatch):
+    monkeypatch.delattr(FaithfulnessMetric, "_a_generate_verdicts")
+    assert not validation.cache_hooks_supported(FaithfulnessMetric)
+
+    metric = validation.make_cached_faithfulness(TTLCache("truths"), TTLCache("verdicts"))
+    assert type(metric) is FaithfulnessMetric
+
+
+def test_large_basket_context_stays_within_the_budget(stand_ins, monkeypatch):
+    contexts = []
+    check = validation.precheck
+    monkeypatch.setattr(validation, "precheck", lambda summary, context: contexts.append(context) or check(summary, context))
+
+    tickers = [f"T{i:02d}" for i in range(50)]
+    state = {
+        "query": {"user_input": "Rank my portfolio", "tickers": tickers, "analysis_type": "comparison"},
+        "stocks_data": {ticker: {
+            "market_data": f"{ticker} trades at $101.50 on heavy volume.\n" * 200,
+            "news_analysis": {"sentiment": "positive", "summary": "Strong quarter. " * 100,
+                              "notable_events": [f"Event {n} for {ticker}" for n in range(40)]},
+            "risk_assessment": {"volatility": "medium", "risk_score": 5,
+                                "risk_factors": [f"Risk {n} for {ticker}" for n in range(40)]},
+        } for ticker in tickers},
+        "executive_summary": "T00 trades at $101.50.",
+    }
+    ValidationAgent()(state)
+
+    assert count_tokens(contexts[0]) <= CONTEXT_BUDGETS["validation"] * 2 + len(tickers)
+    assert "T00 news analysis sentiment: positive" in contexts[0]
+    assert "T49 risk assessment risk_score: 5" in contexts[0]
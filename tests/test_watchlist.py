@@ -0,0 +1,74 @@
+import pytest
+
+import watchlist
+from artifacts import default_artifacts
+from cache import TTLCache
+from reports import ReportService
+from watchlist import WatchlistRefresher
+from workflow import Workflow
+
+
+class ProbeSearch:
+    """Probe results that only change when told to; failing makes every search error out."""
+
+    def __init__(self):
+        self.prices = {}
+        self.failing = False
+
+    def invoke(self, args):
+        if self.failing:
+            raise RuntimeError("search is down")
+        ticker = args["query"].split()[0]
+        content = f"{ticker} trades at {self.prices.get(ticker, 100)}" if "price" in args["query"] else "no news"
+        return {"results": [{"url": f"https://example.com/{ticker}", "title": ticker, "content": content}]}
+
+
+@pytest.fixture
+def probe(monkeypatch, stand_ins):
+    search = ProbeSearch()
+    monkeypatch.setattr(watchlist, "get_search_tool", lambda: search)
+    return search
+
+
+@pytest.fixture
+def refresher(probe):
+    reports = ReportService(Workflow(checkpoint_path=None), cache=TTLCache("test_watchlist_reports"))
+    refresher = WatchlistRefresher(reports, ["AAPL"], interval=60, digests=TTLCache("test_watchlist_digests"))
+    refresher.refresh_once()
+    return refresher
+
+
+def renewals(monkeypatch):
+    """Records which (ticker, kind) artifacts are renewed."""
+    renewed = []
+    artifacts = default_artifacts()
+    renew = artifacts.renew
+    monkeypatch.setattr(artifacts, "renew", lambda ticker, kind, ttl=None: renewed.append((ticker, kind)) or renew(ticker, kind, ttl))
+    return renewed
+
+
+def test_unchanged_sources_renew_the_market_data(refresher, monkeypatch):
+    renewed = renewals(monkeypatch)
+    summary = refresher.refresh_once()
+
+    assert summary["changed"] == [] and summary["kept"] == ["AAPL"]
+    assert ("AAPL", "market_data") in renewed
+
+
+def test_a_moved_quote_counts_as_a_change(refresher, probe, monkeypatch):
+    renewed = renewals(monkeypatch)
+    probe.prices["AAPL"] = 101
+    summary = refresher.refresh_once()
+
+    assert summary["changed"] == ["AAPL"] and summary["refreshed"] == ["AAPL"]
+    assert ("AAPL", "market_data") not in renewed
+
+
+def test_unchecked_tickers_are_left_to_expire(refresher, probe, monkeypatch):
+    renewed = renewals(monkeypatch)
+    monkeypatch.setattr(refresher.reports, "renew", lambda query, ttl=None: renewed.append(("report", query["tickers"])))
+    probe.failing = True
+    summary = refresher.refresh_once()
+
+    assert summary["unchecked"] == ["AAPL"] and summary["kept"] == ["AAPL"]
+    assert renewed == []
@@ -0,0 +1,170 @@
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from agents.market_data import FAST_SEARCHES
+from artifacts import default_artifacts
+from cache import TTLCache
+from concurrency import map_bounded
+from config import BATCH_CONCURRENCY, WATCHLIST_INTERVAL, WATCHLIST_STATE_PATH
+from metrics import REGISTRY
+from reports import canonical_key
+from search import CachedSearchTool, fresh_searches, get_search_tool
+
+# What is searched to tell whether a ticker's quote or news has moved on; the same searches
+# fast-mode market data makes, so the refreshed results are the ones it reads
+PROBE_QUERIES = (FAST_SEARCHES["quote"], FAST_SEARCHES["news"])
+
+# Per-ticker artifacts that stay valid as long as the ticker's sources are unchanged
+DERIVED_KINDS = ("market_data", "news_analysis", "risk_assessment")
+
+# Digests outlive any refresh interval; a ticker unseen for this long starts over
+DIGEST_TTL = 7 * 24 * 60 * 60
+
+
+def digest_results(result: Any) -> Optional[str]:
+    """Hash of what a search returned, ignoring result order and per-call fields like scores.
+
+    None when the search failed, so a failure never counts as a change.
+    """
+    if isinstance(result, dict) and "error" in result:
+        return None
+    items = result.get("results", []) if isinstance(result, dict) else None
+    if items is None:
+        text = str(result)
+    else:
+        text = json.dumps(sorted(
+            [item.get("url", ""), item.get("title", ""), " ".join(str(item.get("content", "")).split())]
+            for item in items if isinstance(item, dict)
+        ))
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class WatchlistRefresher:
+    """Keeps the reports for a watchlist warm in the report cache.
+
+    Each pass re-runs the quote and news searches for every ticker and compares a hash of
+    the results with the previous pass. Tickers whose sources changed lose their cached
+    market data, so their news and risk analyses are redone; unchanged tickers keep theirs.
+    Tickers that could not be checked are left to expire on their own. Only reports that
+    include a changed ticker (or have dropped out of the cache) are regenerated.
+    """
+
+    def __init__(self, reports, entries: List[str], interval: float = WATCHLIST_INTERVAL,
+                 digests: Optional[TTLCache] = None):
+        self.reports = reports
+        self.entries = entries
+        self.interval = interval
+        # Results must outlive the gap between passes to be served instantly
+        self.ttl = max(reports.ttl, 2 * interval)
+        self.digests = digests or TTLCache("watchlist_digests", max_entries=4096, path=WATCHLIST_STATE_PATH)
+        self._stop = threading.Event()
+
+    def check(self, ticker: str) -> Optional[bool]:
+        """Search for the ticker again; True when the results differ from the last pass, None if a search failed."""
+        tool = get_search_tool()
+        digests = []
+        for probe in PROBE_QUERIES:
+            query = probe.format(ticker=ticker)
+            try:
+                result = tool.refresh(query) if isinstance(tool, CachedSearchTool) else tool.invoke({"query": query})
+            except Exception as e:
+                result = {"error": str(e)}
+            digests.append(digest_results(result))
+            if digests[-1] is None:
+                print(f"⚠️ Could not check {ticker}: {result['error']}")
+                REGISTRY.inc("watchlist_checks_total", "Watchlist source checks by outcome", outcome="failed")
+                return None
+
+        digest = hashlib.sha256("".join(digests).encode()).hexdigest()
+        changed = self.digests.get(ticker) != digest
+        self.digests.set(ticker, digest, DIGEST_TTL)
+        REGISTRY.inc("watchlist_checks_total", "Watchlist source checks by outcome",
+                     outcome="changed" if changed else "unchanged")
+        return changed
+
+    def refresh_once(self) -> Dict[str, Any]:
+        """One pass over the watchlist: check every ticker, then bring each report up to date."""
+        started = time.perf_counter()
+        queries = {}
+        for entry in self.entries:
+            parsed = self.reports.parse(entry)
+            if parsed.get("error_messages") or not parsed.get("query", {}).get("tickers"):
+                print(f"⚠️ Skipping watchlist entry {entry!r}: no stocks recognised")
+                continue
+            queries[entry] = parsed["query"]
+
+        tickers = sorted({ticker for query in queries.values() for ticker in query["tickers"]})
+        checks = dict(zip(tickers, map_bounded(self.check, tickers, BATCH_CONCURRENCY)))
+        changed = {ticker for ticker, is_changed in checks.items() if is_changed}
+        unchecked = {ticker for ticker, is_changed in checks.items() if is_changed is None}
+
+        artifacts = default_artifacts()
+        for ticker in tickers:
+            if ticker in changed:
+                # News and risk analyses are keyed on the market data, so they follow
+                artifacts.discard(ticker, "market_data")
+            elif ticker not in unchecked:
+                for kind in DERIVED_KINDS:
+                    artifacts.renew(ticker, kind, self.ttl)
+
+        stale = [entry for entry, query in queries.items() if not self._keep(query, changed, unchecked)]
+        failed = []
+        for entry, state in zip(stale, map_bounded(self._regenerate, stale, BATCH_CONCURRENCY)):
+            if state.get("error_messages"):
+                failed.append(entry)
+
+        return {
+            "tickers": len(tickers),
+            "changed": sorted(changed),
+            "unchecked": sorted(unchecked),
+            "refreshed": [entry for entry in stale if entry not in failed],
+            "failed": failed,
+            "kept": [entry for entry in queries if entry not in stale],
+            "seconds": time.perf_counter() - started,
+        }
+
+    def _keep(self, query: Dict[str, Any], changed: set, unchecked: set) -> bool:
+        """Whether the stored report for query can stand; it is only renewed if every ticker checked unchanged."""
+        if changed.intersection(query["tickers"]):
+            return False
+        if unchecked.intersection(query["tickers"]):
+            return self.reports.cache.get(canonical_key(query)) is not None
+        return self.reports.renew(query, self.ttl)
+
+    def _regenerate(self, entry: str) -> Dict[str, Any]:
+        try:
+            # Only tickers without reusable market data search at all, and those need current results
+            with fresh_searches():
+                return self.reports.run(entry, refresh=True, ttl=self.ttl)
+        except Exception as e:
+            return {"error_messages": [f"A critical error occurred: {str(e)}"]}
+
+    def run(self, passes: Optional[int] = None) -> None:
+        """Refresh every interval seconds until stop() is called or passes have run."""
+        count = 0
+        while not self._stop.is_set():
+            summary = self.refresh_once()
+            print(format_refresh(summary))
+            count += 1
+            if passes is not None and count >= passes:
+                break
+            self._stop.wait(self.interval)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+def format_refresh(summary: Dict[str, Any]) -> str:
+    changed = ", ".join(summary["changed"]) or "none"
+    line = (
+        f"🔄 Watchlist refreshed in {summary['seconds']:.1f}s: {summary['tickers']} tickers checked, "
+        f"changed: {changed}; {len(summary['refreshed'])} reports regenerated, {len(summary['kept'])} kept"
+    )
+    if summary["unchecked"]:
+        line += f"; could not check: {', '.join(summary['unchecked'])}"
+    if summary["failed"]:
+        line += f", {len(summary['failed'])} failed ({', '.join(summary['failed'])})"
+    return line
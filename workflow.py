@@ -1,53 +1,201 @@
-from typing import TypedDict, List, Dict, Any, Optional
+import itertools
+import operator
+import os
+import threading
+import time
+import uuid
+from functools import cached_property
+from typing import TypedDict, List, Dict, Any, Optional, Annotated, Iterator
 from langgraph.graph import StateGraph, END
+from config import CHECKPOINT_PATH, CHECKPOINT_TTL, COMBINED_ANALYSIS, MARKET_DATA_MODE, REQUEST_DEADLINE
+from deadline import deadline_at
+from models import StockData
+from metrics import instrument_node, start_run, finish_run
 from agents import (
     QueryParserAgent,
     MarketDataAgent,
+    FundamentalsAgent,
+    ContextCompressionAgent,
     NewsSentimentAgent,
     RiskAssessmentAgent,
+    CombinedAnalysisAgent,
     SynthesisAgent,
     ValidationAgent,
 )
 
 
+def merge_stocks_data(
+    left: Dict[str, StockData], right: Dict[str, Dict[str, Any]]
+) -> Dict[str, StockData]:
+    """Apply per-ticker field updates so parallel branches can each write their own fields.
+
+    Only updated tickers get a new record; the rest are shared with the previous state.
+    """
+    merged = dict(left or {})
+    for ticker, changes in (right or {}).items():
+        merged[ticker] = StockData.coerce(merged.get(ticker)).updated(changes)
+    return merged
+
+
+def add_counts(left: Dict[str, int], right: Dict[str, int]) -> Dict[str, int]:
+    """Sum per-key counters, so retried or parallel nodes accumulate instead of overwrite."""
+    merged = dict(left or {})
+    for key, value in (right or {}).items():
+        merged[key] = merged.get(key, 0) + value
+    return merged
+
+
 class WorkflowState(TypedDict):
     query: Dict[str, Any]
-    stocks_data: Dict[str, Dict[str, Any]]
-    messages: List[str]
-    error_messages: List[str]
+    # Nodes write {ticker: {field: value}} updates; the market data in a record is a blob handle
+    stocks_data: Annotated[Dict[str, StockData], merge_stocks_data]
+    messages: Annotated[List[str], operator.add]
+    error_messages: Annotated[List[str], operator.add]
     executive_summary: Optional[str]
     comparison_dashboard: Optional[str]
     validation_result: Optional[Dict[str, Any]]
     needs_retry: bool
+    # Prompt tokens kept out of LLM calls by context compression, per node
+    tokens_saved: Annotated[Dict[str, int], add_counts]
+    # Wall-clock time the run should finish by (None for no deadline), and the optional
+    # steps given up to meet it: {"stage": ..., "ticker": ...}; any entry makes the report partial
+    deadline: Optional[float]
+    skipped: Annotated[List[Dict[str, Any]], operator.add]
 
 
 class Workflow:
-    def __init__(self):
+    # Idle runs' checkpoints are pruned every PRUNE_INTERVAL runs rather than on each one
+    PRUNE_INTERVAL = 64
+
+    def __init__(
+        self,
+        share_market_data: bool = False,
+        checkpoint_path: Optional[str] = CHECKPOINT_PATH,
+        market_data_mode: str = MARKET_DATA_MODE,
+        deadline: float = REQUEST_DEADLINE,
+        combined_analysis: bool = COMBINED_ANALYSIS,
+        checkpoint_ttl: float = CHECKPOINT_TTL,
+    ):
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_ttl = checkpoint_ttl
+        self._runs = itertools.count(1)
+        self._activity_lock = threading.Lock()
+        # Default seconds per request; run() and stream() can set their own
+        self.deadline = deadline
         self.graph = StateGraph(WorkflowState)
 
         query_parser = QueryParserAgent()
-        market_data = MarketDataAgent()
-        news_agent = NewsSentimentAgent()
-        risk_agent = RiskAssessmentAgent()
+        market_data = MarketDataAgent(share_results=share_market_data, mode=market_data_mode)
+        fundamentals = FundamentalsAgent()
+        compression = ContextCompressionAgent()
         synthesis_agent = SynthesisAgent()
         validation_agent = ValidationAgent()
 
-        self.graph.add_node("parse_query", query_parser)
-        self.graph.add_node("get_market_data", market_data)
-        self.graph.add_node("analyze_news", news_agent)
-        self.graph.add_node("assess_risk", risk_agent)
-        self.graph.add_node("synthesize_report", synthesis_agent)
-        self.graph.add_node("validate_report", validation_agent)
+        nodes = {
+            "parse_query": query_parser,
+            "get_market_data": market_data,
+            "extract_fundamentals": fundamentals,
+            "compress_context": compression,
+        }
+        # Either one call per ticker for both analyses, or a call each in parallel branches
+        if combined_analysis:
+            nodes["analyze_stocks"] = CombinedAnalysisAgent()
+        else:
+            nodes["analyze_news"] = NewsSentimentAgent()
+            nodes["assess_risk"] = RiskAssessmentAgent()
+        nodes["synthesize_report"] = synthesis_agent
+        nodes["validate_report"] = validation_agent
+        # Every node is timed into the run's metrics
+        for name, node in nodes.items():
+            self.graph.add_node(name, instrument_node(name, node))
 
         self.graph.set_entry_point("parse_query")
         self.graph.add_conditional_edges("parse_query", self.decide_after_parsing)
-        self.graph.add_edge("get_market_data", "analyze_news")
-        self.graph.add_edge("analyze_news", "assess_risk")
-        self.graph.add_edge("assess_risk", "synthesize_report")
+        self.graph.add_edge("get_market_data", "extract_fundamentals")
+        # Fundamentals are extracted from the raw text before compression drops anything
+        self.graph.add_edge("extract_fundamentals", "compress_context")
+        if combined_analysis:
+            self.graph.add_edge("compress_context", "analyze_stocks")
+            self.graph.add_edge("analyze_stocks", "synthesize_report")
+        else:
+            # News and risk only read market_data, so they run as parallel branches
+            self.graph.add_edge("compress_context", "analyze_news")
+            self.graph.add_edge("compress_context", "assess_risk")
+            self.graph.add_edge(["analyze_news", "assess_risk"], "synthesize_report")
         self.graph.add_edge("synthesize_report", "validate_report")
         self.graph.add_conditional_edges("validate_report", self.decide_after_validation)
 
-        self.app = self.graph.compile()
+    @cached_property
+    def app(self):
+        """Compiled on first use: the SQLite checkpointer is slow to import."""
+        return self.graph.compile(checkpointer=self._make_checkpointer())
+
+    def _make_checkpointer(self):
+        if not self.checkpoint_path:
+            return None
+
+        import sqlite3
+        from langgraph.checkpoint.sqlite import SqliteSaver
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.checkpoint_path)), exist_ok=True)
+        # Server workers in other processes write to the same file; wait out their locks
+        return SqliteSaver(sqlite3.connect(self.checkpoint_path, check_same_thread=False, timeout=30))
+
+    @cached_property
+    def _activity(self):
+        """Connection to the table of when each checkpointed run was last active; None without checkpoints."""
+        if not self.checkpoint_path:
+            return None
+
+        import sqlite3
+
+        # The checkpoint tables must exist before anything is pruned from them
+        self.app.checkpointer.setup()
+        db = sqlite3.connect(self.checkpoint_path, check_same_thread=False, timeout=30, isolation_level=None)
+        db.execute("CREATE TABLE IF NOT EXISTS run_activity (thread_id TEXT PRIMARY KEY, active_at REAL NOT NULL)")
+        # Runs checkpointed before activity was tracked count as active now
+        db.execute(
+            "INSERT OR IGNORE INTO run_activity (thread_id, active_at) SELECT DISTINCT thread_id, ? FROM checkpoints",
+            (time.time(),),
+        )
+        return db
+
+    def _mark_active(self, run_id: str) -> None:
+        db = self._activity
+        if db is None:
+            return
+        with self._activity_lock:
+            db.execute(
+                "INSERT OR REPLACE INTO run_activity (thread_id, active_at) VALUES (?, ?)", (run_id, time.time())
+            )
+        if next(self._runs) % self.PRUNE_INTERVAL == 0:
+            self.prune_checkpoints()
+
+    def prune_checkpoints(self, max_age: Optional[float] = None) -> int:
+        """Delete the checkpoints of runs idle for max_age seconds (default: checkpoint_ttl); returns how many runs."""
+        db = self._activity
+        if db is None:
+            return 0
+        cutoff = time.time() - (self.checkpoint_ttl if max_age is None else max_age)
+        idle = "SELECT thread_id FROM run_activity WHERE active_at < ?"
+        with self._activity_lock:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                for table in ("writes", "checkpoints"):
+                    db.execute(f"DELETE FROM {table} WHERE thread_id IN ({idle})", (cutoff,))
+                pruned = db.execute("DELETE FROM run_activity WHERE active_at < ?", (cutoff,)).rowcount
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return pruned
+
+    @staticmethod
+    def _run_config(run_id: str, config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        # Each run is its own LangGraph thread, so its checkpoints are found by run id
+        config = dict(config or {})
+        config["configurable"] = {**config.get("configurable", {}), "thread_id": run_id}
+        return config
 
     def decide_after_parsing(self, state: WorkflowState):
         if not state.get("query", {}).get("tickers") or state.get("error_messages"):
@@ -55,25 +203,155 @@ class Workflow:
         return "get_market_data"
 
     def decide_after_validation(self, state: WorkflowState):
-        val_result = state.get("validation_result", {})
+        # Out of time: whatever summary there is stands
+        if any(entry["stage"] == "validation" for entry in state.get("skipped") or []):
+            return END
+        val_result = state.get("validation_result") or {}
         if state.get("needs_retry") and val_result.get("attempt") == 1:
             return "synthesize_report"
         return END
 
-    def run(self, query: str):
-        print("🚀 Starting stock research...")
+    def initial_state(
+        self, query: str, parsed: Optional[Dict[str, Any]] = None, deadline: Optional[float] = None
+    ) -> WorkflowState:
+        """parsed, e.g. {"tickers": [...], "analysis_type": ...}, presets the query so parsing is skipped.
 
-        initial_state = {
-            "query": {"user_input": query},
+        deadline is in seconds from now, defaulting to the workflow's.
+        """
+        return {
+            "query": {**(parsed or {}), "user_input": query},
             "stocks_data": {},
             "messages": [],
             "error_messages": [],
             "executive_summary": None,
             "comparison_dashboard": None,
             "validation_result": None,
-            "needs_retry": False
+            "needs_retry": False,
+            "tokens_saved": {},
+            "deadline": deadline_at(self.deadline if deadline is None else deadline),
+            "skipped": [],
         }
 
-        result = self.app.invoke(initial_state)
+    @staticmethod
+    def report_savings(state: Optional[Dict[str, Any]]):
+        saved = sum((state or {}).get("tokens_saved", {}).values())
+        if saved:
+            print(f"🗜️ Context compression saved {saved:,} prompt tokens")
+
+    def run(
+        self,
+        query: str,
+        config: Optional[Dict[str, Any]] = None,
+        parsed: Optional[Dict[str, Any]] = None,
+        run_id: Optional[str] = None,
+        deadline: Optional[float] = None,
+    ):
+        """Run the workflow to completion.
+
+        The result carries its "run_id", which resume() and get_state() take, and a
+        per-run "metrics" breakdown. With a deadline (seconds), optional steps are given
+        up as it nears and listed in "skipped".
+        """
+        run_id = run_id or uuid.uuid4().hex
+        print(f"🚀 Starting stock research (run {run_id})...")
+
+        self._mark_active(run_id)
+        run_metrics, context = start_run()
+        state = self.initial_state(query, parsed, deadline)
+        result = context.run(self.app.invoke, state, config=self._run_config(run_id, config))
+        result["run_id"] = run_id
+        result["metrics"] = finish_run(run_metrics)
+        print("✅ Research complete!")
+        self.report_savings(result)
+        return result
+
+    def resume(self, run_id: str, config: Optional[Dict[str, Any]] = None):
+        """Continue a checkpointed run after its last completed node; a finished run just returns its state.
+
+        The run keeps its original deadline.
+        """
+        snapshot = self.app.get_state(self._run_config(run_id))
+        if not snapshot.values:
+            raise ValueError(f"No checkpoints found for run {run_id}")
+        if not snapshot.next:
+            return {**snapshot.values, "run_id": run_id}
+
+        print(f"⏯️ Resuming run {run_id} at {', '.join(snapshot.next)}...")
+        self._mark_active(run_id)
+        run_metrics, context = start_run()
+        # A None input tells LangGraph to carry on from the saved checkpoint
+        result = context.run(self.app.invoke, None, config=self._run_config(run_id, config))
+        result["run_id"] = run_id
+        result["metrics"] = finish_run(run_metrics)
+        print("✅ Research complete!")
+        self.report_savings(result)
+        return result
+
+    def get_state(self, run_id: str) -> Dict[str, Any]:
+        """Latest checkpointed state of a run and the nodes it would run next."""
+        snapshot = self.app.get_state(self._run_config(run_id))
+        return {"run_id": run_id, "values": snapshot.values, "next": list(snapshot.next), "completed": not snapshot.next}
+
+    def state_history(self, run_id: str) -> List[Dict[str, Any]]:
+        """Every checkpoint of a run, oldest first: which nodes wrote it, what ran next, and the state."""
+        history = []
+        for snapshot in self.app.get_state_history(self._run_config(run_id)):
+            metadata = snapshot.metadata or {}
+            history.append({
+                "step": metadata.get("step"),
+                "nodes": list((metadata.get("writes") or {}).keys()),
+                "next": list(snapshot.next),
+                "created_at": snapshot.created_at,
+                "values": snapshot.values,
+            })
+        return history[::-1]
+
+    def stream(
+        self,
+        query: str,
+        parsed: Optional[Dict[str, Any]] = None,
+        run_id: Optional[str] = None,
+        deadline: Optional[float] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """Run the workflow, yielding progress events as they happen.
+
+        Events are dicts with a "type" of:
+        - "node": a node finished; carries "node" and its partial "update"
+        - "token": a chunk of executive summary text from synthesize_report
+        - "final": the run is over; carries the full final "state", including "run_id" and "metrics"
+        """
+        run_id = run_id or uuid.uuid4().hex
+        print(f"🚀 Starting stock research (run {run_id})...")
+
+        self._mark_active(run_id)
+        run_metrics, context = start_run()
+        events = self.app.stream(
+            self.initial_state(query, parsed, deadline),
+            config=self._run_config(run_id),
+            stream_mode=["updates", "messages", "values"],
+        )
+
+        final_state = None
+        while True:
+            # Each step runs in the run's own context, so metrics don't leak into the caller's
+            try:
+                mode, payload = context.run(next, events)
+            except StopIteration:
+                break
+
+            if mode == "updates":
+                for node, update in payload.items():
+                    yield {"type": "node", "node": node, "update": update}
+            elif mode == "messages":
+                chunk, metadata = payload
+                if metadata.get("langgraph_node") == "synthesize_report" and chunk.content:
+                    yield {"type": "token", "node": "synthesize_report", "content": chunk.content}
+            else:
+                final_state = payload
+
+        if final_state is not None:
+            final_state["run_id"] = run_id
+            final_state["metrics"] = finish_run(run_metrics)
         print("✅ Research complete!")
-        return result
\ No newline at end of file
+        self.report_savings(final_state)
+        yield {"type": "final", "state": final_state}
\ No newline at end of file